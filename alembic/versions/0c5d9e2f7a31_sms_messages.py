@@ -0,0 +1,40 @@
+"""sms_messages
+
+Revision ID: 0c5d9e2f7a31
+Revises: f1b6d84c3e20
+Create Date: 2026-10-19 12:41:08.204517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c5d9e2f7a31'
+down_revision: Union[str, None] = 'f1b6d84c3e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sms_messages',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('phone', sa.String(length=15), nullable=False),
+    sa.Column('text', sa.String(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('provider_message_id', sa.String(length=64), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sms_messages_phone_created_at', 'sms_messages', ['phone', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sms_messages_phone_created_at', table_name='sms_messages')
+    op.drop_table('sms_messages')
@@ -0,0 +1,54 @@
+"""deal_events
+
+Revision ID: 3f7d2c9e8b15
+Revises: 9a6c3e1f4d27
+Create Date: 2026-10-18 12:25:03.418207
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7d2c9e8b15'
+down_revision: Union[str, None] = '9a6c3e1f4d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    op.create_table('deal_events',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('deal_id', sa.UUID(), nullable=False),
+    sa.Column('event', sa.String(length=30), nullable=False),
+    sa.Column('from_status', sa.String(length=30), nullable=True),
+    sa.Column('to_status', sa.String(length=30), nullable=False),
+    sa.Column('actor_id', sa.UUID(), nullable=True),
+    sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_index('ix_deal_events_deal_id_created_at', 'deal_events', ['deal_id', 'created_at'], unique=False)
+    op.execute("CREATE TABLE deal_events_default PARTITION OF deal_events DEFAULT")
+    # The worker keeps creating months ahead (app.services.partitions); seed the first few here
+    this_month = date.today().replace(day=1)
+    for i in range(3):
+        start, end = _add_months(this_month, i), _add_months(this_month, i + 1)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS deal_events_{start:%Y_%m} PARTITION OF deal_events "
+            f"FOR VALUES FROM ('{start} 00:00+00') TO ('{end} 00:00+00')"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deal_events_deal_id_created_at', table_name='deal_events')
+    op.drop_table('deal_events')
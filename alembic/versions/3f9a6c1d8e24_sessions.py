@@ -0,0 +1,41 @@
+"""sessions
+
+Revision ID: 3f9a6c1d8e24
+Revises: b2e7f09c4d58
+Create Date: 2026-10-19 16:27:40.913265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a6c1d8e24'
+down_revision: Union[str, None] = 'b2e7f09c4d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sessions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('device', sa.String(length=200), nullable=True),
+    sa.Column('refresh_token_hash', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sessions_user_id', 'sessions', ['user_id'], unique=False)
+    op.create_index('ix_sessions_revoked_at', 'sessions', ['revoked_at'], unique=False, postgresql_where=sa.text('revoked_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_revoked_at', table_name='sessions', postgresql_where=sa.text('revoked_at IS NOT NULL'))
+    op.drop_index('ix_sessions_user_id', table_name='sessions')
+    op.drop_table('sessions')
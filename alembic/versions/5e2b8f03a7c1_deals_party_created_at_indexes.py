@@ -0,0 +1,28 @@
+"""deals_party_created_at_indexes
+
+Revision ID: 5e2b8f03a7c1
+Revises: c41d7e2a9b10
+Create Date: 2026-10-18 11:02:15.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b8f03a7c1'
+down_revision: Union[str, None] = 'c41d7e2a9b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_deals_creator_id_created_at', 'deals', ['creator_id', 'created_at'], unique=False)
+    op.create_index('ix_deals_advertiser_id_created_at', 'deals', ['advertiser_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deals_advertiser_id_created_at', table_name='deals')
+    op.drop_index('ix_deals_creator_id_created_at', table_name='deals')
@@ -0,0 +1,26 @@
+"""sms_messages_provider
+
+Revision ID: 6d1e4a8b2f90
+Revises: 0c5d9e2f7a31
+Create Date: 2026-10-19 13:27:44.913206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d1e4a8b2f90'
+down_revision: Union[str, None] = '0c5d9e2f7a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sms_messages', sa.Column('provider', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('sms_messages', 'provider')
@@ -0,0 +1,26 @@
+"""deal_version
+
+Revision ID: 9a6c3e1f4d27
+Revises: 5e2b8f03a7c1
+Create Date: 2026-10-18 11:40:52.771930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a6c3e1f4d27'
+down_revision: Union[str, None] = '5e2b8f03a7c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('deals', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('deals', 'version')
@@ -0,0 +1,27 @@
+"""blob type
+
+Revision ID: a4e8f2c6d913
+Revises: d5c2a9e7f314
+Create Date: 2026-10-19 21:14:05.230917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e8f2c6d913'
+down_revision: Union[str, None] = 'd5c2a9e7f314'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing blobs stay NULL: their upload type is unknown, so the GC keeps them
+    op.add_column('blobs', sa.Column('type', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('blobs', 'type')
@@ -0,0 +1,55 @@
+"""otp_codes_daily_partitions
+
+Revision ID: a4f8c2d6e913
+Revises: 6d1e4a8b2f90
+Create Date: 2026-10-19 14:02:17.350982
+
+"""
+from datetime import date, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f8c2d6e913'
+down_revision: Union[str, None] = '6d1e4a8b2f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Codes live for minutes; outstanding ones are dropped rather than migrated
+    op.drop_table('otp_codes')
+    op.create_table('otp_codes',
+    sa.Column('phone', sa.String(length=15), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('code_hash', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('used_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('phone', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.execute("CREATE TABLE otp_codes_default PARTITION OF otp_codes DEFAULT")
+    # The worker keeps creating days ahead and dropping old ones (app.services.partitions)
+    today = date.today()
+    for i in range(3):
+        start = today + timedelta(days=i)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS otp_codes_{start:%Y_%m_%d} PARTITION OF otp_codes "
+            f"FOR VALUES FROM ('{start} 00:00+00') TO ('{start + timedelta(days=1)} 00:00+00')"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('otp_codes')
+    op.create_table('otp_codes',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('phone', sa.String(length=15), nullable=False),
+    sa.Column('code', sa.String(length=7), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('is_used', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
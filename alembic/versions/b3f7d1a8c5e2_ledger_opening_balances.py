@@ -0,0 +1,77 @@
+"""ledger opening balances
+
+Deals from before the ledger: completed ones were settled outside it, so they
+get a `legacy` payout per creator and are never batched again. Deals still
+holding money in escrow (or completed through the ledger without having been
+funded through it) get an `opening_balance` transaction, so their completion
+doesn't take escrow below zero.
+
+Revision ID: b3f7d1a8c5e2
+Revises: a4e8f2c6d913
+Create Date: 2026-10-19 21:48:37.604112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f7d1a8c5e2'
+down_revision: Union[str, None] = 'a4e8f2c6d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        WITH legacy AS (
+            SELECT d.id, d.creator_id, d.currency, d.creator_payout FROM deals d
+            WHERE d.status = 'completed' AND d.payout_id IS NULL
+              AND NOT EXISTS (SELECT 1 FROM ledger_entries e WHERE e.deal_id = d.id AND e.kind = 'deal_completed')
+        ), created AS (
+            INSERT INTO payouts (id, creator_id, amount, currency, deal_count, status, created_at, sent_at)
+            SELECT gen_random_uuid(), creator_id, sum(creator_payout), currency, count(*), 'legacy', now(), now()
+            FROM legacy GROUP BY creator_id, currency
+            RETURNING id, creator_id, currency
+        )
+        UPDATE deals SET payout_id = created.id
+        FROM legacy JOIN created ON created.creator_id = legacy.creator_id AND created.currency = legacy.currency
+        WHERE deals.id = legacy.id
+    """)
+    op.execute("""
+        WITH held AS (
+            SELECT d.id, d.currency, d.budget, gen_random_uuid() AS txn_id FROM deals d
+            WHERE d.budget <> 0
+              AND NOT EXISTS (SELECT 1 FROM ledger_entries e WHERE e.deal_id = d.id AND e.kind = 'escrow_funded')
+              AND (d.status IN ('in_progress', 'work_submitted', 'disputed')
+                   -- funded before the ledger but already completed through it
+                   OR EXISTS (SELECT 1 FROM ledger_entries e WHERE e.deal_id = d.id AND e.kind = 'deal_completed'))
+        )
+        INSERT INTO ledger_entries (id, txn_id, kind, account, currency, amount, deal_id, created_at)
+        SELECT gen_random_uuid(), held.txn_id, 'opening_balance', leg.account, held.currency, leg.amount, held.id, now()
+        FROM held CROSS JOIN LATERAL (VALUES ('external:payments', -held.budget), ('escrow', held.budget)) AS leg(account, amount)
+    """)
+    op.execute("""
+        INSERT INTO ledger_accounts (account, currency, balance, updated_at)
+        SELECT account, currency, sum(amount), now() FROM ledger_entries WHERE kind = 'opening_balance'
+        GROUP BY account, currency
+        ON CONFLICT (account, currency) DO UPDATE
+        SET balance = ledger_accounts.balance + excluded.balance, updated_at = excluded.updated_at
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        UPDATE ledger_accounts a SET balance = a.balance - o.total, updated_at = now()
+        FROM (SELECT account, currency, sum(amount) AS total FROM ledger_entries
+              WHERE kind = 'opening_balance' GROUP BY account, currency) o
+        WHERE a.account = o.account AND a.currency = o.currency
+    """)
+    op.execute("DELETE FROM ledger_entries WHERE kind = 'opening_balance'")
+    op.execute("""
+        UPDATE deals SET payout_id = NULL
+        WHERE payout_id IN (SELECT id FROM payouts WHERE status = 'legacy')
+    """)
+    op.execute("DELETE FROM payouts WHERE status = 'legacy'")
@@ -0,0 +1,47 @@
+"""daily_stats_rollups
+
+Revision ID: b8e41f6a2d53
+Revises: 3f7d2c9e8b15
+Create Date: 2026-10-18 13:02:17.550184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e41f6a2d53'
+down_revision: Union[str, None] = '3f7d2c9e8b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('daily_deal_stats',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('status', sa.String(length=30), nullable=False),
+    sa.Column('deal_count', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.BigInteger(), nullable=False),
+    sa.Column('platform_fee', sa.BigInteger(), nullable=False),
+    sa.Column('creator_payout', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'role', 'currency', 'status')
+    )
+    op.create_table('daily_order_stats',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('budget', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'currency')
+    )
+    # Backfill from existing data: python -m app.services.stats rebuild
+
+
+def downgrade() -> None:
+    op.drop_table('daily_order_stats')
+    op.drop_table('daily_deal_stats')
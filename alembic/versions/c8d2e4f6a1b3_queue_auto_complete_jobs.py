@@ -0,0 +1,42 @@
+"""queue auto-complete jobs
+
+Deals submitted before every submission queued a `deals.auto_complete` job
+relied on the leader's sweep, which is gone. Queue a job for each of them; it
+runs right away and completes the deal, or reschedules itself to the deadline.
+
+Revision ID: c8d2e4f6a1b3
+Revises: b3f7d1a8c5e2
+Create Date: 2026-10-19 23:12:05.318447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d2e4f6a1b3'
+down_revision: Union[str, None] = 'b3f7d1a8c5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        INSERT INTO jobs (id, kind, payload, priority, status, attempts, max_attempts, run_at, created_at)
+        SELECT gen_random_uuid(), 'deals.auto_complete', jsonb_build_object('deal_id', d.id::text),
+               5, 'queued', 0, 10, d.work_submitted_at, now()
+        FROM deals d
+        WHERE d.status = 'work_submitted' AND d.work_submitted_at IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM jobs j
+              WHERE j.kind = 'deals.auto_complete' AND j.status IN ('queued', 'running')
+                AND j.payload->>'deal_id' = d.id::text
+          )
+    """)
+
+
+def downgrade() -> None:
+    # Older code runs `deals.auto_complete` jobs too, so the queued ones can stay
+    pass
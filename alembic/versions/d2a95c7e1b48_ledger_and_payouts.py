@@ -0,0 +1,72 @@
+"""ledger_and_payouts
+
+Revision ID: d2a95c7e1b48
+Revises: b8e41f6a2d53
+Create Date: 2026-10-18 13:41:09.226815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a95c7e1b48'
+down_revision: Union[str, None] = 'b8e41f6a2d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ledger_entries',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('txn_id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('account', sa.String(length=100), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('amount', sa.BigInteger(), nullable=False),
+    sa.Column('deal_id', sa.UUID(), nullable=True),
+    sa.Column('payout_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ledger_entries_account_created_at', 'ledger_entries', ['account', 'created_at'], unique=False)
+    op.create_index('ix_ledger_entries_deal_id', 'ledger_entries', ['deal_id'], unique=False)
+    op.create_index('ix_ledger_entries_txn_id', 'ledger_entries', ['txn_id'], unique=False)
+    op.create_table('ledger_accounts',
+    sa.Column('account', sa.String(length=100), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('balance', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('account', 'currency')
+    )
+    op.create_table('payouts',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('creator_id', sa.UUID(), nullable=False),
+    sa.Column('amount', sa.BigInteger(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('deal_count', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('provider_ref', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_payouts_creator_id_created_at', 'payouts', ['creator_id', 'created_at'], unique=False)
+    op.create_index('ix_payouts_pending', 'payouts', ['created_at'], unique=False, postgresql_where=sa.text("status = 'pending'"))
+    op.add_column('deals', sa.Column('payout_id', sa.UUID(), nullable=True))
+    op.create_index('ix_deals_unpaid', 'deals', ['creator_id'], unique=False, postgresql_where=sa.text("status = 'completed' AND payout_id IS NULL"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deals_unpaid', table_name='deals', postgresql_where=sa.text("status = 'completed' AND payout_id IS NULL"))
+    op.drop_column('deals', 'payout_id')
+    op.drop_index('ix_payouts_pending', table_name='payouts', postgresql_where=sa.text("status = 'pending'"))
+    op.drop_index('ix_payouts_creator_id_created_at', table_name='payouts')
+    op.drop_table('payouts')
+    op.drop_table('ledger_accounts')
+    op.drop_index('ix_ledger_entries_txn_id', table_name='ledger_entries')
+    op.drop_index('ix_ledger_entries_deal_id', table_name='ledger_entries')
+    op.drop_index('ix_ledger_entries_account_created_at', table_name='ledger_entries')
+    op.drop_table('ledger_entries')
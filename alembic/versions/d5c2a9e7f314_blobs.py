@@ -0,0 +1,37 @@
+"""blobs
+
+Revision ID: d5c2a9e7f314
+Revises: 8b1e5d3f6a07
+Create Date: 2026-10-19 19:02:33.518406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5c2a9e7f314'
+down_revision: Union[str, None] = '8b1e5d3f6a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('path', sa.String(length=200), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_uploaded_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index('ix_blobs_refcount_last_uploaded_at', 'blobs', ['refcount', 'last_uploaded_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_blobs_refcount_last_uploaded_at', table_name='blobs')
+    op.drop_table('blobs')
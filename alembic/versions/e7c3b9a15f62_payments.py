@@ -0,0 +1,51 @@
+"""payments
+
+Revision ID: e7c3b9a15f62
+Revises: d2a95c7e1b48
+Create Date: 2026-10-19 09:12:44.803126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3b9a15f62'
+down_revision: Union[str, None] = 'd2a95c7e1b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('payments',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('deal_id', sa.UUID(), nullable=False),
+    sa.Column('provider', sa.String(length=30), nullable=False),
+    sa.Column('provider_ref', sa.String(length=100), nullable=True),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('method', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('paid_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('provider_ref')
+    )
+    op.create_index('ux_payments_deal_id_live', 'payments', ['deal_id'], unique=True, postgresql_where=sa.text("status IN ('pending', 'succeeded')"))
+    op.create_table('payment_events',
+    sa.Column('provider', sa.String(length=30), nullable=False),
+    sa.Column('event_id', sa.String(length=100), nullable=False),
+    sa.Column('payment_ref', sa.String(length=100), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('received_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('provider', 'event_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('payment_events')
+    op.drop_index('ux_payments_deal_id_live', table_name='payments', postgresql_where=sa.text("status IN ('pending', 'succeeded')"))
+    op.drop_table('payments')
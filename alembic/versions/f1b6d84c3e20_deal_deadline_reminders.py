@@ -0,0 +1,33 @@
+"""deal_deadline_reminders
+
+Revision ID: f1b6d84c3e20
+Revises: e7c3b9a15f62
+Create Date: 2026-10-19 10:05:31.661047
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6d84c3e20'
+down_revision: Union[str, None] = 'e7c3b9a15f62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('deal_reminders',
+    sa.Column('deal_id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('deal_id', 'kind')
+    )
+    op.create_index('ix_deals_status_deadline', 'deals', ['status', 'deadline'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deals_status_deadline', table_name='deals')
+    op.drop_table('deal_reminders')
@@ -14,23 +14,59 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_DAYS: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 90
+    TOKEN_CACHE_SIZE: int = 10000  # verified tokens kept per process; 0 disables the cache
+    DENYLIST_REFRESH_SECONDS: int = 5  # how often each API process pulls new logouts/revoked sessions
 
     # OTP
     OTP_LENGTH: int = 6
     OTP_EXPIRE_MINUTES: int = 5
     OTP_RATE_LIMIT_SECONDS: int = 60
+    OTP_STORE: str = "postgres"  # postgres | memory (single API process only)
 
     # Mobizon SMS (required)
     MOBIZON_API_KEY: str
     MOBIZON_API_URL: str = "https://api.mobizon.kz/service"
+    SMS_CONNECT_TIMEOUT: float = 3.0
+    SMS_READ_TIMEOUT: float = 10.0
+    SMS_MAX_CONNECTIONS: int = 10
+    SMS_MAX_ATTEMPTS: int = 6
+    SMS_CIRCUIT_THRESHOLD: int = 5  # consecutive gateway failures that open the circuit
+    SMS_CIRCUIT_RESET_SECONDS: float = 30.0
+    # Providers in failover order: mobizon | fake, comma-separated
+    SMS_PROVIDER: str = "mobizon"
+    SMS_FAILOVER_ERROR_RATE: float = 0.5  # share of failed calls in the window that takes a provider out
+    SMS_FAILOVER_WINDOW: int = 20
+    SMS_RETENTION_DAYS: int = 30  # sms_messages rows older than this are deleted
 
     # Platform
     PLATFORM_COMMISSION_PERCENT: int = 10
     WORK_REVIEW_PERIOD_HOURS: int = 24
+    PAYOUT_INTERVAL_HOURS: int = 24  # one payout per creator per batch
+    DEADLINE_REMINDER_DAYS: int = 1  # remind the creator this many days before the deadline
+
+    # Payments
+    PAYMENT_PROVIDER: str = "fake"
+    PAYMENT_WEBHOOK_SECRET: str = ""  # the fake provider falls back to SECRET_KEY
+
+    # Rate limiting (limits themselves are declared on the routes)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (per process) | postgres (shared by all API processes)
+
+    # Background jobs
+    RUN_BACKGROUND_JOBS: bool = True  # API processes also consume the job queue and run the leader loops
+    WORKER_CONCURRENCY: int = 10
 
     # Upload
     UPLOAD_DIR: str = "uploads"
     MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # 50MB
+    UPLOAD_TMP_DIR: str = "uploads_tmp"  # files being received; private, same mount as UPLOAD_DIR (not inside it: that is served)
+    UPLOAD_SESSION_TTL_HOURS: int = 24  # resumable uploads untouched this long are deleted
+    BLOB_GC_GRACE_HOURS: int = 24  # an unreferenced upload is kept this long for the client to save it
+
+    # Contracts (PDF cache is private: not under UPLOAD_DIR, which is served publicly)
+    CONTRACT_CACHE_DIR: str = "contracts"
+    CONTRACT_FONT_PATH: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"  # needs Cyrillic glyphs
+    CONTRACT_RENDER_WORKERS: int = 2
 
     # CORS
     ALLOWED_ORIGINS: str = "*"
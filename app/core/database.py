@@ -12,6 +12,18 @@ engine = create_async_engine(
 )
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Each `@leader_only` loop holds a connection for as long as its process leads.
+# They get their own pool, one slot per loop (plus spare), so leadership never
+# takes connections from request handlers or queue workers.
+LOCK_POOL_SIZE = 8
+lock_engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    pool_size=LOCK_POOL_SIZE,
+    max_overflow=4,
+    pool_pre_ping=True,
+)
+
 
 class Base(DeclarativeBase):
     pass
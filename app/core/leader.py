@@ -0,0 +1,133 @@
+import asyncio
+import functools
+import hashlib
+import os
+import socket
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+RETRY_SECONDS = 5  # how quickly a standby notices the leader is gone
+CHECK_SECONDS = 10  # liveness check of the lock connection while leading
+
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def lock_key(name: str) -> int:
+    """Stable signed 64-bit advisory-lock key for a job name."""
+    return int.from_bytes(hashlib.sha256(f"addsy:{name}".encode()).digest()[:8], "big", signed=True)
+
+
+class LeaderElection:
+    """Runs `job` only in the process holding `pg_try_advisory_lock(lock_key(name))`.
+
+    The lock is session-level and held on a dedicated connection from
+    `lock_engine` (not the query pool) for as long as this process leads. If
+    the process dies its connection closes, Postgres releases the lock and a
+    standby takes over within RETRY_SECONDS. If the lock connection breaks, the
+    job is cancelled before leadership is given up.
+    """
+
+    def __init__(self, name: str, job, engine: AsyncEngine | None = None):
+        self.name = name
+        self.key = lock_key(name)
+        self.job = job
+        self.engine = engine
+        self.is_leader = False
+        self.leader_since: datetime | None = None
+
+    def status(self) -> dict:
+        return {
+            "leader": self.is_leader,
+            "leader_since": self.leader_since.isoformat() if self.leader_since else None,
+        }
+
+    async def _try_lead(self, conn) -> bool:
+        acquired = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})).scalar()
+        await conn.commit()
+        if not acquired:
+            return False
+
+        self.is_leader = True
+        self.leader_since = datetime.now(timezone.utc)
+        print(f"[Leader] {INSTANCE_ID} leads '{self.name}'")
+        task = asyncio.create_task(self.job())
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=CHECK_SECONDS)
+                if done:
+                    task.result()
+                    return True
+                await conn.execute(text("SELECT 1"))
+                await conn.commit()
+        finally:
+            task.cancel()
+            # The job must have stopped before another process can take the lock
+            await asyncio.gather(task, return_exceptions=True)
+            self.is_leader = False
+            self.leader_since = None
+            # Never hand a connection that still holds the lock back to the pool
+            try:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                await conn.commit()
+            except Exception:
+                await conn.invalidate()
+
+    async def run(self):
+        if self.engine is None:
+            from app.core.database import lock_engine
+
+            self.engine = lock_engine
+
+        while True:
+            try:
+                async with self.engine.connect() as conn:
+                    await self._try_lead(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Leader] '{self.name}' error: {e}")
+            await asyncio.sleep(RETRY_SECONDS)
+
+
+elections: dict[str, LeaderElection] = {}
+
+
+def leader_only(name: str):
+    """Declare that a long-running background job must run in exactly one process.
+
+        @leader_only("payouts")
+        async def payout_batches(): ...
+
+    Calling the decorated function runs the leader election loop instead.
+    """
+
+    def decorator(job):
+        @functools.wraps(job)
+        async def wrapper():
+            election = elections.setdefault(name, LeaderElection(name, job))
+            await election.run()
+
+        return wrapper
+
+    return decorator
+
+
+def leadership_status() -> dict:
+    return {name: election.status() for name, election in elections.items()}
+
+
+if __name__ == "__main__":
+    # Failover demo: start in two terminals, kill the leader, watch the other take over.
+    #   python -m app.core.leader demo
+    import sys
+
+    job_name = sys.argv[1] if len(sys.argv) > 1 else "demo"
+
+    async def heartbeat():
+        while True:
+            print(f"[Leader] {INSTANCE_ID} working on '{job_name}'")
+            await asyncio.sleep(2)
+
+    asyncio.run(LeaderElection(job_name, heartbeat).run())
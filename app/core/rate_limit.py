@@ -0,0 +1,192 @@
+"""Token-bucket rate limiting, declared per route:
+
+    @router.post("/verify-otp", dependencies=[rate_limit("verify_otp", Limit("phone", 5, 300), Limit("ip", 50, 300))])
+
+`Limit(scope, times, seconds)` allows a burst of `times` requests, refilled
+evenly over `seconds`, per client IP, per `phone` in the JSON body, or per
+user (the access token's subject). Route dependencies run before the
+endpoint's own, so a rejected request never opens a DB session or loads the
+user. It is answered with 429 and `Retry-After`.
+
+`settings.RATE_LIMIT_BACKEND` picks where buckets live:
+
+- "memory": per process. With N API processes a client gets up to N times the limit.
+- "postgres": shared by all processes (an UNLOGGED `rate_limits` table, one
+  upsert per check). Each process keeps an in-memory copy of the same limits
+  in front of it, so a client already over the limit on this process is
+  turned away without a DB round trip.
+"""
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Protocol
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.leader import leader_only
+from app.core.security import decode_token
+
+PURGE_INTERVAL_SECONDS = 60
+STALE_BUCKET_HOURS = 24  # longer than any limit's refill time: such buckets are full
+
+
+class Limit(NamedTuple):
+    scope: str  # ip | phone | user
+    times: int
+    seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.times / self.seconds
+
+
+class RateLimiter(Protocol):
+    async def hit(self, key: str, limit: Limit) -> float:
+        """Take a token from `key`'s bucket. Returns 0 if allowed, else seconds until one is available."""
+        ...
+
+
+def _wait(tokens: float, limit: Limit) -> float:
+    return (1 - tokens) / limit.refill_per_second
+
+
+class MemoryRateLimiter:
+    def __init__(self):
+        self.buckets: dict[str, tuple[float, float, float]] = {}  # key -> (tokens, updated_at, full_at)
+        self._next_purge = 0.0
+
+    def reset(self):
+        self.buckets.clear()
+
+    def _purge(self, now: float):
+        # A bucket that has refilled completely is the same as no bucket
+        self.buckets = {k: v for k, v in self.buckets.items() if v[2] > now}
+        self._next_purge = now + PURGE_INTERVAL_SECONDS
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        if now >= self._next_purge:
+            self._purge(now)
+        tokens, updated_at, _ = self.buckets.get(key, (limit.times, now, now))
+        tokens = min(limit.times, tokens + (now - updated_at) * limit.refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now, now + (limit.times - tokens) / limit.refill_per_second)
+        return 0 if allowed else _wait(tokens, limit)
+
+
+_REFILLED = "LEAST(CAST(:capacity AS float8), b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * CAST(:refill AS float8))"
+# Refill, then take a token only if a whole one is there; `allowed` records which happened.
+# SET expressions all see the old row, so `b.tokens` is the value before this hit.
+_HIT_SQL = text(f"""
+    INSERT INTO rate_limits AS b (key, tokens, allowed, updated_at)
+    VALUES (:key, CAST(:capacity AS float8) - 1, true, now())
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = CASE WHEN {_REFILLED} >= 1 THEN {_REFILLED} - 1 ELSE {_REFILLED} END,
+        allowed = {_REFILLED} >= 1,
+        updated_at = now()
+    RETURNING tokens, allowed
+""")
+
+
+class PostgresRateLimiter:
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self.local = MemoryRateLimiter()
+
+    def reset(self):
+        self.local.reset()
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        wait = await self.local.hit(key, limit)
+        if wait:
+            return wait
+        if self.session_factory is None:
+            from app.core.database import async_session
+
+            self.session_factory = async_session
+        async with self.session_factory() as db:
+            row = (await db.execute(_HIT_SQL, {"key": key, "capacity": limit.times, "refill": limit.refill_per_second})).one()
+            await db.commit()
+        return 0 if row.allowed else _wait(row.tokens, limit)
+
+
+limiters = {"memory": MemoryRateLimiter, "postgres": PostgresRateLimiter}
+_limiter: RateLimiter | None = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        try:
+            _limiter = limiters[settings.RATE_LIMIT_BACKEND]()
+        except KeyError:
+            raise ValueError(f"Unknown rate limit backend '{settings.RATE_LIMIT_BACKEND}'")
+    return _limiter
+
+
+async def _subject(request: Request, scope: str) -> str | None:
+    if scope == "ip":
+        return request.client.host if request.client else None
+    if scope == "phone":
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        phone = body.get("phone") if isinstance(body, dict) else None
+        return phone if isinstance(phone, str) else None  # anything else fails validation anyway
+    if scope == "user":
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        payload = decode_token(token) if scheme.lower() == "bearer" else None
+        return payload.get("sub") if payload else None
+    raise ValueError(f"Unknown rate limit scope '{scope}'")
+
+
+def rate_limit(name: str, *limits: Limit):
+    """Route dependency enforcing every limit in `limits` for the route `name`.
+
+    A request with no subject for a scope (no phone in the body, no valid
+    token) isn't counted there; validation and auth reject it afterwards.
+    """
+
+    async def check(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        limiter = get_rate_limiter()
+        for limit in limits:
+            subject = await _subject(request, limit.scope)
+            if subject is None:
+                continue
+            # Hashed: the body's phone can be any length, and keys are stored (String(200) in postgres)
+            digest = hashlib.sha256(subject.encode()).hexdigest()
+            wait = await limiter.hit(f"{name}:{limit.scope}:{digest}", limit)
+            if wait:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Слишком много запросов, попробуйте позже",
+                    headers={"Retry-After": str(max(int(wait + 0.999), 1))},
+                )
+
+    return Depends(check)
+
+
+@leader_only("rate_limits")
+async def purge_rate_limits():
+    """Delete shared buckets nobody has touched for a day (they are full anyway); Postgres backend only."""
+    from app.core.database import async_session
+
+    while True:
+        try:
+            async with async_session() as db:
+                await db.execute(
+                    text("DELETE FROM rate_limits WHERE updated_at < :cutoff"),
+                    {"cutoff": datetime.now(timezone.utc) - timedelta(hours=STALE_BUCKET_HOURS)},
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"[RateLimit] Error: {e}")
+        await asyncio.sleep(3600)
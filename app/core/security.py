@@ -1,5 +1,10 @@
+import hashlib
 import random
 import string
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
 from datetime import datetime, timedelta, timezone
 
 from jose import JWTError, jwt
@@ -11,21 +16,93 @@ def generate_otp() -> str:
     return "".join(random.choices(string.digits, k=settings.OTP_LENGTH))
 
 
-def create_access_token(user_id: str) -> str:
-    expire = datetime.now(timezone.utc) + timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS)
-    payload = {"sub": user_id, "exp": expire, "type": "access"}
+def _token(user_id: str, session_id: str, kind: str, lifetime: timedelta) -> str:
+    payload = {
+        "sub": user_id,
+        "exp": datetime.now(timezone.utc) + lifetime,
+        "type": kind,
+        "sid": session_id,
+        # Unique per token: two tokens issued in the same second still differ
+        "jti": uuid.uuid4().hex,
+    }
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
-def create_refresh_token(user_id: str) -> str:
-    expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    payload = {"sub": user_id, "exp": expire, "type": "refresh"}
-    return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+def create_access_token(user_id: str, session_id: str) -> str:
+    return _token(user_id, session_id, "access", timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS))
 
 
-def decode_token(token: str) -> dict | None:
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+def create_refresh_token(user_id: str, session_id: str) -> str:
+    return _token(user_id, session_id, "refresh", timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+
+
+class TokenCache:
+    """Bounded LRU of verified token payloads, keyed by the token's SHA-256.
+
+    An entry is served until the token's `exp`; only tokens that verified are
+    stored, so garbage can't push real ones out.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[bytes, dict] = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self.key(token)
+        payload = self.entries.get(key)
+        if payload is None:
+            return None
+        if payload["exp"] <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
         return payload
-    except JWTError:
+
+    def put(self, token: str, payload: dict):
+        if self.maxsize <= 0 or "exp" not in payload:
+            return
+        key = self.key(token)
+        self.entries[key] = payload
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def discard(self, token: str):
+        self.entries.pop(self.key(token), None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+_is_revoked: Callable[[dict], bool] | None = None
+
+
+def set_revocation_check(check: Callable[[dict], bool] | None):
+    """Register `check(payload) -> bool`, consulted on every decode, cached or not.
+
+    It must be cheap and must not block (it runs on the event loop).
+    """
+    global _is_revoked
+    _is_revoked = check
+
+
+def decode_token(token: str) -> dict | None:
+    """Verified claims of `token`, or None if it is invalid, expired or revoked.
+
+    The returned dict may be shared with the cache: don't modify it.
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        token_cache.put(token, payload)
+    if _is_revoked is not None and _is_revoked(payload):
         return None
+    return payload
@@ -7,8 +7,14 @@ from fastapi.openapi.utils import get_openapi
 from fastapi.staticfiles import StaticFiles
 
 from app.core.config import settings
+from app.core.leader import INSTANCE_ID, leadership_status
+from app.core.security import set_revocation_check
 from app.routers import api_router
-from app.services.auto_complete import auto_complete_deals
+from app.services.contracts import shutdown_executor
+from app.services.sessions import denylist_refresher, is_revoked
+from app.services.sms import close_sms_client, get_sms_sender, start_sms_client
+from app.services.uploads import check_upload_dirs
+from app.worker import start_background_tasks
 
 TAGS_METADATA = [
     {"name": "Auth", "description": "OTP-авторизация по номеру телефона (Казахстан). SMS через Mobizon."},
@@ -20,7 +26,9 @@ TAGS_METADATA = [
     {"name": "Chats", "description": "REST API чатов: список, создание, сообщения, офферы. Для real-time используйте WebSocket."},
     {"name": "Offers", "description": "Офферы: отправленные и полученные, статусы (pending, viewed, accepted, declined, cancelled), просмотр, отмена."},
     {"name": "Deals", "description": "Сделки: подписание договора через SMS, оплата на эскроу, сдача работы, подтверждение (24ч таймер), диспут, комиссия 10%."},
+    {"name": "Payments", "description": "Вебхуки платёжного провайдера. Проверка платежа выполняется асинхронно воркером."},
     {"name": "Notifications", "description": "Уведомления пользователя."},
+    {"name": "Stats", "description": "Статистика заработка и расходов пользователя по дням и валютам (из предрасчитанных агрегатов)."},
     {"name": "Reviews", "description": "Отзывы между креаторами и рекламодателями после завершения сделки."},
     {"name": "Upload", "description": "Загрузка файлов (аватар, логотип, портфолио, работа)."},
     {"name": "Tags", "description": "Список доступных категорий, отраслей, платформ, городов для фильтрации."},
@@ -88,19 +96,50 @@ ws://localhost:8000/v1/ws?token=<jwt_access_token>
 ```json
 {"event": "messages_read", "data": {"chat_id": "uuid", "read_by": "uuid", "read_at": "2025-01-13T14:32:00Z"}}
 ```
+
+`chat_updated` (персональный счётчик непрочитанных и превью — вместо опроса `GET /chats`):
+```json
+{"event": "chat_updated", "data": {"chat_id": "uuid", "unread_count": 3, "last_message": {"content": "Привет!", "type": "text", "created_at": "2025-01-13T14:32:00Z"}, "updated_at": "2025-01-13T14:32:00Z"}}
+```
+
+`offer_created`:
+```json
+{"event": "offer_created", "data": {"id": "uuid", "chat_id": "uuid", "message_id": "uuid", "sender_id": "uuid", "recipient_id": "uuid", "order_id": "uuid", "order_title": "...", "budget": 100000, "deadline": "2025-02-01T00:00:00Z", "status": "pending", "created_at": "2025-01-13T14:32:00Z"}}
+```
+
+`offer_status_changed` (view / cancel / accept / decline — вместо опроса `GET /offers/my/*`):
+```json
+{"event": "offer_status_changed", "data": {"id": "uuid", "chat_id": "uuid", "status": "viewed", "viewed_at": "2025-01-13T14:32:00Z", "cancelled_at": null}}
+```
+
+`deal_created`:
+```json
+{"event": "deal_created", "data": {"id": "uuid", "offer_id": "uuid", "order_id": "uuid", "creator_id": "uuid", "advertiser_id": "uuid", "budget": 100000, "status": "contract_pending", "created_at": "2025-01-13T14:32:00Z"}}
+```
 """
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    task = asyncio.create_task(auto_complete_deals())
+    check_upload_dirs()
+    start_sms_client()
+    # Every API process keeps its own copy of the revoked-session list
+    tasks = [asyncio.create_task(denylist_refresher())]
+    if settings.RUN_BACKGROUND_JOBS:
+        tasks += start_background_tasks()
     yield
-    task.cancel()
-    try:
-        await task
-    except asyncio.CancelledError:
-        pass
+    for task in tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    shutdown_executor()
+    await close_sms_client()
 
 
+# Tokens of revoked sessions are refused by decode_token (HTTP and WebSocket alike)
+set_revocation_check(is_revoked)
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
@@ -128,3 +167,9 @@ app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR, check_dir=False
 async def health():
     """Проверка работоспособности сервера."""
     return {"status": "ok"}
+
+
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """Состояние процесса: какие фоновые задачи он сейчас выполняет как лидер, вызовы SMS-шлюза."""
+    return {"instance": INSTANCE_ID, "leadership": leadership_status(), "sms": get_sms_sender().snapshot()}
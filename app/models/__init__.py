@@ -1,14 +1,24 @@
+from app.models.blob import Blob
 from app.models.chat import Chat, Message, Offer
-from app.models.deal import Deal, DealSignature, SubmittedWork, WorkRequirement
+from app.models.deal import Deal, DealEvent, DealReminder, DealSignature, SubmittedWork, WorkRequirement
+from app.models.job import Job
+from app.models.ledger import LedgerAccount, LedgerEntry, Payout
 from app.models.notification import Notification
 from app.models.order import Order
+from app.models.payment import Payment, PaymentEvent
+from app.models.rate_limit import RateLimitBucket
 from app.models.otp import OTPCode
 from app.models.response import Response
+from app.models.session import UserSession
 from app.models.review import Review
+from app.models.sms import SmsMessage
+from app.models.stats import DailyDealStat, DailyOrderStat
+from app.models.upload import UploadSession
 from app.models.user import AdvertiserProfile, CreatorProfile, User
 
 __all__ = [
     "User",
+    "UserSession",
     "CreatorProfile",
     "AdvertiserProfile",
     "Order",
@@ -17,10 +27,24 @@ __all__ = [
     "Message",
     "Offer",
     "Deal",
+    "DealEvent",
+    "DealReminder",
     "DealSignature",
     "WorkRequirement",
     "SubmittedWork",
     "Notification",
     "Review",
     "OTPCode",
+    "SmsMessage",
+    "Job",
+    "LedgerEntry",
+    "LedgerAccount",
+    "Payout",
+    "Payment",
+    "PaymentEvent",
+    "RateLimitBucket",
+    "Blob",
+    "UploadSession",
+    "DailyDealStat",
+    "DailyOrderStat",
 ]
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class Blob(Base):
+    """An uploaded file stored once per content, at `UPLOAD_DIR/<path>` (app.services.blobs)."""
+
+    __tablename__ = "blobs"
+    __table_args__ = (
+        # Garbage collection: unreferenced blobs past the grace period
+        Index("ix_blobs_refcount_last_uploaded_at", "refcount", "last_uploaded_at"),
+    )
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    path: Mapped[str] = mapped_column(String(200), nullable=False)  # blobs/<sha[:2]>/<sha><ext>
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    # Upload type; one the GC can't see references for (portfolio, work) wins over the others.
+    # NULL for blobs stored before types were recorded, which are never collected either.
+    type: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    # Rows pointing at the blob (avatars, logos, submitted work, messages); recounted by the GC
+    refcount: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # Refreshed by every upload of the same content, so a blob isn't collected right after being handed out
+    last_uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    @property
+    def url(self) -> str:
+        return f"/uploads/{self.path}"
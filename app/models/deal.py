@@ -1,8 +1,9 @@
 import uuid
 from datetime import date, datetime, timezone
 
-from sqlalchemy import Boolean, Date, DateTime, Integer, String
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import DDL, Boolean, Date, DateTime, Index, Integer, String, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.event import listen
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.database import Base
@@ -10,6 +11,15 @@ from app.core.database import Base
 
 class Deal(Base):
     __tablename__ = "deals"
+    __table_args__ = (
+        # Keyset pagination of GET /deals per side of the deal
+        Index("ix_deals_creator_id_created_at", "creator_id", "created_at"),
+        Index("ix_deals_advertiser_id_created_at", "advertiser_id", "created_at"),
+        # Deadline sweeps: in_progress deals by deadline
+        Index("ix_deals_status_deadline", "status", "deadline"),
+        # Completed deals still waiting for a payout batch
+        Index("ix_deals_unpaid", "creator_id", postgresql_where=text("status = 'completed' AND payout_id IS NULL")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     order_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
@@ -31,6 +41,8 @@ class Deal(Base):
     paid_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     work_submitted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     dispute_reason: Mapped[str | None] = mapped_column(String, nullable=True)
+    payout_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -71,3 +83,44 @@ class SubmittedWork(Base):
     duration: Mapped[str | None] = mapped_column(String(20), nullable=True)
     format: Mapped[str | None] = mapped_column(String(10), nullable=True)
     uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class DealEvent(Base):
+    """Append-only history of a deal, one row per transition."""
+
+    __tablename__ = "deal_events"
+    __table_args__ = (
+        Index("ix_deal_events_deal_id_created_at", "deal_id", "created_at"),
+        # Monthly range partitions (see app.services.partitions); old months can be detached whole
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # The partition key has to be part of the primary key
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc)
+    )
+    deal_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    event: Mapped[str] = mapped_column(String(30), nullable=False)
+    from_status: Mapped[str | None] = mapped_column(String(30), nullable=True)
+    to_status: Mapped[str] = mapped_column(String(30), nullable=False)
+    actor_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)  # None — the system
+    data: Mapped[dict] = mapped_column(JSONB, default=dict)
+
+
+class DealReminder(Base):
+    """A deadline reminder already sent for a deal; the primary key makes sweeps idempotent."""
+
+    __tablename__ = "deal_reminders"
+
+    deal_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(20), primary_key=True)  # due_soon | overdue
+    sent_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+# Catch-all partition so inserts never fail when a month has not been created yet
+listen(
+    DealEvent.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS deal_events_default PARTITION OF deal_events DEFAULT"),
+)
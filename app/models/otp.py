@@ -1,19 +1,34 @@
-import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, DateTime, String
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import DDL, DateTime, String
+from sqlalchemy.event import listen
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.database import Base
 
 
 class OTPCode(Base):
+    """Issued login codes for the Postgres OTP store (app.services.otp)."""
+
     __tablename__ = "otp_codes"
+    __table_args__ = (
+        # Daily range partitions (see app.services.partitions); expired days are dropped whole
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    phone: Mapped[str] = mapped_column(String(15), nullable=False)
-    code: Mapped[str] = mapped_column(String(7), nullable=False)
+    # Lookups are by phone within the last few minutes: the primary key is the index
+    phone: Mapped[str] = mapped_column(String(15), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc)
+    )
+    code_hash: Mapped[str] = mapped_column(String(64), nullable=False)
     expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
-    is_used: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    used_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+# Catch-all partition so inserts never fail when a day has not been created yet
+listen(
+    OTPCode.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS otp_codes_default PARTITION OF otp_codes DEFAULT"),
+)
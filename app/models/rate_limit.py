@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Boolean, DateTime, Float, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class RateLimitBucket(Base):
+    """Shared token bucket for app.core.rate_limit's Postgres backend."""
+
+    __tablename__ = "rate_limits"
+    # Buckets are disposable: skip the WAL, losing them on a crash only resets limits
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key: Mapped[str] = mapped_column(String(200), primary_key=True)  # route:scope:subject
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    allowed: Mapped[bool] = mapped_column(Boolean, nullable=False)  # outcome of the latest hit
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
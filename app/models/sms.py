@@ -0,0 +1,31 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class SmsMessage(Base):
+    """One outgoing SMS and its delivery status; sent by the `sms.send` job."""
+
+    __tablename__ = "sms_messages"
+    __table_args__ = (
+        # Support lookups: "did my code go out?"
+        Index("ix_sms_messages_phone_created_at", "phone", "created_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    phone: Mapped[str] = mapped_column(String(15), nullable=False)
+    text: Mapped[str] = mapped_column(String, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default="queued")  # queued | retrying | sent | failed | expired
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    provider: Mapped[str | None] = mapped_column(String(20), nullable=True)  # the one that delivered it
+    provider_message_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Codes are useless once expired, so a message still queued past this is dropped
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,39 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class DailyDealStat(Base):
+    """Per-user daily totals of deals reaching a status, one row per side of the deal.
+
+    Maintained incrementally by app.services.stats; rebuildable from `deals`.
+    """
+
+    __tablename__ = "daily_deal_stats"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    role: Mapped[str] = mapped_column(String(20), primary_key=True)  # creator | advertiser
+    currency: Mapped[str] = mapped_column(String(3), primary_key=True)
+    status: Mapped[str] = mapped_column(String(30), primary_key=True)
+    deal_count: Mapped[int] = mapped_column(Integer, default=0)
+    amount: Mapped[int] = mapped_column(BigInteger, default=0)  # sum of budgets
+    platform_fee: Mapped[int] = mapped_column(BigInteger, default=0)
+    creator_payout: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class DailyOrderStat(Base):
+    """Per-advertiser daily totals of created orders."""
+
+    __tablename__ = "daily_order_stats"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    currency: Mapped[str] = mapped_column(String(3), primary_key=True)
+    order_count: Mapped[int] = mapped_column(Integer, default=0)
+    budget: Mapped[int] = mapped_column(BigInteger, default=0)
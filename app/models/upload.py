@@ -0,0 +1,37 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class UploadSession(Base):
+    """A resumable upload: the file is sent in chunks to `UPLOAD_TMP_DIR/<id>.part` (app.services.uploads)."""
+
+    __tablename__ = "upload_sessions"
+    __table_args__ = (
+        # Garbage collection of abandoned uploads
+        Index("ix_upload_sessions_expires_at", "expires_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    type: Mapped[str] = mapped_column(String(20), nullable=False)  # avatar | logo | portfolio | work
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    content_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)  # declared up front
+    offset: Mapped[int] = mapped_column(BigInteger, default=0)  # bytes stored so far
+    # Optional checksum from the client, checked on finalize
+    expected_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    status: Mapped[str] = mapped_column(String(20), default="uploading")  # uploading | completed
+    url: Mapped[str | None] = mapped_column(String(500), nullable=True)  # set once completed
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # Pushed forward by every chunk; abandoned uploads are deleted after it
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc)
+    )
@@ -9,9 +9,11 @@ from app.routers import (
     notifications,
     offers,
     orders,
+    payments,
     profile,
     responses,
     reviews,
+    stats,
     tags,
     upload,
     ws,
@@ -28,8 +30,10 @@ api_router.include_router(responses.router)
 api_router.include_router(chats.router)
 api_router.include_router(offers.router)
 api_router.include_router(deals.router)
+api_router.include_router(payments.router)
 api_router.include_router(notifications.router)
 api_router.include_router(reviews.router)
+api_router.include_router(stats.router)
 api_router.include_router(upload.router)
 api_router.include_router(tags.router)
 api_router.include_router(ws.router)
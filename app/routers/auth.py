@@ -1,24 +1,33 @@
+import uuid
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.core.security import create_access_token, create_refresh_token, decode_token, generate_otp
-from app.models.otp import OTPCode
+from app.core.deps import get_current_user, get_token_payload
+from app.core.rate_limit import Limit, rate_limit
+from app.core.security import decode_token, generate_otp
+from app.models.session import UserSession
 from app.models.user import User
 from app.schemas.auth import (
     ErrorResponse,
+    LogoutResponse,
     RefreshTokenRequest,
     RefreshTokenResponse,
     SendOTPRequest,
     SendOTPResponse,
+    SessionResponse,
     UserBrief,
     VerifyOTPRequest,
     VerifyOTPResponse,
 )
 from app.core.config import settings
+from app.services.jobs import PRIORITY_HIGH
+from app.services.otp import get_otp_store
+from app.services.sessions import open_session, revoke_session, rotate_session, token_hash
+from app.services.sms import otp_sms_text, queue_sms
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -27,42 +36,23 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
     "/send-otp",
     response_model=SendOTPResponse,
     responses={429: {"model": ErrorResponse, "description": "Rate limit — 1 запрос в 60 сек на номер"}},
+    dependencies=[rate_limit("send_otp", Limit("phone", 5, 3600), Limit("ip", 30, 3600))],
     summary="Отправить OTP-код",
     description="Отправляет 6-значный SMS-код через Mobizon. Формат номера: `+7XXXXXXXXXX`. Код живёт 5 минут. Rate limit: 1 запрос в 60 секунд на номер.",
 )
 async def send_otp(body: SendOTPRequest, db: AsyncSession = Depends(get_db)):
-    # Rate limit: check last OTP for this phone
-    result = await db.execute(
-        select(OTPCode)
-        .where(OTPCode.phone == body.phone, OTPCode.is_used == False)
-        .order_by(OTPCode.created_at.desc())
-        .limit(1)
-    )
-    last_otp = result.scalar_one_or_none()
-
-    if last_otp:
-        seconds_since = (datetime.now(timezone.utc) - last_otp.created_at).total_seconds()
-        if seconds_since < settings.OTP_RATE_LIMIT_SECONDS:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Подождите {int(settings.OTP_RATE_LIMIT_SECONDS - seconds_since)} секунд",
-            )
-
     code = generate_otp()
-    otp = OTPCode(
-        phone=body.phone,
-        code=code,
-        expires_at=datetime.now(timezone.utc) + timedelta(minutes=settings.OTP_EXPIRE_MINUTES),
-    )
-    db.add(otp)
-    await db.commit()
-
-    # Send SMS via Mobizon
-    from app.services.sms import send_otp_sms
+    wait = await get_otp_store().issue(db, body.phone, code)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Подождите {int(wait)} секунд",
+        )
 
-    sent = await send_otp_sms(body.phone, code)
-    if not sent:
-        print(f"[OTP] Mobizon failed, fallback log — {body.phone}: {code}")
+    # SMS goes out from the worker — the request never waits on Mobizon
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.OTP_EXPIRE_MINUTES)
+    queue_sms(db, body.phone, otp_sms_text(code), priority=PRIORITY_HIGH, expires_at=expires_at)
+    await db.commit()
 
     return SendOTPResponse()
 
@@ -71,25 +61,15 @@ async def send_otp(body: SendOTPRequest, db: AsyncSession = Depends(get_db)):
     "/verify-otp",
     response_model=VerifyOTPResponse,
     responses={400: {"model": ErrorResponse, "description": "Неверный или истёкший код"}},
+    # Brute-force protection: a handful of guesses per code lifetime
+    dependencies=[rate_limit("verify_otp", Limit("phone", 5, 300), Limit("ip", 50, 300))],
     summary="Верификация OTP-кода",
     description="Проверяет OTP-код. Если пользователь новый — создаёт запись. Возвращает `token` (30 дней) и `refresh_token` (90 дней). Если `role == null` — клиент показывает экран выбора роли.",
 )
-async def verify_otp(body: VerifyOTPRequest, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(OTPCode).where(
-            OTPCode.phone == body.phone,
-            OTPCode.code == body.code,
-            OTPCode.is_used == False,
-            OTPCode.expires_at > datetime.now(timezone.utc),
-        )
-    )
-    otp = result.scalar_one_or_none()
-
-    if not otp:
+async def verify_otp(body: VerifyOTPRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    if not await get_otp_store().verify(db, body.phone, body.code):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный или истёкший код")
 
-    otp.is_used = True
-
     # Find or create user
     result = await db.execute(select(User).where(User.phone == body.phone))
     user = result.scalar_one_or_none()
@@ -97,13 +77,12 @@ async def verify_otp(body: VerifyOTPRequest, db: AsyncSession = Depends(get_db))
     if not user:
         user = User(phone=body.phone)
         db.add(user)
+        await db.flush()
 
+    token, refresh = open_session(db, user.id, request.headers.get("user-agent"))
     await db.commit()
     await db.refresh(user)
 
-    token = create_access_token(str(user.id))
-    refresh = create_refresh_token(str(user.id))
-
     return VerifyOTPResponse(
         token=token,
         refresh_token=refresh,
@@ -122,21 +101,92 @@ async def verify_otp(body: VerifyOTPRequest, db: AsyncSession = Depends(get_db))
     "/refresh",
     response_model=RefreshTokenResponse,
     responses={401: {"model": ErrorResponse, "description": "Неверный refresh token"}},
+    dependencies=[rate_limit("refresh", Limit("ip", 60, 60))],
     summary="Обновить токены",
-    description="Выдаёт новую пару `token` + `refresh_token` по действующему refresh_token.",
+    description="Выдаёт новую пару `token` + `refresh_token` по действующему refresh_token. Refresh token одноразовый: повторное использование старого токена завершает сессию устройства.",
 )
 async def refresh_token(body: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
     payload = decode_token(body.refresh_token)
-    if payload is None or payload.get("type") != "refresh":
+    if payload is None or payload.get("type") != "refresh" or "sid" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный refresh token")
 
-    user_id = payload.get("sub")
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if not user:
+    # Locked so two refreshes with the same token can't both rotate
+    result = await db.execute(
+        select(UserSession).where(UserSession.id == uuid.UUID(payload["sid"])).with_for_update()
+    )
+    session = result.scalar_one_or_none()
+    now = datetime.now(timezone.utc)
+    if session is None or session.revoked_at is not None or session.expires_at <= now:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Сессия завершена")
+    if session.refresh_token_hash != token_hash(body.refresh_token):
+        # An already-rotated token: someone else holds a copy. End the session for both.
+        await revoke_session(db, str(session.id))
+        await db.commit()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token уже использован")
+
+    result = await db.execute(select(User).where(User.id == session.user_id))
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Пользователь не найден")
 
-    return RefreshTokenResponse(
-        token=create_access_token(str(user.id)),
-        refresh_token=create_refresh_token(str(user.id)),
+    token, refresh = rotate_session(session)
+    await db.commit()
+    return RefreshTokenResponse(token=token, refresh_token=refresh)
+
+
+@router.post(
+    "/logout",
+    response_model=LogoutResponse,
+    responses={401: {"model": ErrorResponse, "description": "Неверный токен"}},
+    summary="Выйти",
+    description="Завершает сессию текущего устройства: его `token` и `refresh_token` перестают действовать.",
+)
+async def logout(payload: dict = Depends(get_token_payload), db: AsyncSession = Depends(get_db)):
+    await revoke_session(db, payload["sid"])
+    await db.commit()
+    return LogoutResponse()
+
+
+@router.get(
+    "/sessions",
+    response_model=list[SessionResponse],
+    summary="Активные устройства",
+    description="Сессии пользователя, в которых он сейчас авторизован. `is_current` — устройство, с которого сделан запрос.",
+)
+async def list_sessions(
+    payload: dict = Depends(get_token_payload),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await db.execute(
+        select(UserSession)
+        .where(
+            UserSession.user_id == user.id,
+            UserSession.revoked_at.is_(None),
+            UserSession.expires_at > datetime.now(timezone.utc),
+        )
+        .order_by(UserSession.last_used_at.desc())
     )
+    return [
+        SessionResponse(
+            id=str(s.id),
+            device=s.device,
+            created_at=s.created_at,
+            last_used_at=s.last_used_at,
+            is_current=str(s.id) == payload["sid"],
+        )
+        for s in result.scalars()
+    ]
+
+
+@router.delete(
+    "/sessions/{session_id}",
+    response_model=LogoutResponse,
+    responses={404: {"model": ErrorResponse, "description": "Сессия не найдена"}},
+    summary="Завершить сессию устройства",
+    description="Выход на другом устройстве (например, потерянном телефоне).",
+)
+async def end_session(session_id: uuid.UUID, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if not await revoke_session(db, str(session_id), user_id=user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Сессия не найдена")
+    await db.commit()
+    return LogoutResponse()
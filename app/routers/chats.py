@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.deps import get_current_user, require_role
+from app.core.rate_limit import Limit, rate_limit
 from app.models.chat import Chat, Message, Offer
 from app.models.deal import Deal
 from app.models.order import Order
@@ -27,6 +28,8 @@ from app.schemas.chat import (
     SendMessageRequest,
     SendOfferRequest,
 )
+from app.services import events
+from app.services.deal_state import record_event
 
 router = APIRouter(prefix="/chats", tags=["Chats"])
 
@@ -93,7 +96,7 @@ async def list_chats(
     return ChatListResponse(data=data)
 
 
-@router.post("", response_model=CreateChatResponse, status_code=status.HTTP_201_CREATED, summary="Создать чат", description="Создаёт чат между двумя пользователями в контексте заказа. Если чат уже существует — возвращает его.")
+@router.post("", response_model=CreateChatResponse, dependencies=[rate_limit("create_chat", Limit("user", 30, 60))], status_code=status.HTTP_201_CREATED, summary="Создать чат", description="Создаёт чат между двумя пользователями в контексте заказа. Если чат уже существует — возвращает его.")
 async def create_chat(
     body: CreateChatRequest,
     user: User = Depends(get_current_user),
@@ -163,7 +166,8 @@ async def get_messages(
             or_(Chat.participant_1 == user.id, Chat.participant_2 == user.id),
         )
     )
-    if not result.scalar_one_or_none():
+    chat = result.scalar_one_or_none()
+    if not chat:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Чат не найден")
 
     query = select(Message).where(Message.chat_id == chat_id)
@@ -178,11 +182,16 @@ async def get_messages(
     messages = messages[:limit]
 
     # Mark as read
+    marked = False
     for msg in messages:
         if str(msg.sender_id) != str(user.id) and msg.read_at is None:
             msg.read_at = datetime.now(timezone.utc)
+            marked = True
     await db.commit()
 
+    if marked:
+        await events.emit_chat_updated(db, chat, [user.id])
+
     return MessageListResponse(
         data=[
             MessageItem(
@@ -200,7 +209,7 @@ async def get_messages(
     )
 
 
-@router.post("/{chat_id}/messages", response_model=MessageItem, status_code=status.HTTP_201_CREATED, summary="Отправить сообщение", description="Отправка текстового сообщения в чат через REST. Для real-time используйте WebSocket.")
+@router.post("/{chat_id}/messages", response_model=MessageItem, dependencies=[rate_limit("send_message", Limit("user", 60, 60))], status_code=status.HTTP_201_CREATED, summary="Отправить сообщение", description="Отправка текстового сообщения в чат через REST. Для real-time используйте WebSocket.")
 async def send_message(
     chat_id: str,
     body: SendMessageRequest,
@@ -223,6 +232,9 @@ async def send_message(
     await db.commit()
     await db.refresh(msg)
 
+    await events.emit_new_message(chat, msg)
+    await events.emit_chat_updated(db, chat)
+
     return MessageItem(
         id=str(msg.id),
         chat_id=str(msg.chat_id),
@@ -233,7 +245,7 @@ async def send_message(
     )
 
 
-@router.post("/{chat_id}/offer", response_model=OfferMessageResponse, status_code=status.HTTP_201_CREATED, summary="Отправить оффер", description="Рекламодатель отправляет оффер креатору через чат. Указывается бюджет, дедлайн, описание контента.")
+@router.post("/{chat_id}/offer", response_model=OfferMessageResponse, dependencies=[rate_limit("send_offer", Limit("user", 30, 60))], status_code=status.HTTP_201_CREATED, summary="Отправить оффер", description="Рекламодатель отправляет оффер креатору через чат. Указывается бюджет, дедлайн, описание контента.")
 async def send_offer(
     chat_id: str,
     body: SendOfferRequest,
@@ -289,6 +301,10 @@ async def send_offer(
     await db.refresh(offer)
     await db.refresh(msg)
 
+    await events.emit_new_message(chat, msg)
+    await events.emit_offer_created(offer, order.title if order else None)
+    await events.emit_chat_updated(db, chat)
+
     return OfferMessageResponse(
         id=str(msg.id),
         chat_id=str(chat.id),
@@ -324,6 +340,7 @@ async def respond_to_offer(
     if offer.status != "pending":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Оффер уже обработан")
 
+    deal = None
     deal_id = None
 
     # Mark as viewed if not yet
@@ -356,6 +373,7 @@ async def respond_to_offer(
         )
         db.add(deal)
         await db.flush()
+        record_event(db, deal, "created", None, user.id, {"offer_id": str(offer.id), "budget": deal.budget})
         deal_id = str(deal.id)
 
     elif body.action == "decline":
@@ -365,6 +383,10 @@ async def respond_to_offer(
 
     await db.commit()
 
+    await events.emit_offer_status_changed(offer)
+    if deal:
+        await events.emit_deal_created(deal)
+
     return RespondOfferResponse(
         offer_id=str(offer.id),
         status=offer.status,
@@ -1,15 +1,21 @@
+import base64
 import random
 import string
+import uuid
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import or_, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy import or_, select, tuple_, union_all
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from app.core.config import settings
 from app.core.database import get_db
 from app.core.deps import get_current_user, require_role
-from app.models.deal import Deal, DealSignature, SubmittedWork, WorkRequirement
+from app.core.rate_limit import Limit, rate_limit
+from app.models.deal import Deal, DealEvent, DealSignature, SubmittedWork, WorkRequirement
 from app.models.order import Order
 from app.models.user import AdvertiserProfile, CreatorProfile, User
 from app.schemas.deal import (
@@ -18,9 +24,11 @@ from app.schemas.deal import (
     DealAdvertiserBrief,
     DealCreatorBrief,
     DealDetail,
+    DealEventItem,
     DealListItem,
     DealListResponse,
     DealOrderBrief,
+    DealTimelineResponse,
     DisputeDealRequest,
     DisputeDealResponse,
     PayDealRequest,
@@ -35,7 +43,13 @@ from app.schemas.deal import (
     SubmittedWorkItem,
     WorkRequirementItem,
 )
-from app.services.sms import send_sms
+from app.services import ledger, stats
+from app.services.auto_complete import schedule_auto_complete
+from app.services.contracts import contract_digest, contract_pdf
+from app.services.deal_state import ConcurrentUpdate, can_transition, transition
+from app.services.jobs import PRIORITY_HIGH
+from app.services.payments import start_payment
+from app.services.sms import queue_sms
 
 router = APIRouter(prefix="/deals", tags=["Deals"])
 
@@ -44,18 +58,15 @@ def _generate_sms_code() -> str:
     return "".join(random.choices(string.digits, k=6))
 
 
-async def _deal_creator_brief(db: AsyncSession, creator_id) -> DealCreatorBrief:
-    result = await db.execute(select(User).where(User.id == creator_id))
-    u = result.scalar_one_or_none()
-    return DealCreatorBrief(id=str(creator_id), name=u.name if u else None, avatar_url=u.avatar_url if u else None)
-
-
-async def _deal_advertiser_brief(db: AsyncSession, advertiser_id) -> DealAdvertiserBrief:
-    result = await db.execute(select(AdvertiserProfile).where(AdvertiserProfile.user_id == advertiser_id))
-    p = result.scalar_one_or_none()
-    return DealAdvertiserBrief(
-        id=str(advertiser_id), company_name=p.company_name if p else None, logo_url=p.logo_url if p else None
-    )
+async def _transition(db: AsyncSession, deal: Deal, event: str, **values) -> Deal:
+    try:
+        return await transition(db, deal, event, **values)
+    except ConcurrentUpdate:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Сделка была изменена другим запросом. Обновите данные и повторите",
+        )
 
 
 async def _get_user_deal(db: AsyncSession, deal_id: str, user_id) -> Deal:
@@ -75,50 +86,91 @@ async def _get_user_deal(db: AsyncSession, deal_id: str, user_id) -> Deal:
 # LIST / DETAIL
 # ──────────────────────────────────────────────
 
+def _encode_cursor(deal: Deal) -> str:
+    raw = f"{deal.created_at.isoformat()}|{deal.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        created_at, deal_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(deal_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный курсор")
+
+
 @router.get(
     "",
     response_model=DealListResponse,
     summary="Список сделок",
-    description="Все сделки текущего пользователя (как креатор или рекламодатель). Фильтр по статусу.",
+    description="Сделки текущего пользователя (как креатор или рекламодатель), новые первыми. Фильтр по статусу. "
+    "Курсорная пагинация: передайте `next_cursor` из ответа в `cursor`.",
 )
 async def list_deals(
     deal_status: str | None = Query(None, alias="status"),
-    page: int = Query(1, ge=1),
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    query = select(Deal).where(or_(Deal.creator_id == user.id, Deal.advertiser_id == user.id))
-    if deal_status:
-        query = query.where(Deal.status == deal_status)
-    query = query.order_by(Deal.created_at.desc())
-
-    result = await db.execute(query)
-    deals = result.scalars().all()
-
-    data = []
-    for deal in deals:
-        order_result = await db.execute(select(Order).where(Order.id == deal.order_id))
-        order = order_result.scalar_one_or_none()
-
-        data.append(
-            DealListItem(
-                id=str(deal.id),
-                order=DealOrderBrief(id=str(deal.order_id), title=order.title if order else ""),
-                creator=await _deal_creator_brief(db, deal.creator_id),
-                advertiser=await _deal_advertiser_brief(db, deal.advertiser_id),
-                budget=deal.budget,
-                currency=deal.currency,
-                deadline=deal.deadline,
-                conditions=deal.conditions,
-                start_date=deal.start_date,
-                end_date=deal.end_date,
-                video_count=deal.video_count,
-                status=deal.status,
-                created_at=deal.created_at,
-            )
+    after = _decode_cursor(cursor) if cursor else None
+
+    # One keyset branch per side so each walks its own (party_id, created_at) index
+    def _page_ids(party_column):
+        q = select(Deal.id).where(party_column == user.id)
+        if deal_status:
+            q = q.where(Deal.status == deal_status)
+        if after:
+            q = q.where(tuple_(Deal.created_at, Deal.id) < tuple_(*after))
+        return q.order_by(Deal.created_at.desc(), Deal.id.desc()).limit(limit + 1)
+
+    page = union_all(_page_ids(Deal.creator_id), _page_ids(Deal.advertiser_id)).subquery()
+
+    result = await db.execute(
+        select(
+            Deal,
+            Order.title,
+            User.name,
+            User.avatar_url,
+            AdvertiserProfile.company_name,
+            AdvertiserProfile.logo_url,
+        )
+        .join(page, page.c.id == Deal.id)
+        .outerjoin(Order, Order.id == Deal.order_id)
+        .outerjoin(User, User.id == Deal.creator_id)
+        .outerjoin(AdvertiserProfile, AdvertiserProfile.user_id == Deal.advertiser_id)
+        .order_by(Deal.created_at.desc(), Deal.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    data = [
+        DealListItem(
+            id=str(deal.id),
+            order=DealOrderBrief(id=str(deal.order_id), title=order_title or ""),
+            creator=DealCreatorBrief(id=str(deal.creator_id), name=creator_name, avatar_url=creator_avatar),
+            advertiser=DealAdvertiserBrief(id=str(deal.advertiser_id), company_name=company_name, logo_url=logo_url),
+            budget=deal.budget,
+            currency=deal.currency,
+            deadline=deal.deadline,
+            conditions=deal.conditions,
+            start_date=deal.start_date,
+            end_date=deal.end_date,
+            video_count=deal.video_count,
+            status=deal.status,
+            created_at=deal.created_at,
         )
+        for deal, order_title, creator_name, creator_avatar, company_name, logo_url in rows
+    ]
 
-    return DealListResponse(data=data)
+    return DealListResponse(
+        data=data,
+        next_cursor=_encode_cursor(rows[-1][0]) if has_more else None,
+        has_more=has_more,
+    )
 
 
 @router.get(
@@ -132,37 +184,34 @@ async def get_deal(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    deal = await _get_user_deal(db, deal_id, user.id)
-
-    order_result = await db.execute(select(Order).where(Order.id == deal.order_id))
-    order = order_result.scalar_one_or_none()
-
-    # Signatures
-    sig_result = await db.execute(select(DealSignature).where(DealSignature.deal_id == deal.id))
-    signatures = sig_result.scalars().all()
-    sig_items = []
-    for sig in signatures:
-        u_result = await db.execute(select(User).where(User.id == sig.user_id))
-        u = u_result.scalar_one_or_none()
-        sig_items.append(
-            SignatureItem(
-                user_id=str(sig.user_id),
-                name=u.name if u else None,
-                role=u.role if u else None,
-                status=sig.status,
-                signed_at=sig.signed_at,
-            )
-        )
-
-    # Work requirements
-    req_result = await db.execute(
-        select(WorkRequirement).where(WorkRequirement.deal_id == deal.id).order_by(WorkRequirement.sort_order)
+    # One query for the deal with its order, creator and advertiser briefs, then
+    # one per child collection, all on the request's connection.
+    deal_stmt = (
+        select(Deal, Order, User.name, User.avatar_url, AdvertiserProfile.company_name, AdvertiserProfile.logo_url)
+        .outerjoin(Order, Order.id == Deal.order_id)
+        .outerjoin(User, User.id == Deal.creator_id)
+        .outerjoin(AdvertiserProfile, AdvertiserProfile.user_id == Deal.advertiser_id)
+        .where(Deal.id == deal_id, or_(Deal.creator_id == user.id, Deal.advertiser_id == user.id))
     )
-    requirements = req_result.scalars().all()
+    row = (await db.execute(deal_stmt)).one_or_none()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Сделка не найдена")
+    deal, order, creator_name, creator_avatar, company_name, logo_url = row
 
-    # Submitted work
-    work_result = await db.execute(select(SubmittedWork).where(SubmittedWork.deal_id == deal.id))
-    submitted = work_result.scalars().all()
+    signer = aliased(User)
+    signatures = await db.execute(
+        select(DealSignature, signer.name, signer.role)
+        .outerjoin(signer, signer.id == DealSignature.user_id)
+        .where(DealSignature.deal_id == deal.id)
+    )
+    sig_items = [
+        SignatureItem(user_id=str(sig.user_id), name=name, role=role, status=sig.status, signed_at=sig.signed_at)
+        for sig, name, role in signatures
+    ]
+    requirements = (await db.scalars(
+        select(WorkRequirement).where(WorkRequirement.deal_id == deal.id).order_by(WorkRequirement.sort_order)
+    )).all()
+    submitted = (await db.scalars(select(SubmittedWork).where(SubmittedWork.deal_id == deal.id))).all()
 
     # Payment status
     if deal.paid_at:
@@ -179,8 +228,8 @@ async def get_deal(
             title=order.title if order else "",
             content_description=order.description if order else None,
         ),
-        creator=await _deal_creator_brief(db, deal.creator_id),
-        advertiser=await _deal_advertiser_brief(db, deal.advertiser_id),
+        creator=DealCreatorBrief(id=str(deal.creator_id), name=creator_name, avatar_url=creator_avatar),
+        advertiser=DealAdvertiserBrief(id=str(deal.advertiser_id), company_name=company_name, logo_url=logo_url),
         budget=deal.budget,
         currency=deal.currency,
         deadline=deal.deadline,
@@ -209,6 +258,111 @@ async def get_deal(
     )
 
 
+@router.get(
+    "/{deal_id}/timeline",
+    response_model=DealTimelineResponse,
+    summary="История сделки",
+    description="Все события сделки в хронологическом порядке: создание, подписи, оплата, сдача работы, подтверждение, диспут.",
+)
+async def get_deal_timeline(
+    deal_id: str,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    deal = await _get_user_deal(db, deal_id, user.id)
+
+    # No event predates the deal: the lower bound prunes older monthly partitions
+    result = await db.execute(
+        select(DealEvent)
+        .where(DealEvent.deal_id == deal.id, DealEvent.created_at >= deal.created_at)
+        .order_by(DealEvent.created_at, DealEvent.id)
+    )
+    return DealTimelineResponse(
+        deal_id=str(deal.id),
+        events=[
+            DealEventItem(
+                id=str(e.id),
+                event=e.event,
+                from_status=e.from_status,
+                to_status=e.to_status,
+                actor_id=str(e.actor_id) if e.actor_id else None,
+                data=e.data or {},
+                created_at=e.created_at,
+            )
+            for e in result.scalars().all()
+        ],
+    )
+
+
+@router.get(
+    "/{deal_id}/contract.pdf",
+    summary="Договор в PDF",
+    description="PDF договора: стороны, бюджет, условия, требования, подписи. Файл кешируется по содержимому — повторная загрузка не перерисовывает его. Поддерживает `If-None-Match`.",
+    response_class=FileResponse,
+    responses={200: {"content": {"application/pdf": {}}}},
+)
+async def get_contract_pdf(
+    deal_id: str,
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    deal_stmt = (
+        select(Deal, Order.title, User.name, AdvertiserProfile.company_name)
+        .outerjoin(Order, Order.id == Deal.order_id)
+        .outerjoin(User, User.id == Deal.creator_id)
+        .outerjoin(AdvertiserProfile, AdvertiserProfile.user_id == Deal.advertiser_id)
+        .where(Deal.id == deal_id, or_(Deal.creator_id == user.id, Deal.advertiser_id == user.id))
+    )
+    row = (await db.execute(deal_stmt)).one_or_none()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Сделка не найдена")
+    deal, order_title, creator_name, company_name = row
+
+    signer = aliased(User)
+    signatures = (await db.execute(
+        select(DealSignature, signer.name, signer.role)
+        .outerjoin(signer, signer.id == DealSignature.user_id)
+        .where(DealSignature.deal_id == deal.id)
+        .order_by(signer.role)
+    )).all()
+    requirements = (await db.scalars(
+        select(WorkRequirement.label).where(WorkRequirement.deal_id == deal.id).order_by(WorkRequirement.sort_order)
+    )).all()
+
+    # Everything printed on the contract, and nothing else: it is also the cache key
+    fields = {
+        "deal_id": str(deal.id),
+        "order_title": order_title or "",
+        "creator": creator_name or "",
+        "advertiser": company_name or "",
+        "budget": deal.budget,
+        "currency": deal.currency,
+        "deadline": deal.deadline.isoformat(),
+        "start_date": deal.start_date.isoformat() if deal.start_date else None,
+        "end_date": deal.end_date.isoformat() if deal.end_date else None,
+        "video_count": deal.video_count,
+        "conditions": deal.conditions,
+        "created_at": deal.created_at.isoformat(),
+        "requirements": list(requirements),
+        "signatures": [
+            {"name": name, "role": role, "status": sig.status, "signed_at": sig.signed_at.isoformat() if sig.signed_at else None}
+            for sig, name, role in signatures
+        ],
+    }
+    etag = f'"{contract_digest(fields)}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    path, _ = await contract_pdf(fields)
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=f"contract-{deal.id}.pdf",
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
+
+
 # ──────────────────────────────────────────────
 # CONTRACT SIGNING (SMS)
 # ──────────────────────────────────────────────
@@ -216,6 +370,7 @@ async def get_deal(
 @router.post(
     "/{deal_id}/request-sign",
     response_model=RequestSignResponse,
+    dependencies=[rate_limit("request_sign", Limit("user", 5, 600))],
     summary="Запросить SMS-код для подписания",
     description="Генерирует 6-значный SMS-код и отправляет на номер пользователя для подписания договора.",
 )
@@ -226,7 +381,7 @@ async def request_sign(
 ):
     deal = await _get_user_deal(db, deal_id, user.id)
 
-    if deal.status not in ("contract_pending", "contract_signed"):
+    if not can_transition(deal, "sign"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Договор нельзя подписать в текущем статусе")
 
     # Check if already signed
@@ -248,13 +403,9 @@ async def request_sign(
         sig.sms_code = code
         sig.sms_sent_at = now
 
-    await db.commit()
-
-    # Send SMS
     sms_text = f"AddSy: код для подписания договора: {code}. Не сообщайте его никому."
-    sent = await send_sms(user.phone, sms_text)
-    if not sent:
-        print(f"[Deal Sign] SMS failed for {user.phone}, code: {code}")
+    queue_sms(db, user.phone, sms_text, priority=PRIORITY_HIGH)
+    await db.commit()
 
     return RequestSignResponse(deal_id=str(deal.id))
 
@@ -262,6 +413,8 @@ async def request_sign(
 @router.post(
     "/{deal_id}/sign",
     response_model=SignDealResponse,
+    # Brute-force protection for the 6-digit signing code
+    dependencies=[rate_limit("sign_deal", Limit("user", 10, 600))],
     summary="Подписать договор SMS-кодом",
     description="Подписание договора через SMS-код. Когда обе стороны подписали — статус переходит в `pending_payment`.",
 )
@@ -273,7 +426,7 @@ async def sign_deal(
 ):
     deal = await _get_user_deal(db, deal_id, user.id)
 
-    if deal.status not in ("contract_pending", "contract_signed"):
+    if not can_transition(deal, "sign"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Договор нельзя подписать в текущем статусе")
 
     # Find signature record
@@ -303,11 +456,8 @@ async def sign_deal(
     signed_ids = {s.user_id for s in all_sigs_list if s.status == "signed"}
     signed_ids.add(user.id)
 
-    if party_ids <= signed_ids:
-        deal.status = "pending_payment"
-    else:
-        deal.status = "contract_signed"
-
+    # Two parties signing at once both bump the same version: the loser gets 409 and retries
+    await _transition(db, deal, "sign_complete" if party_ids <= signed_ids else "sign", actor_id=user.id)
     await db.commit()
 
     return SignDealResponse(deal_id=str(deal.id), signature_status="signed", deal_status=deal.status)
@@ -320,8 +470,9 @@ async def sign_deal(
 @router.post(
     "/{deal_id}/pay",
     response_model=PayDealResponse,
+    status_code=status.HTTP_202_ACCEPTED,
     summary="Оплатить (рекламодатель)",
-    description="Рекламодатель оплачивает сделку после подписания договора обеими сторонами. Деньги уходят на эскроу. Статус — `in_progress`.",
+    description="Рекламодатель оплачивает сделку после подписания договора обеими сторонами. Платёж создаётся у провайдера асинхронно: ответ сразу возвращает `payment.status = pending`. После подтверждения провайдером деньги уходят на эскроу, статус сделки — `in_progress`. Повторный вызов возвращает тот же платёж.",
 )
 async def pay_deal(
     deal_id: str,
@@ -334,21 +485,29 @@ async def pay_deal(
     if not deal:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Сделка не найдена")
 
-    if deal.status != "pending_payment":
+    if not can_transition(deal, "pay"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Оплата возможна только после подписания договора обеими сторонами")
 
-    now = datetime.now(timezone.utc)
-    deal.status = "in_progress"
-    deal.escrow_amount = deal.budget
-    deal.payment_method = body.payment_method
-    deal.paid_at = now
-    await db.commit()
+    try:
+        payment = await start_payment(db, deal, body.payment_method)
+        await db.commit()
+    except IntegrityError:
+        # A concurrent /pay created the live payment first
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Платёж уже создаётся, повторите запрос")
 
     return PayDealResponse(
         deal_id=str(deal.id),
-        status="in_progress",
+        status=deal.status,
         escrow_amount=deal.escrow_amount,
-        payment=PaymentInfo(amount=deal.budget, currency=deal.currency, method=body.payment_method, paid_at=now),
+        payment=PaymentInfo(
+            id=str(payment.id),
+            status=payment.status,
+            amount=payment.amount,
+            currency=payment.currency,
+            method=payment.method,
+            paid_at=payment.paid_at,
+        ),
     )
 
 
@@ -372,12 +531,12 @@ async def submit_work(
     if not deal:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Сделка не найдена")
 
-    if deal.status != "in_progress":
+    if not can_transition(deal, "submit_work"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Нельзя сдать работу в текущем статусе")
 
     now = datetime.now(timezone.utc)
-    deal.status = "work_submitted"
-    deal.work_submitted_at = now
+    await _transition(db, deal, "submit_work", actor_id=user.id, work_submitted_at=now)
+    schedule_auto_complete(db, deal.id, now)
     await db.commit()
 
     work_result = await db.execute(select(SubmittedWork).where(SubmittedWork.deal_id == deal.id))
@@ -416,16 +575,17 @@ async def confirm_work(
     if not deal:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Сделка не найдена")
 
-    if deal.status != "work_submitted":
+    if not can_transition(deal, "confirm_work"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Работа ещё не сдана")
 
     # Calculate commission
     fee = deal.budget * settings.PLATFORM_COMMISSION_PERCENT // 100
     payout = deal.budget - fee
 
-    deal.status = "completed"
-    deal.platform_fee = fee
-    deal.creator_payout = payout
+    # A double tap or the auto-completer finishing first ends up as 409, never a second payout
+    await _transition(db, deal, "confirm_work", actor_id=user.id, platform_fee=fee, creator_payout=payout)
+    await stats.record_deals(db, [deal])
+    await ledger.post(db, [ledger.deal_completed(deal)])
     await db.commit()
 
     return ConfirmWorkResponse(
@@ -456,11 +616,10 @@ async def dispute_deal(
     if not deal:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Сделка не найдена")
 
-    if deal.status != "work_submitted":
+    if not can_transition(deal, "dispute"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Оспорить можно только сданную работу")
 
-    deal.status = "disputed"
-    deal.dispute_reason = body.reason
+    await _transition(db, deal, "dispute", actor_id=user.id, dispute_reason=body.reason)
     await db.commit()
 
     return DisputeDealResponse(deal_id=str(deal.id), status="disputed", reason=body.reason)
@@ -19,6 +19,7 @@ from app.schemas.offer import (
     OfferViewResponse,
     PaginationMeta,
 )
+from app.services import events
 
 router = APIRouter(prefix="/offers", tags=["Offers"])
 
@@ -146,10 +147,14 @@ async def view_offer(
     now = datetime.now(timezone.utc)
     if not offer.viewed_at:
         offer.viewed_at = now
-    if offer.status == "pending":
+    changed = offer.status == "pending"
+    if changed:
         offer.status = "viewed"
     await db.commit()
 
+    if changed:
+        await events.emit_offer_status_changed(offer)
+
     return OfferViewResponse(id=str(offer.id), status=offer.status, viewed_at=offer.viewed_at)
 
 
@@ -176,4 +181,6 @@ async def cancel_offer(
     offer.cancelled_at = datetime.now(timezone.utc)
     await db.commit()
 
+    await events.emit_offer_status_changed(offer)
+
     return OfferCancelResponse(id=str(offer.id))
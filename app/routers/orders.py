@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.deps import get_current_user, require_role
+from app.core.rate_limit import Limit, rate_limit
 from app.models.order import Order
 from app.models.response import Response
 from app.models.user import AdvertiserProfile, User
@@ -20,6 +21,7 @@ from app.schemas.order import (
     OrderListResponse,
     PaginationMeta,
 )
+from app.services import stats
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
@@ -200,7 +202,7 @@ async def get_order(
     )
 
 
-@router.post("", response_model=OrderCreateResponse, status_code=status.HTTP_201_CREATED, summary="Создать заказ", description="Создание нового заказа. Только для рекламодателей.")
+@router.post("", response_model=OrderCreateResponse, dependencies=[rate_limit("create_order", Limit("user", 30, 3600))], status_code=status.HTTP_201_CREATED, summary="Создать заказ", description="Создание нового заказа. Только для рекламодателей.")
 async def create_order(
     body: OrderCreateRequest,
     user: User = Depends(require_role("advertiser")),
@@ -222,6 +224,7 @@ async def create_order(
         city=body.city,
     )
     db.add(order)
+    await stats.record_order(db, order)
     await db.commit()
     await db.refresh(order)
 
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.schemas.payment import WebhookAck
+from app.services.payments import InvalidWebhook, accept_webhook
+
+router = APIRouter(prefix="/payments", tags=["Payments"])
+
+
+@router.post(
+    "/webhook/{provider}",
+    response_model=WebhookAck,
+    summary="Вебхук платёжного провайдера",
+    description="Принимает событие провайдера, проверяет подпись и ставит проверку платежа в очередь. Повторная доставка того же события (по `id`) игнорируется.",
+)
+async def payment_webhook(
+    provider: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        accepted = await accept_webhook(db, provider, await request.body(), request.headers)
+    except InvalidWebhook:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный вебхук")
+    await db.commit()
+    return WebhookAck(duplicate=not accepted)
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.deps import get_current_user, require_role
+from app.core.rate_limit import Limit, rate_limit
 from app.models.order import Order
 from app.models.response import Response
 from app.models.user import AdvertiserProfile, CreatorProfile, User
@@ -22,7 +23,7 @@ from app.schemas.response import (
 router = APIRouter(tags=["Responses"])
 
 
-@router.post("/orders/{order_id}/responses", response_model=ResponseCreated, status_code=status.HTTP_201_CREATED, summary="Откликнуться на заказ", description="Креатор откликается на заказ. Можно указать сообщение и предложенную цену. Один отклик на заказ.")
+@router.post("/orders/{order_id}/responses", response_model=ResponseCreated, dependencies=[rate_limit("create_response", Limit("user", 60, 3600))], status_code=status.HTTP_201_CREATED, summary="Откликнуться на заказ", description="Креатор откликается на заказ. Можно указать сообщение и предложенную цену. Один отклик на заказ.")
 async def create_response(
     order_id: str,
     body: CreateResponseRequest,
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.deps import get_current_user
+from app.core.rate_limit import Limit, rate_limit
 from app.models.deal import Deal
 from app.models.review import Review
 from app.models.user import User
@@ -78,7 +79,7 @@ async def get_reviews(
     )
 
 
-@router.post("", response_model=CreateReviewResponse, status_code=status.HTTP_201_CREATED, summary="Оставить отзыв", description="Отзыв по завершённой сделке. Рейтинг 1-5. Один отзыв на сделку от каждой стороны.")
+@router.post("", response_model=CreateReviewResponse, dependencies=[rate_limit("create_review", Limit("user", 30, 3600))], status_code=status.HTTP_201_CREATED, summary="Оставить отзыв", description="Отзыв по завершённой сделке. Рейтинг 1-5. Один отзыв на сделку от каждой стороны.")
 async def create_review(
     body: CreateReviewRequest,
     user: User = Depends(get_current_user),
@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.deps import get_current_user
+from app.models.stats import DailyDealStat, DailyOrderStat
+from app.models.user import User
+from app.schemas.stats import DailyStatsItem, DailyStatsResponse, StatsSummaryResponse, StatsTotals
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+DAILY_DEFAULT_DAYS = 30
+DAILY_MAX_DAYS = 366
+
+
+async def _rollups(db: AsyncSession, user: User, date_from: date | None, date_to: date | None, by_day: bool) -> dict:
+    """Merge deal and order rollups into {(day?, currency): totals}. Reads only the rollup tables."""
+    totals: dict = {}
+
+    def bucket(row) -> dict:
+        key = (row.day, row.currency) if by_day else (row.currency,)
+        return totals.setdefault(key, {"currency": row.currency, **({"day": row.day} if by_day else {})})
+
+    deal_cols = [DailyDealStat.currency] + ([DailyDealStat.day] if by_day else [])
+    deals = select(
+        *deal_cols,
+        func.sum(DailyDealStat.deal_count).label("deal_count"),
+        func.sum(DailyDealStat.amount).label("amount"),
+        func.sum(DailyDealStat.platform_fee).label("platform_fee"),
+        func.sum(DailyDealStat.creator_payout).label("creator_payout"),
+    ).where(DailyDealStat.user_id == user.id, DailyDealStat.role == user.role, DailyDealStat.status == "completed")
+    if date_from:
+        deals = deals.where(DailyDealStat.day >= date_from)
+    if date_to:
+        deals = deals.where(DailyDealStat.day <= date_to)
+    for row in (await db.execute(deals.group_by(*deal_cols))).all():
+        bucket(row).update(
+            deals_completed=row.deal_count, amount=row.amount,
+            platform_fee=row.platform_fee, creator_payout=row.creator_payout,
+        )
+
+    if user.role == "advertiser":
+        order_cols = [DailyOrderStat.currency] + ([DailyOrderStat.day] if by_day else [])
+        orders = select(
+            *order_cols,
+            func.sum(DailyOrderStat.order_count).label("order_count"),
+            func.sum(DailyOrderStat.budget).label("budget"),
+        ).where(DailyOrderStat.user_id == user.id)
+        if date_from:
+            orders = orders.where(DailyOrderStat.day >= date_from)
+        if date_to:
+            orders = orders.where(DailyOrderStat.day <= date_to)
+        for row in (await db.execute(orders.group_by(*order_cols))).all():
+            bucket(row).update(orders_created=row.order_count, orders_budget=row.budget)
+
+    return totals
+
+
+@router.get(
+    "/me",
+    response_model=StatsSummaryResponse,
+    summary="Моя статистика",
+    description="Итоги по валютам: для креатора — заработок (`creator_payout`) и завершённые сделки, для рекламодателя — расходы (`amount`), сделки и созданные заказы. Без дат — за всё время.",
+)
+async def my_stats(
+    date_from: date | None = Query(None),
+    date_to: date | None = Query(None),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    totals = await _rollups(db, user, date_from, date_to, by_day=False)
+    return StatsSummaryResponse(
+        role=user.role,
+        date_from=date_from,
+        date_to=date_to,
+        totals=[StatsTotals(**t) for _, t in sorted(totals.items())],
+    )
+
+
+@router.get(
+    "/me/daily",
+    response_model=DailyStatsResponse,
+    summary="Моя статистика по дням",
+    description="Те же показатели по дням (UTC). По умолчанию — последние 30 дней, максимум 366. Дни без активности не возвращаются.",
+)
+async def my_daily_stats(
+    date_from: date | None = Query(None),
+    date_to: date | None = Query(None),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=DAILY_DEFAULT_DAYS - 1)
+    if date_from > date_to or (date_to - date_from).days >= DAILY_MAX_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный период")
+
+    totals = await _rollups(db, user, date_from, date_to, by_day=True)
+    return DailyStatsResponse(
+        role=user.role,
+        date_from=date_from,
+        date_to=date_to,
+        data=[DailyStatsItem(**t) for _, t in sorted(totals.items())],
+    )
@@ -1,44 +1,230 @@
-import os
 import uuid
 
-import aiofiles
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.database import get_db
 from app.core.deps import get_current_user
+from app.core.rate_limit import Limit, rate_limit
+from app.models.upload import UploadSession
 from app.models.user import User
-from app.schemas.upload import UploadResponse
+from app.schemas.upload import UploadResponse, UploadSessionCreate, UploadSessionResponse
+from app.services.blobs import store_blob
+from app.services.uploads import (
+    ReceivedUpload,
+    UploadError,
+    UploadGone,
+    UploadTooLarge,
+    append_segment,
+    file_sha256,
+    partial_path,
+    receive_chunk,
+    receive_upload,
+    remove_file,
+    session_expiry,
+)
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
 ALLOWED_TYPES = {"avatar", "logo", "portfolio", "work"}
 
+# The body is parsed by receive_upload, not by FastAPI; this keeps the form in the docs
+UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file", "type"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "type": {"type": "string", "enum": sorted(ALLOWED_TYPES)},
+                    },
+                }
+            }
+        },
+    }
+}
 
-@router.post("", response_model=UploadResponse, status_code=status.HTTP_201_CREATED, summary="Загрузить файл", description="Загрузка файла (multipart/form-data). Типы: `avatar`, `logo`, `portfolio`, `work`. Макс. 50MB.")
+
+@router.post("", response_model=UploadResponse, dependencies=[rate_limit("upload", Limit("user", 30, 60))], status_code=status.HTTP_201_CREATED, openapi_extra=UPLOAD_FORM, summary="Загрузить файл", description="Загрузка файла (multipart/form-data). Типы: `avatar`, `logo`, `portfolio`, `work`. Макс. 50MB, больше — 413. Одинаковые файлы хранятся один раз: повторная загрузка возвращает тот же `url` (`deduplicated: true`).")
 async def upload_file(
-    file: UploadFile = File(...),
-    type: str = Form(...),
+    request: Request,
     _user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
+    # Don't hold a pooled connection while a slow client sends the body
+    await db.close()
+    # Streamed to disk as it arrives: memory use doesn't depend on the file size
+    try:
+        upload = await receive_upload(request)
+    except UploadTooLarge:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Файл слишком большой (макс. 50MB)")
+    except UploadError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный запрос: нужен один файл в multipart/form-data")
+
+    # The form field may come after the file, so it can only be checked now
+    type = upload.fields.get("type")
     if type not in ALLOWED_TYPES:
+        await upload.discard()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный тип файла")
 
-    if file.size and file.size > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Файл слишком большой (макс. 50MB)")
-
-    ext = os.path.splitext(file.filename or "file")[1]
-    filename = f"{uuid.uuid4()}{ext}"
-    upload_dir = os.path.join(settings.UPLOAD_DIR, type)
-    os.makedirs(upload_dir, exist_ok=True)
-
-    filepath = os.path.join(upload_dir, filename)
-    async with aiofiles.open(filepath, "wb") as f:
-        content = await file.read()
-        await f.write(content)
+    # Stored by content hash: a file that is already there isn't written again
+    blob, deduplicated = await store_blob(db, upload, type)
+    await db.commit()
 
     return UploadResponse(
-        url=f"/uploads/{type}/{filename}",
+        url=blob.url,
         type=type,
-        size=len(content),
-        mime_type=file.content_type or "application/octet-stream",
+        size=blob.size,
+        mime_type=blob.content_type,
+        sha256=blob.sha256,
+        deduplicated=deduplicated,
+    )
+
+
+def _session_response(upload: UploadSession) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        id=str(upload.id),
+        type=upload.type,
+        size=upload.size,
+        offset=upload.offset,
+        status=upload.status,
+        expires_at=upload.expires_at,
+        url=upload.url,
+    )
+
+
+async def _own_session(db: AsyncSession, session_id: uuid.UUID, user: User, lock: bool = False) -> UploadSession:
+    query = select(UploadSession).where(UploadSession.id == session_id, UploadSession.user_id == user.id)
+    if lock:
+        query = query.with_for_update()
+    upload = (await db.execute(query)).scalar_one_or_none()
+    if upload is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Загрузка не найдена")
+    return upload
+
+
+@router.post("/sessions", response_model=UploadSessionResponse, dependencies=[rate_limit("upload", Limit("user", 30, 60))], status_code=status.HTTP_201_CREATED, summary="Начать возобновляемую загрузку", description="Для больших файлов на нестабильной сети. Дальше: `PATCH /upload/sessions/{id}` с частями файла, `POST /upload/sessions/{id}/finalize`. Незавершённая загрузка удаляется через 24 часа без активности.")
+async def create_upload_session(
+    body: UploadSessionCreate,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if body.type not in ALLOWED_TYPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный тип файла")
+    if body.size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Файл слишком большой (макс. 50MB)")
+
+    upload = UploadSession(
+        user_id=user.id,
+        type=body.type,
+        filename=body.filename,
+        content_type=body.content_type,
+        size=body.size,
+        offset=0,
+        expected_sha256=body.sha256,
+        expires_at=session_expiry(),
     )
+    db.add(upload)
+    await db.commit()
+    return _session_response(upload)
+
+
+@router.get("/sessions/{session_id}", response_model=UploadSessionResponse, summary="Состояние загрузки", description="`offset` — сколько байт уже сохранено; следующую часть отправляйте с этого места. Тот же offset в заголовке `Upload-Offset`.")
+async def get_upload_session(
+    session_id: uuid.UUID,
+    response: Response,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    upload = await _own_session(db, session_id, user)
+    response.headers["Upload-Offset"] = str(upload.offset)
+    return _session_response(upload)
+
+
+@router.patch("/sessions/{session_id}", response_model=UploadSessionResponse, dependencies=[rate_limit("upload_chunk", Limit("user", 600, 60))], summary="Отправить часть файла", description="Тело запроса — байты файла начиная с `Upload-Offset` (должен совпадать с `offset` сессии, иначе 409). Если соединение оборвалось, сохранённое не теряется: узнайте `offset` через GET и продолжайте с него.")
+async def upload_chunk(
+    session_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    upload = await _own_session(db, session_id, user)
+    if upload.status != "uploading":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Загрузка уже завершена")
+    if upload_offset != upload.offset:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ожидается offset {upload.offset}",
+            headers={"Upload-Offset": str(upload.offset)},
+        )
+    # The body may take minutes on a mobile network: release the connection meanwhile
+    await db.commit()
+
+    try:
+        segment, written = await receive_chunk(request, upload.size - upload.offset)
+    except UploadTooLarge:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Данных больше, чем заявленный размер файла")
+
+    try:
+        # Only counts if nobody else moved the offset meanwhile (a retried chunk racing the original).
+        # The row stays locked until commit: a racing request waits here, then finds the offset moved.
+        result = await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == upload.id, UploadSession.offset == upload_offset, UploadSession.status == "uploading")
+            .values(offset=upload_offset + written, expires_at=session_expiry())
+            .returning(UploadSession.offset)
+            .execution_options(synchronize_session=False)
+        )
+        if result.first() is None:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Часть уже принята другим запросом")
+        try:
+            await append_segment(segment, partial_path(upload.id), upload_offset)
+        except UploadGone:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Загрузка истекла, начните заново")
+        await db.commit()
+    finally:
+        await remove_file(segment)
+    await db.refresh(upload)
+    response.headers["Upload-Offset"] = str(upload.offset)
+    return _session_response(upload)
+
+
+@router.post("/sessions/{session_id}/finalize", response_model=UploadResponse, summary="Завершить загрузку", description="Проверяет, что файл получен полностью (и совпадает `sha256`, если он был указан), и публикует его. Повторный вызов возвращает тот же результат.")
+async def finalize_upload_session(
+    session_id: uuid.UUID,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    upload = await _own_session(db, session_id, user, lock=True)
+    if upload.status == "completed":
+        return UploadResponse(url=upload.url, type=upload.type, size=upload.size, mime_type=upload.content_type, sha256=upload.sha256)
+    if upload.offset != upload.size:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Получено {upload.offset} из {upload.size} байт")
+
+    path = partial_path(upload.id)
+    try:
+        sha256 = await file_sha256(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Загрузка истекла, начните заново")
+    if upload.expected_sha256 and sha256 != upload.expected_sha256:
+        # Corrupted on the way: start the file over within the same session
+        upload.offset = 0
+        await db.commit()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Контрольная сумма не совпадает, загрузите файл заново")
+
+    received = ReceivedUpload(path=path, filename=upload.filename, content_type=upload.content_type, size=upload.size, sha256=sha256)
+    blob, deduplicated = await store_blob(db, received, upload.type)
+    upload.status = "completed"
+    upload.url = blob.url
+    upload.sha256 = sha256
+    await db.commit()
+    return UploadResponse(url=upload.url, type=upload.type, size=upload.size, mime_type=blob.content_type, sha256=sha256, deduplicated=deduplicated)
@@ -7,41 +7,12 @@ from app.core.database import async_session
 from app.core.security import decode_token
 from app.models.chat import Chat, Message
 from app.models.user import User
+from app.services import events
+from app.services.events import manager
 
 router = APIRouter(tags=["WebSocket"])
 
 
-class ConnectionManager:
-    """Manages active WebSocket connections per user."""
-
-    def __init__(self):
-        # user_id -> list of WebSocket connections
-        self.active: dict[str, list[WebSocket]] = {}
-
-    async def connect(self, user_id: str, ws: WebSocket):
-        await ws.accept()
-        self.active.setdefault(user_id, []).append(ws)
-
-    def disconnect(self, user_id: str, ws: WebSocket):
-        if user_id in self.active:
-            self.active[user_id] = [c for c in self.active[user_id] if c is not ws]
-            if not self.active[user_id]:
-                del self.active[user_id]
-
-    async def send_to_user(self, user_id: str, data: dict):
-        for ws in self.active.get(user_id, []):
-            try:
-                await ws.send_json(data)
-            except Exception:
-                pass
-
-    def is_online(self, user_id: str) -> bool:
-        return user_id in self.active and len(self.active[user_id]) > 0
-
-
-manager = ConnectionManager()
-
-
 @router.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     # Auth via query param: ws://host/v1/ws?token=<jwt>
@@ -109,27 +80,9 @@ async def _handle_send_message(sender_id: str, data: dict):
         await db.commit()
         await db.refresh(msg)
 
-        # Determine recipient
-        recipient_id = (
-            str(chat.participant_2) if str(chat.participant_1) == sender_id else str(chat.participant_1)
-        )
-
-        message_data = {
-            "event": "new_message",
-            "data": {
-                "id": str(msg.id),
-                "chat_id": str(msg.chat_id),
-                "sender_id": sender_id,
-                "type": msg.type,
-                "content": msg.content,
-                "created_at": msg.created_at.isoformat(),
-            },
-        }
-
-        # Send to recipient
-        await manager.send_to_user(recipient_id, message_data)
-        # Echo back to sender (confirmation)
-        await manager.send_to_user(sender_id, message_data)
+        # Recipient gets the message, sender gets it back as confirmation
+        await events.emit_new_message(chat, msg)
+        await events.emit_chat_updated(db, chat)
 
 
 async def _handle_typing(sender_id: str, data: dict):
@@ -196,3 +149,4 @@ async def _handle_read(user_id: str, data: dict):
             "event": "messages_read",
             "data": {"chat_id": chat_id, "read_by": user_id, "read_at": now.isoformat()},
         })
+        await events.emit_chat_updated(db, chat, [user_id])
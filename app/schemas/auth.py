@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel, Field
 
 
@@ -40,5 +42,17 @@ class RefreshTokenResponse(BaseModel):
     refresh_token: str
 
 
+class LogoutResponse(BaseModel):
+    message: str = "Logged out"
+
+
+class SessionResponse(BaseModel):
+    id: str
+    device: str | None
+    created_at: datetime
+    last_used_at: datetime
+    is_current: bool
+
+
 class ErrorResponse(BaseModel):
     message: str
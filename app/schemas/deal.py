@@ -39,6 +39,8 @@ class DealListItem(BaseModel):
 
 class DealListResponse(BaseModel):
     data: list[DealListItem]
+    next_cursor: str | None = None
+    has_more: bool = False
 
 
 class SignatureItem(BaseModel):
@@ -88,6 +90,21 @@ class DealDetail(DealListItem):
     dispute_reason: str | None = None
 
 
+class DealEventItem(BaseModel):
+    id: str
+    event: str
+    from_status: str | None = None
+    to_status: str
+    actor_id: str | None = None
+    data: dict = {}
+    created_at: datetime
+
+
+class DealTimelineResponse(BaseModel):
+    deal_id: str
+    events: list[DealEventItem]
+
+
 # --- Request/Response for sign flow ---
 
 class RequestSignResponse(BaseModel):
@@ -112,10 +129,12 @@ class PayDealRequest(BaseModel):
 
 
 class PaymentInfo(BaseModel):
+    id: str
+    status: str  # pending | succeeded | failed
     amount: int
     currency: str = "KZT"
     method: str
-    paid_at: datetime
+    paid_at: datetime | None = None
 
 
 class PayDealResponse(BaseModel):
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class WebhookAck(BaseModel):
+    status: str = "ok"
+    duplicate: bool = False
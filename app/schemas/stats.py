@@ -0,0 +1,31 @@
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class StatsTotals(BaseModel):
+    currency: str
+    deals_completed: int = 0
+    amount: int = 0
+    platform_fee: int = 0
+    creator_payout: int = 0
+    orders_created: int = 0
+    orders_budget: int = 0
+
+
+class StatsSummaryResponse(BaseModel):
+    role: str | None = None
+    date_from: date | None = None
+    date_to: date | None = None
+    totals: list[StatsTotals]
+
+
+class DailyStatsItem(StatsTotals):
+    day: date
+
+
+class DailyStatsResponse(BaseModel):
+    role: str | None = None
+    date_from: date
+    date_to: date
+    data: list[DailyStatsItem]
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from datetime import datetime
+
+from pydantic import BaseModel, Field
 
 
 class UploadResponse(BaseModel):
@@ -6,3 +8,23 @@ class UploadResponse(BaseModel):
     type: str
     size: int
     mime_type: str
+    sha256: str
+    deduplicated: bool = False  # the same content was already stored; nothing new was written
+
+
+class UploadSessionCreate(BaseModel):
+    type: str = Field(..., examples=["work"])
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0, description="Полный размер файла в байтах")
+    content_type: str = Field("application/octet-stream", max_length=100)
+    sha256: str | None = Field(None, pattern=r"^[0-9a-f]{64}$", description="Если указан — проверяется при завершении")
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    type: str
+    size: int
+    offset: int
+    status: str
+    expires_at: datetime
+    url: str | None = None
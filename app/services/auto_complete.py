@@ -1,48 +1,106 @@
-import asyncio
+import uuid
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.models.deal import Deal
+from app.models.deal import Deal, DealEvent
+from app.services import ledger, stats
+from app.services.jobs import RetryLater, enqueue, job_handler
 
-CHECK_INTERVAL_SECONDS = 300  # 5 minutes
+COMPLETE_CHUNK_SIZE = 500
+AUTO_COMPLETE_MAX_ATTEMPTS = 10
 
 
-async def auto_complete_deals():
-    """Background task: auto-complete deals where work_submitted_at + 24h has passed."""
-    from app.core.database import async_session
+def review_deadline(work_submitted_at: datetime) -> datetime:
+    return work_submitted_at + timedelta(hours=settings.WORK_REVIEW_PERIOD_HOURS)
 
+
+async def complete_due_deals(
+    db: AsyncSession, deal_ids: list | None = None, chunk_size: int = COMPLETE_CHUNK_SIZE, commit: bool = True
+) -> list:
+    """Auto-complete deals whose review period has passed; returns the completed ids.
+
+    Each chunk is one `UPDATE ... FROM (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING`
+    with the commission computed in SQL, so several processes can run this at once:
+    rows locked by one are skipped by the others and nothing is completed twice.
+    The `auto_complete` transition bumps `version`, so a concurrent `confirm_work`
+    holding the old version gets a conflict instead of completing the deal again.
+    `deal_ids` restricts the run to deals a job knows are due. With
+    `commit=False` the caller commits (only sensible for a single chunk).
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.WORK_REVIEW_PERIOD_HOURS)
+    fee = Deal.budget * settings.PLATFORM_COMMISSION_PERCENT // 100
+
+    completed = []
     while True:
-        try:
-            async with async_session() as db:
-                cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.WORK_REVIEW_PERIOD_HOURS)
+        due = (
+            select(Deal.id)
+            .where(
+                Deal.status == "work_submitted",
+                Deal.work_submitted_at != None,
+                Deal.work_submitted_at <= cutoff,
+            )
+            .order_by(Deal.work_submitted_at)
+            .limit(chunk_size)
+            .with_for_update(skip_locked=True)
+        )
+        if deal_ids is not None:
+            due = due.where(Deal.id.in_(deal_ids))
+        due = due.cte("due")
+
+        result = await db.execute(
+            update(Deal)
+            .where(Deal.id == due.c.id)
+            .values(status="completed", platform_fee=fee, creator_payout=Deal.budget - fee, version=Deal.version + 1)
+            .returning(Deal.id, Deal.creator_id, Deal.advertiser_id, Deal.budget, Deal.currency,
+                       Deal.platform_fee, Deal.creator_payout)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        ids = [row.id for row in rows]
+        if ids:
+            await db.execute(
+                insert(DealEvent),
+                [{"deal_id": i, "event": "auto_complete", "from_status": "work_submitted", "to_status": "completed"} for i in ids],
+            )
+            await stats.record_deals(db, rows)
+            await ledger.post(db, [ledger.deal_completed(row) for row in rows])
+        if commit:
+            await db.commit()
 
-                result = await db.execute(
-                    select(Deal).where(
-                        Deal.status == "work_submitted",
-                        Deal.work_submitted_at != None,
-                        Deal.work_submitted_at <= cutoff,
-                    )
-                )
-                deals = result.scalars().all()
+        completed.extend(ids)
+        if len(ids) < chunk_size:
+            break
 
-                for deal in deals:
-                    fee = deal.budget * settings.PLATFORM_COMMISSION_PERCENT // 100
-                    payout = deal.budget - fee
+    if completed:
+        print(f"[AutoComplete] {len(completed)} deal(s) auto-completed")
+    return completed
 
-                    deal.status = "completed"
-                    deal.platform_fee = fee
-                    deal.creator_payout = payout
 
-                    print(f"[AutoComplete] Deal {deal.id} auto-completed. Fee: {fee}, Payout: {payout}")
+def schedule_auto_complete(db: AsyncSession, deal_id, work_submitted_at: datetime):
+    """Arrange for a just-submitted deal to complete at its review deadline. Call before the caller commits.
 
-                if deals:
-                    await db.commit()
+    The deadline is a delayed `deals.auto_complete` job, committed with the
+    submission, so it survives restarts and any worker runs it on time. A deal
+    confirmed or disputed meanwhile is simply skipped when the job runs.
+    """
+    enqueue(
+        db, "deals.auto_complete", {"deal_id": str(deal_id)},
+        run_at=review_deadline(work_submitted_at), max_attempts=AUTO_COMPLETE_MAX_ATTEMPTS,
+    )
 
-        except Exception as e:
-            print(f"[AutoComplete] Error: {e}")
 
-        await asyncio.sleep(CHECK_INTERVAL_SECONDS)
+@job_handler("deals.auto_complete")
+async def auto_complete_job(db: AsyncSession, payload: dict):
+    deal_id = uuid.UUID(payload["deal_id"])
+    if await complete_due_deals(db, [deal_id], commit=False):
+        return
+    # Not completed: confirmed, disputed, already auto-completed, or due a moment later than this clock says
+    submitted_at = await db.scalar(
+        select(Deal.work_submitted_at).where(Deal.id == deal_id, Deal.status == "work_submitted")
+    )
+    if submitted_at is not None:
+        wait = (review_deadline(submitted_at) - datetime.now(timezone.utc)).total_seconds()
+        raise RetryLater(max(wait, 1), "review period not over yet")
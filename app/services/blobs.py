@@ -0,0 +1,181 @@
+"""Content-addressed storage for uploads.
+
+Every uploaded file is stored once, at `UPLOAD_DIR/blobs/<sha[:2]>/<sha><ext>`,
+and described by a `blobs` row keyed by its SHA-256. Uploading content that
+is already stored returns the existing URL and drops the new copy. Only a
+hash the server computed itself counts: a client-declared one proves nothing
+about possession of the file.
+
+Files are referenced by URL from `users.avatar_url`,
+`advertiser_profiles.logo_url`, `submitted_work.file_url` and message content.
+`collect_garbage` recounts those references into `blobs.refcount` and deletes
+blobs nobody references once BLOB_GC_GRACE_HOURS have passed since they were
+last uploaded (a fresh upload isn't referenced until the client saves it).
+Only avatars and logos are collected: portfolio and work files are kept where
+the client holds their URLs, so a missing reference proves nothing. A blob
+ever uploaded as one of those is kept for good. Files under the older
+`UPLOAD_DIR/<type>/` layout are left alone.
+"""
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import aiofiles.os
+from sqlalchemy import case, delete, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.leader import leader_only
+from app.models.blob import Blob
+from app.services.uploads import ReceivedUpload, store_upload
+
+GC_INTERVAL_SECONDS = 6 * 3600
+# Upload types whose every reference `_REFS_SQL` can see; blobs of other types are never collected
+COLLECTED_TYPES = ("avatar", "logo")
+BLOB_URL_PATTERN = "/uploads/blobs/[0-9a-f]{2}/([0-9a-f]{64})"
+# Content types kept as sent by the client; anything else is stored as application/octet-stream
+MEDIA_TYPE_PATTERN = re.compile(r"(image|video|audio|application)/[a-z0-9][a-z0-9.+-]{0,80}")
+
+# Every blob URL mentioned anywhere, as its hash. A message may hold a URL
+# with a host in front, or text around it, so hashes are pulled out by pattern.
+_REFS_SQL = f"""
+    SELECT substring(avatar_url from '{BLOB_URL_PATTERN}') AS sha256 FROM users WHERE avatar_url LIKE '%/uploads/blobs/%'
+    UNION ALL
+    SELECT substring(logo_url from '{BLOB_URL_PATTERN}') FROM advertiser_profiles WHERE logo_url LIKE '%/uploads/blobs/%'
+    UNION ALL
+    SELECT substring(file_url from '{BLOB_URL_PATTERN}') FROM submitted_work WHERE file_url LIKE '%/uploads/blobs/%'
+    UNION ALL
+    SELECT substring(content from '{BLOB_URL_PATTERN}') FROM messages WHERE content LIKE '%/uploads/blobs/%'
+"""
+_RECOUNT_SQL = text(f"""
+    UPDATE blobs AS b SET refcount = COALESCE(r.n, 0)
+    FROM blobs AS cur
+    LEFT JOIN (SELECT sha256, count(*) AS n FROM ({_REFS_SQL}) refs GROUP BY sha256) r ON r.sha256 = cur.sha256
+    WHERE b.sha256 = cur.sha256 AND b.refcount <> COALESCE(r.n, 0)
+""")
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    return f"blobs/{sha256[:2]}/{sha256}{ext.lower()[:10]}"
+
+
+def _on_disk(blob: Blob) -> bool:
+    return os.path.exists(os.path.join(settings.UPLOAD_DIR, blob.path))
+
+
+def _merged_type(type):
+    """A kept type sticks: content uploaded once as `work` stays out of the GC."""
+    return case((Blob.type.in_(COLLECTED_TYPES), type), else_=Blob.type)
+
+
+async def find_blob(db: AsyncSession, sha256: str, type: str) -> Blob | None:
+    """The stored blob with this hash, if its file is there. Counts as a new upload for the GC. Does not commit."""
+    blob = (
+        await db.execute(
+            update(Blob)
+            .where(Blob.sha256 == sha256)
+            .values(last_uploaded_at=datetime.now(timezone.utc), type=_merged_type(type))
+            .returning(Blob)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalar_one_or_none()
+    if blob is None or not _on_disk(blob):
+        return None
+    return blob
+
+
+def media_type(content_type: str) -> str:
+    """The client's Content-Type if it is a plain media type on the allow-list, else application/octet-stream."""
+    value = content_type.split(";", 1)[0].strip().lower()
+    return value if MEDIA_TYPE_PATTERN.fullmatch(value) else "application/octet-stream"
+
+
+async def store_blob(db: AsyncSession, upload: ReceivedUpload, type: str) -> tuple[Blob, bool]:
+    """Store a received file of upload `type` by its hash; returns (blob, deduplicated). Does not commit.
+
+    If the content is already stored the temp file is discarded and nothing
+    is written. Otherwise the row is written first and the file renamed into
+    place after it, so a failed insert never leaves a file the GC can't see.
+    """
+    blob = await find_blob(db, upload.sha256, type)
+    if blob is not None:
+        await upload.discard()
+        return blob, True
+
+    path = blob_path(upload.sha256, os.path.splitext(upload.filename)[1])
+    now = datetime.now(timezone.utc)
+    stmt = pg_insert(Blob).values(
+        sha256=upload.sha256,
+        path=path,
+        size=upload.size,
+        content_type=media_type(upload.content_type),
+        type=type,
+        refcount=0,
+        created_at=now,
+        last_uploaded_at=now,
+    )
+    blob = (
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[Blob.sha256],
+                set_={"path": stmt.excluded.path, "last_uploaded_at": now, "type": _merged_type(stmt.excluded.type)},
+            )
+            .returning(Blob)
+            .execution_options(populate_existing=True)
+        )
+    ).scalar_one()
+    # Two uploads of the same new content may race here: the second waits on the row, then its
+    # rename puts identical bytes in place
+    directory, filename = os.path.split(os.path.join(settings.UPLOAD_DIR, path))
+    try:
+        await store_upload(upload, directory, filename)
+    except BaseException:
+        await upload.discard()
+        raise
+    return blob, False
+
+
+async def collect_garbage(db: AsyncSession, grace: timedelta | None = None) -> list[str]:
+    """Recount references and delete unreferenced blobs older than `grace`; returns their hashes.
+
+    Files are removed while the rows are still locked, before the commit, so
+    an upload of the same content waiting on the row stores a fresh file
+    rather than having it deleted underneath.
+    """
+    grace = timedelta(hours=settings.BLOB_GC_GRACE_HOURS) if grace is None else grace
+    await db.execute(_RECOUNT_SQL)
+    result = await db.execute(
+        delete(Blob)
+        .where(
+            Blob.refcount == 0,
+            Blob.type.in_(COLLECTED_TYPES),
+            Blob.last_uploaded_at < datetime.now(timezone.utc) - grace,
+        )
+        .returning(Blob.sha256, Blob.path)
+    )
+    rows = result.all()
+    for row in rows:
+        try:
+            await aiofiles.os.remove(os.path.join(settings.UPLOAD_DIR, row.path))
+        except FileNotFoundError:
+            pass
+    await db.commit()
+    return [row.sha256 for row in rows]
+
+
+@leader_only("blob_gc")
+async def blob_gc():
+    """Delete unreferenced upload blobs (every few hours, on the leader)."""
+    from app.core.database import async_session
+
+    while True:
+        try:
+            async with async_session() as db:
+                removed = await collect_garbage(db)
+                if removed:
+                    print(f"[Blobs] Removed {len(removed)} unreferenced files")
+        except Exception as e:
+            print(f"[Blobs] Error: {e}")
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
@@ -0,0 +1,126 @@
+"""Deal contract PDFs.
+
+Rendering is CPU-bound, so it runs in a process pool and never on the event
+loop. Output is content-addressed: the file name is a hash of every field that
+appears on the page plus `TEMPLATE_VERSION`, so any change to the deal (a new
+signature, edited conditions) or to the template produces a new file. Repeated
+downloads are served from disk.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import settings
+
+TEMPLATE_VERSION = 1  # bump whenever render_contract_pdf's output changes
+
+TERMS = (
+    "Подписывая настоящий договор, стороны соглашаются с условиями сотрудничества "
+    "через платформу AddSy. Оплата удерживается на эскроу до подтверждения работы "
+    f"рекламодателем или до истечения срока проверки ({settings.WORK_REVIEW_PERIOD_HOURS} ч). "
+    f"Комиссия платформы — {settings.PLATFORM_COMMISSION_PERCENT}% от бюджета."
+)
+
+_executor: ProcessPoolExecutor | None = None
+_rendering: dict[str, asyncio.Future] = {}
+
+
+def contract_digest(fields: dict) -> str:
+    payload = json.dumps({"template": TEMPLATE_VERSION, **fields}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_contract_pdf(fields: dict) -> bytes:
+    """Render the contract; runs in a worker process, so it only takes plain data."""
+    import io
+
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+
+    # Built-in PDF fonts have no Cyrillic
+    pdfmetrics.registerFont(TTFont("ContractFont", settings.CONTRACT_FONT_PATH))
+    styles = getSampleStyleSheet()
+    for style in styles.byName.values():
+        style.fontName = "ContractFont"
+
+    def p(text, style="BodyText"):
+        return Paragraph(str(text).replace("&", "&amp;").replace("<", "&lt;"), styles[style])
+
+    story = [
+        p(f"Договор № {fields['deal_id']}", "Title"),
+        p(f"Заказ: {fields['order_title']}"),
+        p(f"Дата: {fields['created_at'][:10]}"),
+        Spacer(1, 6 * mm),
+        p("Стороны", "Heading2"),
+        p(f"Рекламодатель: {fields['advertiser']}"),
+        p(f"Креатор: {fields['creator']}"),
+        p("Условия", "Heading2"),
+        p(f"Бюджет: {fields['budget']:,} {fields['currency']}".replace(",", " ")),
+        p(f"Срок сдачи: {fields['deadline']}"),
+    ]
+    if fields["start_date"] or fields["end_date"]:
+        story.append(p(f"Период: {fields['start_date'] or '—'} — {fields['end_date'] or '—'}"))
+    if fields["video_count"]:
+        story.append(p(f"Количество видео: {fields['video_count']}"))
+    if fields["conditions"]:
+        story.append(p(fields["conditions"]))
+    if fields["requirements"]:
+        story.append(p("Требования к работе", "Heading2"))
+        story.extend(p(f"{i}. {label}") for i, label in enumerate(fields["requirements"], 1))
+    story += [p("Общие положения", "Heading2"), p(TERMS), p("Подписи", "Heading2")]
+    rows = [["Сторона", "Статус", "Дата"]] + [
+        [s["name"] or s["role"] or "—", "подписано" if s["status"] == "signed" else "не подписано", (s["signed_at"] or "—")[:16]]
+        for s in fields["signatures"]
+    ]
+    story.append(Table(rows, style=[("FONTNAME", (0, 0), (-1, -1), "ContractFont")]))
+
+    buf = io.BytesIO()
+    SimpleDocTemplate(buf, pagesize=A4, title=f"AddSy contract {fields['deal_id']}").build(story)
+    return buf.getvalue()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.CONTRACT_RENDER_WORKERS)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _render_to(path: str, fields: dict):
+    pdf = await asyncio.get_running_loop().run_in_executor(get_executor(), render_contract_pdf, fields)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(pdf)
+    os.replace(tmp, path)  # readers never see a half-written file
+
+
+async def contract_pdf(fields: dict) -> tuple[str, str]:
+    """Return (path, digest) of the rendered contract, rendering it on a cache miss.
+
+    Concurrent requests for the same digest in this process share one render.
+    """
+    digest = contract_digest(fields)
+    path = os.path.join(settings.CONTRACT_CACHE_DIR, f"{digest}.pdf")
+    if os.path.exists(path):
+        return path, digest
+
+    future = _rendering.get(digest)
+    if future is None:
+        os.makedirs(settings.CONTRACT_CACHE_DIR, exist_ok=True)
+        future = _rendering[digest] = asyncio.ensure_future(_render_to(path, fields))
+        future.add_done_callback(lambda _: _rendering.pop(digest, None))
+    await asyncio.shield(future)
+    return path, digest
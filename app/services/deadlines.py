@@ -0,0 +1,117 @@
+"""Deadline reminders for deals in progress.
+
+Each sweep walks only deals that are due: `status = 'in_progress'` and a
+deadline inside the window, via `ix_deals_status_deadline`, skipping deals
+already reminded. Every chunk claims its deals in `deal_reminders` with
+`ON CONFLICT DO NOTHING` and queues notifications and SMS in bulk in the same
+transaction, so a rerun (or a second sweeper) never sends twice.
+"""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import exists, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.core.leader import leader_only
+from app.models.deal import Deal, DealReminder
+from app.models.notification import Notification
+from app.models.order import Order
+from app.models.user import User
+from app.services.sms import queue_sms_batch
+
+SWEEP_INTERVAL_SECONDS = 3600
+SWEEP_CHUNK_SIZE = 500
+
+
+def _due_window(kind: str, today: date):
+    if kind == "due_soon":
+        return Deal.deadline >= today, Deal.deadline <= today + timedelta(days=settings.DEADLINE_REMINDER_DAYS)
+    return (Deal.deadline < today,)
+
+
+def _messages(kind: str, title: str, deadline: date) -> tuple[str, str, str]:
+    """(notification title, notification body, SMS text)."""
+    when = deadline.strftime("%d.%m.%Y")
+    if kind == "due_soon":
+        return (
+            "Скоро дедлайн",
+            f"Срок сдачи работы по заказу «{title}» — {when}.",
+            f"AddSy: срок сдачи работы по заказу «{title}» — {when}.",
+        )
+    return (
+        "Срок сдачи истёк",
+        f"Срок сдачи работы по заказу «{title}» истёк {when}.",
+        f"AddSy: срок сдачи работы по заказу «{title}» истёк {when}.",
+    )
+
+
+async def sweep(db: AsyncSession, kind: str, chunk_size: int = SWEEP_CHUNK_SIZE, today: date | None = None) -> int:
+    """Send `kind` reminders ("due_soon" to the creator, "overdue" to both parties); returns deals reminded."""
+    today = today or datetime.now(timezone.utc).date()
+    creator, advertiser = aliased(User), aliased(User)
+    reminded = exists().where(DealReminder.deal_id == Deal.id, DealReminder.kind == kind)
+
+    total = 0
+    while True:
+        rows = (await db.execute(
+            select(Deal.id, Deal.deadline, Order.title, Deal.creator_id, creator.phone, Deal.advertiser_id, advertiser.phone)
+            .outerjoin(Order, Order.id == Deal.order_id)
+            .join(creator, creator.id == Deal.creator_id)
+            .join(advertiser, advertiser.id == Deal.advertiser_id)
+            .where(Deal.status == "in_progress", *_due_window(kind, today), ~reminded)
+            .order_by(Deal.deadline, Deal.id)
+            .limit(chunk_size)
+        )).all()
+        if not rows:
+            break
+
+        claimed = set((await db.execute(
+            pg_insert(DealReminder)
+            .values([{"deal_id": r.id, "kind": kind} for r in rows])
+            .on_conflict_do_nothing()
+            .returning(DealReminder.deal_id)
+        )).scalars())
+
+        notifications, sms = [], []
+        for deal_id, deadline, title, creator_id, creator_phone, advertiser_id, advertiser_phone in rows:
+            if deal_id not in claimed:
+                continue  # another sweeper got it first
+            heading, body, text = _messages(kind, title or "", deadline)
+            recipients = [(creator_id, creator_phone)]
+            if kind == "overdue":
+                recipients.append((advertiser_id, advertiser_phone))
+            for user_id, phone in recipients:
+                notifications.append({
+                    "user_id": user_id, "type": f"deal_{kind}", "title": heading, "body": body,
+                    "reference_type": "deal", "reference_id": deal_id,
+                })
+                sms.append((phone, text))
+        if notifications:
+            await db.execute(insert(Notification), notifications)
+            await queue_sms_batch(db, sms)
+        await db.commit()
+
+        total += len(claimed)
+        if len(rows) < chunk_size:
+            break
+
+    if total:
+        print(f"[Deadlines] {kind}: reminded {total} deal(s)")
+    return total
+
+
+@leader_only("deadlines")
+async def deadline_reminders():
+    from app.core.database import async_session
+
+    while True:
+        try:
+            async with async_session() as db:
+                for kind in ("due_soon", "overdue"):
+                    await sweep(db, kind)
+        except Exception as e:
+            print(f"[Deadlines] Error: {e}")
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
@@ -0,0 +1,93 @@
+from datetime import date, datetime
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.deal import Deal, DealEvent
+
+# event -> (allowed source statuses, target status)
+TRANSITIONS: dict[str, tuple[frozenset[str], str]] = {
+    "sign": (frozenset({"contract_pending", "contract_signed"}), "contract_signed"),
+    "sign_complete": (frozenset({"contract_pending", "contract_signed"}), "pending_payment"),
+    "pay": (frozenset({"pending_payment"}), "in_progress"),
+    "submit_work": (frozenset({"in_progress"}), "work_submitted"),
+    "confirm_work": (frozenset({"work_submitted"}), "completed"),
+    "auto_complete": (frozenset({"work_submitted"}), "completed"),
+    "dispute": (frozenset({"work_submitted"}), "disputed"),
+}
+
+
+class InvalidTransition(Exception):
+    def __init__(self, deal: Deal, event: str):
+        super().__init__(f"Deal {deal.id}: '{event}' is not allowed from '{deal.status}'")
+        self.deal = deal
+        self.event = event
+
+
+class ConcurrentUpdate(Exception):
+    """The deal changed since it was read (another request or the auto-completer won)."""
+
+    def __init__(self, deal: Deal, event: str):
+        super().__init__(f"Deal {deal.id}: '{event}' lost the race at version {deal.version}")
+        self.deal = deal
+        self.event = event
+
+
+def can_transition(deal: Deal, event: str) -> bool:
+    return deal.status in TRANSITIONS[event][0]
+
+
+def _jsonable(values: dict) -> dict:
+    return {k: v.isoformat() if isinstance(v, (date, datetime)) else v for k, v in values.items()}
+
+
+def record_event(
+    db: AsyncSession,
+    deal: Deal,
+    event: str,
+    from_status: str | None,
+    actor_id=None,
+    data: dict | None = None,
+) -> DealEvent:
+    """Append to the deal's timeline in the caller's transaction."""
+    entry = DealEvent(
+        deal_id=deal.id,
+        event=event,
+        from_status=from_status,
+        to_status=deal.status,
+        actor_id=actor_id,
+        data=_jsonable(data or {}),
+    )
+    db.add(entry)
+    return entry
+
+
+async def transition(db: AsyncSession, deal: Deal, event: str, *, actor_id=None, **values) -> Deal:
+    """Apply `event` with a compare-and-set on (status, version); does not commit.
+
+    Issues `UPDATE deals SET status=:to, version=version+1, ... WHERE id=:id AND
+    status=:from AND version=:v`. Zero rows means someone else moved the deal
+    first — no row locks are held between the read and this write. The matching
+    `deal_events` row is added to the same transaction.
+    """
+    if not can_transition(deal, event):
+        raise InvalidTransition(deal, event)
+
+    source, target = deal.status, TRANSITIONS[event][1]
+    result = await db.execute(
+        update(Deal)
+        .where(Deal.id == deal.id, Deal.status == deal.status, Deal.version == deal.version)
+        .values(status=target, version=Deal.version + 1, **values)
+        .returning(Deal.version, Deal.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise ConcurrentUpdate(deal, event)
+
+    # Reflect the write on the loaded object without marking it dirty
+    for key, value in {"status": target, "version": row.version, "updated_at": row.updated_at, **values}.items():
+        set_committed_value(deal, key, value)
+    record_event(db, deal, event, source, actor_id, values)
+    return deal
@@ -0,0 +1,141 @@
+from fastapi import WebSocket
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.chat import Chat, Message, Offer
+from app.models.deal import Deal
+
+
+class ConnectionManager:
+    """Manages active WebSocket connections per user."""
+
+    def __init__(self):
+        # user_id -> list of WebSocket connections
+        self.active: dict[str, list[WebSocket]] = {}
+
+    async def connect(self, user_id: str, ws: WebSocket):
+        await ws.accept()
+        self.active.setdefault(user_id, []).append(ws)
+
+    def disconnect(self, user_id: str, ws: WebSocket):
+        if user_id in self.active:
+            self.active[user_id] = [c for c in self.active[user_id] if c is not ws]
+            if not self.active[user_id]:
+                del self.active[user_id]
+
+    async def send_to_user(self, user_id: str, data: dict):
+        for ws in self.active.get(user_id, []):
+            try:
+                await ws.send_json(data)
+            except Exception:
+                pass
+
+    def is_online(self, user_id: str) -> bool:
+        return user_id in self.active and len(self.active[user_id]) > 0
+
+
+manager = ConnectionManager()
+
+
+def _iso(value) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _message_payload(msg: Message) -> dict:
+    return {
+        "id": str(msg.id),
+        "chat_id": str(msg.chat_id),
+        "sender_id": str(msg.sender_id),
+        "type": msg.type,
+        "content": msg.content,
+        "created_at": _iso(msg.created_at),
+    }
+
+
+async def _send(user_ids, event: str, data: dict):
+    payload = {"event": event, "data": data}
+    for user_id in {str(u) for u in user_ids if u}:
+        await manager.send_to_user(user_id, payload)
+
+
+async def emit_new_message(chat: Chat, msg: Message):
+    """`new_message` to both participants (sender gets it as delivery confirmation)."""
+    await _send([chat.participant_1, chat.participant_2], "new_message", _message_payload(msg))
+
+
+async def emit_chat_updated(db: AsyncSession, chat: Chat, user_ids=None):
+    """`chat_updated` with per-user unread count and last message preview.
+
+    Only online users are queried — offline clients refetch `GET /chats` on reconnect.
+    """
+    targets = [str(u) for u in (user_ids or [chat.participant_1, chat.participant_2])]
+    targets = [u for u in dict.fromkeys(targets) if manager.is_online(u)]
+    if not targets:
+        return
+
+    last_result = await db.execute(
+        select(Message).where(Message.chat_id == chat.id).order_by(Message.created_at.desc()).limit(1)
+    )
+    last_msg = last_result.scalar_one_or_none()
+    preview = (
+        {"content": last_msg.content, "type": last_msg.type, "created_at": _iso(last_msg.created_at)}
+        if last_msg
+        else None
+    )
+
+    for user_id in targets:
+        unread = (
+            await db.execute(
+                select(func.count())
+                .select_from(Message)
+                .where(Message.chat_id == chat.id, Message.sender_id != user_id, Message.read_at.is_(None))
+            )
+        ).scalar() or 0
+        await manager.send_to_user(user_id, {
+            "event": "chat_updated",
+            "data": {
+                "chat_id": str(chat.id),
+                "unread_count": unread,
+                "last_message": preview,
+                "updated_at": _iso(chat.last_message_at or chat.created_at),
+            },
+        })
+
+
+async def emit_offer_created(offer: Offer, order_title: str | None = None):
+    await _send([offer.sender_id, offer.recipient_id], "offer_created", {
+        "id": str(offer.id),
+        "chat_id": str(offer.chat_id),
+        "message_id": str(offer.message_id) if offer.message_id else None,
+        "sender_id": str(offer.sender_id),
+        "recipient_id": str(offer.recipient_id),
+        "order_id": str(offer.order_id),
+        "order_title": order_title,
+        "budget": offer.budget,
+        "deadline": _iso(offer.deadline),
+        "status": offer.status,
+        "created_at": _iso(offer.created_at),
+    })
+
+
+async def emit_offer_status_changed(offer: Offer):
+    await _send([offer.sender_id, offer.recipient_id], "offer_status_changed", {
+        "id": str(offer.id),
+        "chat_id": str(offer.chat_id),
+        "status": offer.status,
+        "viewed_at": _iso(offer.viewed_at),
+        "cancelled_at": _iso(offer.cancelled_at),
+    })
+
+
+async def emit_deal_created(deal: Deal):
+    await _send([deal.creator_id, deal.advertiser_id], "deal_created", {
+        "id": str(deal.id),
+        "offer_id": str(deal.offer_id),
+        "order_id": str(deal.order_id),
+        "creator_id": str(deal.creator_id),
+        "advertiser_id": str(deal.advertiser_id),
+        "budget": deal.budget,
+        "status": deal.status,
+        "created_at": _iso(deal.created_at),
+    })
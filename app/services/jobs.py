@@ -0,0 +1,198 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.job import Job
+
+POLL_INTERVAL_SECONDS = 1.0
+LOCK_TIMEOUT_SECONDS = 600  # a running job older than this is assumed to belong to a dead worker
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 5
+PRIORITY_HIGH = 10
+
+handlers: dict = {}
+failure_hooks: dict = {}
+
+
+class RetryLater(Exception):
+    """Raise from a handler to retry at a specific time without counting it as an error."""
+
+    def __init__(self, delay_seconds: float, reason: str = ""):
+        super().__init__(reason or f"retry in {delay_seconds}s")
+        self.delay_seconds = delay_seconds
+
+
+def job_handler(kind: str, on_failure=None):
+    """Register `async def handler(db, payload)` for a job kind.
+
+    The handler runs in the same transaction that marks the job done, so its DB
+    writes and the job's completion commit (or roll back) together. A handler
+    must not commit itself. To keep a record of failed attempts, pass
+    `async def on_failure(db, payload, error, dead)`: it runs in the transaction
+    that re-queues (or dead-letters) the job, after the handler's own writes
+    were rolled back. It is not called for RetryLater.
+    """
+
+    def decorator(fn):
+        handlers[kind] = fn
+        if on_failure is not None:
+            failure_hooks[kind] = on_failure
+        return fn
+
+    return decorator
+
+
+def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: dict | None = None,
+    *,
+    run_at: datetime | None = None,
+    priority: int = PRIORITY_NORMAL,
+    max_attempts: int = 5,
+) -> Job:
+    """Add a job to the caller's session; it becomes visible when the caller commits."""
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        run_at=run_at or datetime.now(timezone.utc),
+        priority=priority,
+        max_attempts=max_attempts,
+    )
+    db.add(job)
+    return job
+
+
+async def enqueue_many(
+    db: AsyncSession,
+    kind: str,
+    payloads: list[dict],
+    *,
+    priority: int = PRIORITY_NORMAL,
+    max_attempts: int = 5,
+):
+    """Queue one job per payload with a single multi-row INSERT; the caller commits."""
+    if not payloads:
+        return
+    now = datetime.now(timezone.utc)
+    await db.execute(
+        insert(Job),
+        [
+            {"kind": kind, "payload": p, "run_at": now, "priority": priority, "max_attempts": max_attempts}
+            for p in payloads
+        ],
+    )
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with full jitter: ~5s, 10s, 20s, ... capped at an hour."""
+    ceiling = min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+async def claim(db: AsyncSession, limit: int) -> list[Job]:
+    """Atomically move up to `limit` due jobs to `running`; concurrent workers skip each other's rows."""
+    due = (
+        select(Job.id)
+        .where(Job.status == "queued", Job.run_at <= func.now())
+        .order_by(Job.priority.desc(), Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .cte("due")
+    )
+    result = await db.execute(
+        update(Job)
+        .where(Job.id == due.c.id)
+        .values(status="running", attempts=Job.attempts + 1, locked_at=func.now())
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    jobs = result.scalars().all()
+    await db.commit()
+    return sorted(jobs, key=lambda j: (-j.priority, j.run_at))
+
+
+async def _fail(session_factory, job: Job, error: Exception):
+    retry_later = isinstance(error, RetryLater)
+    async with session_factory() as db:
+        values = {"locked_at": None, "last_error": str(error)[:2000] or error.__class__.__name__}
+        if retry_later:
+            # Not the job's fault (e.g. provider circuit open): don't burn an attempt
+            values.update(status="queued", attempts=Job.attempts - 1,
+                          run_at=datetime.now(timezone.utc) + timedelta(seconds=error.delay_seconds))
+        elif job.attempts >= job.max_attempts:
+            values.update(status="dead", finished_at=datetime.now(timezone.utc))
+            print(f"[Jobs] {job.kind} {job.id} dead-lettered after {job.attempts} attempts: {error}")
+        else:
+            values.update(status="queued",
+                          run_at=datetime.now(timezone.utc) + timedelta(seconds=backoff_seconds(job.attempts)))
+        await db.execute(update(Job).where(Job.id == job.id).values(**values))
+        hook = failure_hooks.get(job.kind)
+        if hook is not None and not retry_later:
+            await hook(db, job.payload, error, values.get("status") == "dead")
+        await db.commit()
+
+
+async def run_job(session_factory, job: Job):
+    handler = handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        async with session_factory() as db:
+            await handler(db, job.payload)
+            await db.execute(
+                update(Job)
+                .where(Job.id == job.id)
+                .values(status="done", locked_at=None, finished_at=datetime.now(timezone.utc))
+            )
+            await db.commit()
+    except Exception as e:
+        await _fail(session_factory, job, e)
+
+
+async def run_batch(session_factory, limit: int = 10) -> int:
+    """Claim and run one batch of due jobs concurrently. Returns the number of jobs run."""
+    async with session_factory() as db:
+        jobs = await claim(db, limit)
+    await asyncio.gather(*(run_job(session_factory, job) for job in jobs))
+    return len(jobs)
+
+
+async def requeue_stale(db: AsyncSession) -> int:
+    """Return jobs stuck in `running` (their worker died) to the queue."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=LOCK_TIMEOUT_SECONDS)
+    result = await db.execute(
+        update(Job)
+        .where(Job.status == "running", Job.locked_at < cutoff)
+        .values(status="queued", locked_at=None, last_error="requeued: worker lock timed out")
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def run_worker(session_factory=None, concurrency: int = 10):
+    """Consume the jobs table until cancelled."""
+    if session_factory is None:
+        from app.core.database import async_session
+
+        session_factory = async_session
+
+    next_reaping = datetime.now(timezone.utc)
+    while True:
+        try:
+            if datetime.now(timezone.utc) >= next_reaping:
+                async with session_factory() as db:
+                    await requeue_stale(db)
+                next_reaping = datetime.now(timezone.utc) + timedelta(seconds=LOCK_TIMEOUT_SECONDS / 10)
+
+            if await run_batch(session_factory, concurrency):
+                continue  # queue may have more — don't sleep while there is a backlog
+        except Exception as e:
+            print(f"[Jobs] Worker error: {e}")
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
@@ -0,0 +1,145 @@
+"""Double-entry ledger for escrow money.
+
+Every movement is a transaction of legs that sum to zero. `post()` writes the
+legs and bumps the materialized balances in `ledger_accounts` in the caller's
+transaction. Accounts:
+
+    external:payments   money received from advertisers (goes negative)
+    escrow              held until the deal completes
+    platform:revenue    commission
+    creator:<id>        owed to a creator, drained by payout batches
+    payouts:in_flight   batched, not yet confirmed by the provider
+    external:payouts    paid out (goes positive)
+
+Escrow held by deals funded before the ledger existed was brought in with
+`opening_balance` transactions (migration b3f7d1a8c5e2).
+
+Reconcile with `python -m app.services.ledger reconcile`.
+"""
+import asyncio
+import sys
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.ledger import LedgerAccount, LedgerEntry
+
+PAYMENTS_IN = "external:payments"
+ESCROW = "escrow"
+PLATFORM_REVENUE = "platform:revenue"
+PAYOUTS_IN_FLIGHT = "payouts:in_flight"
+PAYOUTS_OUT = "external:payouts"
+
+
+def creator_account(creator_id) -> str:
+    return f"creator:{creator_id}"
+
+
+class Txn(NamedTuple):
+    kind: str
+    currency: str
+    postings: list[tuple[str, int]]  # (account, amount); amounts sum to zero
+    deal_id: uuid.UUID | None = None
+    payout_id: uuid.UUID | None = None
+
+
+def escrow_funded(deal) -> Txn:
+    return Txn("escrow_funded", deal.currency, [(PAYMENTS_IN, -deal.budget), (ESCROW, deal.budget)], deal_id=deal.id)
+
+
+def deal_completed(deal) -> Txn:
+    """`deal` is a Deal or a row with id, creator_id, budget, currency, platform_fee and creator_payout."""
+    return Txn(
+        "deal_completed",
+        deal.currency,
+        [
+            (ESCROW, -deal.budget),
+            (PLATFORM_REVENUE, deal.platform_fee),
+            (creator_account(deal.creator_id), deal.creator_payout),
+        ],
+        deal_id=deal.id,
+    )
+
+
+async def post(db: AsyncSession, txns: list[Txn]):
+    """Write the legs of `txns` and apply them to account balances; does not commit."""
+    now = datetime.now(timezone.utc)
+    entries = []
+    deltas: dict[tuple[str, str], int] = defaultdict(int)
+    for txn in txns:
+        if sum(amount for _, amount in txn.postings) != 0:
+            raise ValueError(f"Unbalanced {txn.kind} transaction: {txn.postings}")
+        txn_id = uuid.uuid4()
+        for account, amount in txn.postings:
+            if amount == 0:
+                continue
+            entries.append({
+                "id": uuid.uuid4(), "txn_id": txn_id, "kind": txn.kind, "account": account,
+                "currency": txn.currency, "amount": amount, "deal_id": txn.deal_id,
+                "payout_id": txn.payout_id, "created_at": now,
+            })
+            deltas[(account, txn.currency)] += amount
+    if not entries:
+        return
+
+    await db.execute(insert(LedgerEntry), entries)
+    # One upsert for all touched accounts, in key order so concurrent posters
+    # lock the shared rows (escrow, platform:revenue) in the same order
+    stmt = pg_insert(LedgerAccount).values(
+        [{"account": a, "currency": c, "balance": d, "updated_at": now} for (a, c), d in sorted(deltas.items())]
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["account", "currency"],
+        set_={"balance": LedgerAccount.balance + stmt.excluded.balance, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+async def reconcile(db: AsyncSession) -> dict:
+    """Check the ledger in one scan of `ledger_entries`.
+
+    GROUPING SETS yields both the per-account sums (compared with the
+    materialized balances) and the per-transaction sums (which must be zero).
+    """
+    by_account = func.grouping(LedgerEntry.txn_id).label("by_account")
+    rows = (await db.execute(
+        select(LedgerEntry.account, LedgerEntry.currency, LedgerEntry.txn_id, func.sum(LedgerEntry.amount).label("total"), by_account)
+        .group_by(func.grouping_sets(
+            tuple_(LedgerEntry.account, LedgerEntry.currency),
+            tuple_(LedgerEntry.txn_id),
+        ))
+    )).all()
+    balances = {(a.account, a.currency): a.balance for a in (await db.execute(select(LedgerAccount))).scalars()}
+
+    computed = {(r.account, r.currency): int(r.total) for r in rows if r.by_account}
+    unbalanced_txns = [str(r.txn_id) for r in rows if not r.by_account and r.total != 0]
+    mismatched = [
+        {"account": a, "currency": c, "balance": balances.get((a, c), 0), "entries": computed.get((a, c), 0)}
+        for a, c in sorted(computed.keys() | balances.keys())
+        if balances.get((a, c), 0) != computed.get((a, c), 0)
+    ]
+    return {
+        "ok": not mismatched and not unbalanced_txns,
+        "accounts": len(computed.keys() | balances.keys()),
+        "mismatched_accounts": mismatched,
+        "unbalanced_txns": unbalanced_txns,
+    }
+
+
+async def _main():
+    from app.core.database import async_session
+
+    async with async_session() as db:
+        report = await reconcile(db)
+    print(f"[Ledger] {report}")
+    return report["ok"]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["reconcile"]:
+        sys.exit("usage: python -m app.services.ledger reconcile")
+    sys.exit(0 if asyncio.run(_main()) else 1)
@@ -0,0 +1,146 @@
+"""One-time login codes.
+
+`settings.OTP_STORE` picks the backend:
+
+- "postgres": `otp_codes`, keyed by (phone, created_at) and range-partitioned
+  by day. Every query is bounded to the last few minutes, so it touches one or
+  two small partitions through the primary key however old the table is. The
+  worker drops days older than yesterday (app.services.partitions).
+- "memory": a per-process dict with TTL expiry. Codes issued by one process
+  can't be verified by another, so it is only for a single API process (local
+  runs, load tests).
+
+Only an HMAC of each code is stored.
+"""
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Protocol
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.otp import OTPCode
+
+PURGE_INTERVAL_SECONDS = 60
+
+
+def _ttl() -> timedelta:
+    return timedelta(minutes=settings.OTP_EXPIRE_MINUTES)
+
+
+def code_hash(phone: str, code: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), f"{phone}:{code}".encode(), hashlib.sha256).hexdigest()
+
+
+class OtpStore(Protocol):
+    async def issue(self, db: AsyncSession, phone: str, code: str) -> float:
+        """Store a new code unless the phone got an unused one less than
+        OTP_RATE_LIMIT_SECONDS ago. Returns 0 if issued, else the seconds to wait.
+        Does not commit."""
+        ...
+
+    async def verify(self, db: AsyncSession, phone: str, code: str) -> bool:
+        """Consume a matching unexpired code; False if there is none. Does not commit."""
+        ...
+
+
+class PostgresOtpStore:
+    async def issue(self, db: AsyncSession, phone: str, code: str) -> float:
+        now = datetime.now(timezone.utc)
+        last = await db.scalar(
+            select(func.max(OTPCode.created_at)).where(
+                OTPCode.phone == phone,
+                OTPCode.created_at > now - timedelta(seconds=settings.OTP_RATE_LIMIT_SECONDS),
+                OTPCode.used_at.is_(None),
+            )
+        )
+        if last is not None:
+            return settings.OTP_RATE_LIMIT_SECONDS - (now - last).total_seconds()
+        db.add(OTPCode(phone=phone, created_at=now, code_hash=code_hash(phone, code), expires_at=now + _ttl()))
+        return 0
+
+    async def verify(self, db: AsyncSession, phone: str, code: str) -> bool:
+        now = datetime.now(timezone.utc)
+        # Check and consume in one statement, so a code can't be used twice concurrently
+        result = await db.execute(
+            update(OTPCode)
+            .where(
+                OTPCode.phone == phone,
+                OTPCode.created_at > now - _ttl(),  # lets the planner skip older partitions
+                OTPCode.expires_at > now,
+                OTPCode.used_at.is_(None),
+                OTPCode.code_hash == code_hash(phone, code),
+            )
+            .values(used_at=now)
+            .returning(OTPCode.created_at)
+            .execution_options(synchronize_session=False)
+        )
+        return result.first() is not None
+
+
+class _Code(NamedTuple):
+    hash: str
+    issued_at: float
+    expires_at: float
+
+
+class MemoryOtpStore:
+    def __init__(self):
+        self.codes: dict[str, list[_Code]] = {}
+        self._next_purge = 0.0
+
+    def purge(self, now: float | None = None):
+        """Forget expired codes and phones left without any."""
+        now = time.monotonic() if now is None else now
+        for phone in list(self.codes):
+            live = [c for c in self.codes[phone] if c.expires_at > now]
+            if live:
+                self.codes[phone] = live
+            else:
+                del self.codes[phone]
+        self._next_purge = now + PURGE_INTERVAL_SECONDS
+
+    def _live(self, phone: str, now: float) -> list[_Code]:
+        return [c for c in self.codes.get(phone, ()) if c.expires_at > now]
+
+    async def issue(self, db: AsyncSession, phone: str, code: str) -> float:
+        now = time.monotonic()
+        if now >= self._next_purge:
+            self.purge(now)
+        live = self._live(phone, now)
+        if live and now - live[-1].issued_at < settings.OTP_RATE_LIMIT_SECONDS:
+            return settings.OTP_RATE_LIMIT_SECONDS - (now - live[-1].issued_at)
+        live.append(_Code(code_hash(phone, code), now, now + _ttl().total_seconds()))
+        self.codes[phone] = live
+        return 0
+
+    async def verify(self, db: AsyncSession, phone: str, code: str) -> bool:
+        now = time.monotonic()
+        live = self._live(phone, now)
+        expected = code_hash(phone, code)
+        for c in live:
+            if hmac.compare_digest(c.hash, expected):
+                live.remove(c)
+                if live:
+                    self.codes[phone] = live
+                else:
+                    self.codes.pop(phone, None)
+                return True
+        return False
+
+
+stores = {"postgres": PostgresOtpStore, "memory": MemoryOtpStore}
+_store: OtpStore | None = None
+
+
+def get_otp_store() -> OtpStore:
+    global _store
+    if _store is None:
+        try:
+            _store = stores[settings.OTP_STORE]()
+        except KeyError:
+            raise ValueError(f"Unknown OTP store '{settings.OTP_STORE}'")
+    return _store
@@ -0,0 +1,119 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.leader import leader_only
+
+MONTHS_AHEAD = 2
+DAYS_AHEAD = 2
+CHECK_INTERVAL_SECONDS = 6 * 3600
+
+# Tables range-partitioned by month on created_at
+MONTHLY_TABLES = ("deal_events",)
+# Tables range-partitioned by day on created_at -> days of history to keep
+DAILY_TABLES = {"otp_codes": 1}
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def ensure_monthly_partitions(db: AsyncSession, table: str, months_ahead: int = MONTHS_AHEAD) -> list[str]:
+    """Create `<table>_YYYY_MM` partitions for this month and the next `months_ahead`.
+
+    Partitions are created before any row can land in them: a month that already
+    has rows in the default partition can no longer be attached.
+    """
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    names = []
+    for i in range(months_ahead + 1):
+        start, end = _add_months(this_month, i), _add_months(this_month, i + 1)
+        name = f"{table}_{start:%Y_%m}"
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start} 00:00+00') TO ('{end} 00:00+00')"
+        ))
+        names.append(name)
+    await db.commit()
+    return names
+
+
+async def ensure_daily_partitions(db: AsyncSession, table: str, days_ahead: int = DAYS_AHEAD) -> list[str]:
+    """Create `<table>_YYYY_MM_DD` partitions for today and the next `days_ahead` days."""
+    today = datetime.now(timezone.utc).date()
+    names = []
+    for i in range(days_ahead + 1):
+        start = today + timedelta(days=i)
+        name = f"{table}_{start:%Y_%m_%d}"
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start} 00:00+00') TO ('{start + timedelta(days=1)} 00:00+00')"
+        ))
+        names.append(name)
+    await db.commit()
+    return names
+
+
+async def drop_daily_partitions(db: AsyncSession, table: str, keep_days: int) -> list[str]:
+    """Drop day partitions older than `keep_days` and purge the same range from the default partition."""
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=keep_days)
+    result = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ),
+        {"table": table},
+    )
+    dropped = []
+    for (name,) in result.all():
+        try:
+            day = datetime.strptime(name[len(table) + 1:], "%Y_%m_%d").date()
+        except ValueError:
+            continue  # the default partition
+        if day < cutoff:
+            await db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    await db.execute(
+        text(f"DELETE FROM {table}_default WHERE created_at < :cutoff"),
+        {"cutoff": datetime(cutoff.year, cutoff.month, cutoff.day, tzinfo=timezone.utc)},
+    )
+    await db.commit()
+    return sorted(dropped)
+
+
+async def _maintain_daily(db: AsyncSession, table: str):
+    await ensure_daily_partitions(db, table)
+    await drop_daily_partitions(db, table, DAILY_TABLES[table])
+
+
+async def maintain_tables(session_factory) -> list[str]:
+    """One upkeep pass over every partitioned table; returns the tables whose step failed.
+
+    Each table gets its own session and transaction, so a failure on one (a lock
+    timeout on deal_events, say) doesn't hold back the others.
+    """
+    steps = [(table, ensure_monthly_partitions) for table in MONTHLY_TABLES]
+    steps += [(table, _maintain_daily) for table in DAILY_TABLES]
+    failed = []
+    for table, step in steps:
+        try:
+            async with session_factory() as db:
+                await step(db, table)
+        except Exception as e:
+            print(f"[Partitions] Error on {table}: {e}")
+            failed.append(table)
+    return failed
+
+
+@leader_only("partitions")
+async def maintain_partitions():
+    """Keep upcoming partitions in place and drop expired daily ones (runs every few hours on the leader)."""
+    from app.core.database import async_session
+
+    while True:
+        await maintain_tables(async_session)
+        await asyncio.sleep(CHECK_INTERVAL_SECONDS)
@@ -0,0 +1,229 @@
+"""Payment provider integration.
+
+Providers are selected with `settings.PAYMENT_PROVIDER`. Only the local fake
+exists so far: it keeps everything in memory and never moves money, which is
+what local runs and tests use.
+
+Provider calls never happen inside a request. `/deals/{id}/pay` records a
+pending `Payment` and queues `payments.create`; the provider's webhook is
+deduplicated by event id and queues `payments.verify`, which re-reads the
+payment from the provider and, on success, moves the deal to `in_progress`.
+"""
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import NamedTuple, Protocol
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.deal import Deal
+from app.models.payment import Payment, PaymentEvent
+from app.services import ledger
+from app.services.deal_state import transition
+from app.services.jobs import PRIORITY_HIGH, enqueue, job_handler
+
+
+class PaymentProviderError(Exception):
+    pass
+
+
+class InvalidWebhook(PaymentProviderError):
+    pass
+
+
+class ProviderPayment(NamedTuple):
+    ref: str
+    status: str  # pending | succeeded | failed
+
+
+class WebhookEvent(NamedTuple):
+    id: str
+    type: str
+    payment_ref: str
+    payload: dict
+
+
+class PaymentProvider(Protocol):
+    name: str
+
+    async def create_payment(self, payment_id: str, amount: int, currency: str, method: str) -> ProviderPayment:
+        """Register a charge; `payment_id` is the idempotency key."""
+        ...
+
+    async def get_payment(self, ref: str) -> ProviderPayment:
+        """Authoritative status, used to verify whatever a webhook claims."""
+        ...
+
+    def parse_webhook(self, body: bytes, headers) -> WebhookEvent:
+        """Check the signature and extract the event; raises InvalidWebhook."""
+        ...
+
+    async def send_payout(self, payout_id: str, creator_id: str, amount: int, currency: str) -> str:
+        """Transfer `amount` to the creator; returns the provider reference.
+
+        `payout_id` is the idempotency key: repeating a call must not pay twice.
+        """
+        ...
+
+
+class FakePaymentProvider:
+    """Settles charges instantly with `next_status`; set it to "pending" and call
+    `settle()` to simulate the provider completing a charge and sending a webhook."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.payments: dict[str, dict] = {}
+        self.payouts: dict[str, dict] = {}
+        self.next_status = "succeeded"
+
+    def _sign(self, body: bytes) -> str:
+        secret = (settings.PAYMENT_WEBHOOK_SECRET or settings.SECRET_KEY).encode()
+        return hmac.new(secret, body, hashlib.sha256).hexdigest()
+
+    async def create_payment(self, payment_id: str, amount: int, currency: str, method: str) -> ProviderPayment:
+        for ref, p in self.payments.items():
+            if p["payment_id"] == payment_id:
+                return ProviderPayment(ref, p["status"])
+        ref = f"fake_pay_{uuid.uuid4().hex[:12]}"
+        self.payments[ref] = {"payment_id": payment_id, "amount": amount, "currency": currency, "status": self.next_status}
+        return ProviderPayment(ref, self.next_status)
+
+    async def get_payment(self, ref: str) -> ProviderPayment:
+        if ref not in self.payments:
+            raise PaymentProviderError(f"Unknown payment {ref}")
+        return ProviderPayment(ref, self.payments[ref]["status"])
+
+    def settle(self, ref: str, status: str = "succeeded") -> tuple[bytes, dict]:
+        """Complete a charge on the provider side; returns the webhook body and headers it would send."""
+        self.payments[ref]["status"] = status
+        body = json.dumps({"id": f"evt_{uuid.uuid4().hex[:12]}", "type": f"payment.{status}", "payment_ref": ref}).encode()
+        return body, {"X-Signature": self._sign(body)}
+
+    def parse_webhook(self, body: bytes, headers) -> WebhookEvent:
+        if not hmac.compare_digest(headers.get("x-signature", ""), self._sign(body)):
+            raise InvalidWebhook("Bad signature")
+        try:
+            data = json.loads(body)
+            return WebhookEvent(data["id"], data["type"], data["payment_ref"], data)
+        except (ValueError, KeyError) as e:
+            raise InvalidWebhook(f"Malformed event: {e}")
+
+    async def send_payout(self, payout_id: str, creator_id: str, amount: int, currency: str) -> str:
+        if payout_id not in self.payouts:
+            self.payouts[payout_id] = {
+                "ref": f"fake_po_{uuid.uuid4().hex[:12]}",
+                "creator_id": creator_id,
+                "amount": amount,
+                "currency": currency,
+            }
+        return self.payouts[payout_id]["ref"]
+
+
+providers = {"fake": FakePaymentProvider}
+_provider: PaymentProvider | None = None
+
+
+def get_payment_provider() -> PaymentProvider:
+    global _provider
+    if _provider is None:
+        try:
+            _provider = providers[settings.PAYMENT_PROVIDER]()
+        except KeyError:
+            raise PaymentProviderError(f"Unknown payment provider '{settings.PAYMENT_PROVIDER}'")
+    return _provider
+
+
+async def start_payment(db: AsyncSession, deal: Deal, method: str) -> Payment:
+    """Record a pending payment and queue its creation with the provider; does not commit.
+
+    A live payment for the deal is returned as is, so retries of /pay never charge twice.
+    """
+    existing = (await db.execute(
+        select(Payment).where(Payment.deal_id == deal.id, Payment.status.in_(("pending", "succeeded")))
+    )).scalar_one_or_none()
+    if existing:
+        return existing
+
+    payment = Payment(
+        deal_id=deal.id,
+        provider=get_payment_provider().name,
+        amount=deal.budget,
+        currency=deal.currency,
+        method=method,
+    )
+    db.add(payment)
+    await db.flush()
+    enqueue(db, "payments.create", {"payment_id": str(payment.id)}, priority=PRIORITY_HIGH)
+    return payment
+
+
+async def accept_webhook(db: AsyncSession, provider_name: str, body: bytes, headers) -> bool:
+    """Store a provider event once and queue its verification; does not commit.
+
+    Returns False for a redelivered event. Nothing here talks to the provider,
+    so the endpoint answers in one short transaction.
+    """
+    provider = get_payment_provider()
+    if provider.name != provider_name:
+        raise InvalidWebhook(f"Provider '{provider_name}' is not enabled")
+    event = provider.parse_webhook(body, headers)
+
+    result = await db.execute(
+        pg_insert(PaymentEvent)
+        .values(provider=provider.name, event_id=event.id, payment_ref=event.payment_ref, payload=event.payload)
+        .on_conflict_do_nothing()
+        .returning(PaymentEvent.event_id)
+    )
+    if result.scalar_one_or_none() is None:
+        return False
+    enqueue(db, "payments.verify", {"payment_ref": event.payment_ref}, priority=PRIORITY_HIGH)
+    return True
+
+
+async def _apply_status(db: AsyncSession, payment: Payment, status: str):
+    if status == "failed":
+        payment.status = "failed"
+    elif status == "succeeded":
+        now = datetime.now(timezone.utc)
+        payment.status = "succeeded"
+        payment.paid_at = now
+        deal = await db.get(Deal, payment.deal_id)
+        await transition(
+            db, deal, "pay", actor_id=deal.advertiser_id,
+            escrow_amount=payment.amount, payment_method=payment.method, paid_at=now,
+        )
+        await ledger.post(db, [ledger.escrow_funded(deal)])
+
+
+@job_handler("payments.create")
+async def create_payment_job(db: AsyncSession, payload: dict):
+    payment = (await db.execute(
+        select(Payment).where(Payment.id == uuid.UUID(payload["payment_id"])).with_for_update()
+    )).scalar_one()
+    if payment.status != "pending" or payment.provider_ref:
+        return
+
+    result = await get_payment_provider().create_payment(str(payment.id), payment.amount, payment.currency, payment.method)
+    payment.provider_ref = result.ref
+    await _apply_status(db, payment, result.status)
+
+
+@job_handler("payments.verify")
+async def verify_payment_job(db: AsyncSession, payload: dict):
+    payment = (await db.execute(
+        select(Payment).where(Payment.provider_ref == payload["payment_ref"]).with_for_update()
+    )).scalar_one_or_none()
+    if payment is None:
+        # The webhook can overtake the commit of payments.create; retried with backoff
+        raise LookupError(f"No payment with provider ref {payload['payment_ref']}")
+    if payment.status != "pending":
+        return
+
+    result = await get_payment_provider().get_payment(payment.provider_ref)
+    await _apply_status(db, payment, result.status)
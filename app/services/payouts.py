@@ -0,0 +1,102 @@
+"""Payout batching: one payout per creator (and currency) per run.
+
+A batch run claims every completed, unpaid deal, creates the payouts, moves
+the money from `creator:<id>` to `payouts:in_flight` and queues a
+`payouts.send` job per payout, all in one transaction. The job calls the
+payment provider with the payout id as idempotency key and settles the ledger.
+"""
+import asyncio
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.leader import leader_only
+from app.models.deal import Deal
+from app.models.ledger import Payout
+from app.services import ledger
+from app.services.jobs import enqueue, job_handler
+from app.services.payments import get_payment_provider
+
+
+async def create_payout_batch(db: AsyncSession) -> list[Payout]:
+    """Group unpaid completed deals into payouts and queue them; commits."""
+    rows = (await db.execute(
+        select(Deal.id, Deal.creator_id, Deal.currency, Deal.creator_payout)
+        .where(Deal.status == "completed", Deal.payout_id.is_(None))
+        .with_for_update(skip_locked=True)
+    )).all()
+
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row.creator_id, row.currency)].append(row)
+
+    payouts, assignments, txns = [], [], []
+    for (creator_id, currency), deals in groups.items():
+        payout = Payout(
+            id=uuid.uuid4(),
+            creator_id=creator_id,
+            currency=currency,
+            amount=sum(d.creator_payout for d in deals),
+            deal_count=len(deals),
+        )
+        payouts.append(payout)
+        assignments.extend({"deal_id": d.id, "batch_payout_id": payout.id} for d in deals)
+        txns.append(ledger.Txn(
+            "payout_created", currency,
+            [(ledger.creator_account(creator_id), -payout.amount), (ledger.PAYOUTS_IN_FLIGHT, payout.amount)],
+            payout_id=payout.id,
+        ))
+    if not payouts:
+        await db.rollback()
+        return []
+
+    db.add_all(payouts)
+    await db.flush()
+    deals = Deal.__table__
+    await db.execute(
+        update(deals).where(deals.c.id == bindparam("deal_id")).values(payout_id=bindparam("batch_payout_id")),
+        assignments,
+    )
+    await ledger.post(db, txns)
+    for payout in payouts:
+        enqueue(db, "payouts.send", {"payout_id": str(payout.id)}, max_attempts=10)
+    await db.commit()
+
+    print(f"[Payouts] Batched {len(rows)} deal(s) into {len(payouts)} payout(s)")
+    return payouts
+
+
+@job_handler("payouts.send")
+async def send_payout_job(db: AsyncSession, payload: dict):
+    payout = (await db.execute(
+        select(Payout).where(Payout.id == uuid.UUID(payload["payout_id"])).with_for_update()
+    )).scalar_one()
+    if payout.status == "sent":
+        return
+
+    ref = await get_payment_provider().send_payout(str(payout.id), str(payout.creator_id), payout.amount, payout.currency)
+    payout.status = "sent"
+    payout.provider_ref = ref
+    payout.sent_at = datetime.now(timezone.utc)
+    await ledger.post(db, [ledger.Txn(
+        "payout_sent", payout.currency,
+        [(ledger.PAYOUTS_IN_FLIGHT, -payout.amount), (ledger.PAYOUTS_OUT, payout.amount)],
+        payout_id=payout.id,
+    )])
+
+
+@leader_only("payouts")
+async def payout_batches():
+    from app.core.database import async_session
+
+    while True:
+        try:
+            async with async_session() as db:
+                await create_payout_batch(db)
+        except Exception as e:
+            print(f"[Payouts] Error: {e}")
+        await asyncio.sleep(settings.PAYOUT_INTERVAL_HOURS * 3600)
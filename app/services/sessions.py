@@ -0,0 +1,187 @@
+"""Device sessions and the revocation denylist.
+
+Signing in opens a `sessions` row per device; every token issued for it carries
+the row's id as `sid`. Refresh tokens rotate: the row keeps the SHA-256 of the
+only refresh token that may be used next, and presenting an older one (a
+stolen copy, replayed after the owner refreshed) revokes the whole session.
+
+Access tokens are not checked against the table. Each API process keeps a
+`Denylist` of revoked session ids: a bloom filter answers "not revoked" for
+almost every token without hashing into a large set, and an exact set settles
+the rare positive. `denylist_refresher` pulls sessions revoked since its last
+poll every DENYLIST_REFRESH_SECONDS, so `get_current_user` never waits on the
+DB for revocation. A logout is visible immediately in the process that served
+it and within one poll everywhere else.
+"""
+import asyncio
+import hashlib
+import math
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import create_access_token, create_refresh_token
+from app.models.session import UserSession
+
+BLOOM_CAPACITY = 100_000
+BLOOM_ERROR_RATE = 0.01
+# Revocations are polled by revoked_at; re-read a margin so rows committed late
+# (or stamped by a host with a slightly different clock) are not skipped
+POLL_OVERLAP = timedelta(seconds=60)
+REBUILD_INTERVAL = timedelta(hours=1)
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.sha256(key.encode()).digest()
+        h1, h2 = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class Denylist:
+    """Revoked session ids known to this process."""
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY):
+        self.bloom = BloomFilter(capacity)
+        self.exact: set[str] = set()
+        self.cursor: datetime | None = None  # latest revoked_at seen
+        self.rebuilt_at: datetime | None = None
+
+    def add(self, session_id: str):
+        self.bloom.add(session_id)
+        self.exact.add(session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.bloom and session_id in self.exact
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    def is_revoked(self, payload: dict) -> bool:
+        """Revocation check for `decode_token`. Tokens without a session can't be revoked, so they are refused."""
+        sid = payload.get("sid")
+        return sid is None or sid in self
+
+
+denylist = Denylist()
+
+
+async def refresh_denylist(db: AsyncSession) -> int:
+    """Bring `denylist` up to date; returns how many revocations were read.
+
+    Normally reads only sessions revoked since the last poll. Once an hour it
+    rebuilds from scratch, dropping sessions that have expired (their tokens
+    have too) so the set doesn't grow forever.
+    """
+    global denylist
+    now = datetime.now(timezone.utc)
+    current = denylist
+    full = current.rebuilt_at is None or now - current.rebuilt_at >= REBUILD_INTERVAL
+    query = select(UserSession.id, UserSession.revoked_at)
+    if full:
+        query = query.where(UserSession.revoked_at.is_not(None), UserSession.expires_at > now)
+    elif current.cursor is not None:
+        query = query.where(UserSession.revoked_at > current.cursor - POLL_OVERLAP)
+    else:
+        query = query.where(UserSession.revoked_at.is_not(None))
+    known = set(current.exact) if full else None
+    rows = (await db.execute(query)).all()
+
+    target = Denylist(max(BLOOM_CAPACITY, 2 * len(rows))) if full else current
+    for row in rows:
+        target.add(str(row.id))
+        if target.cursor is None or row.revoked_at > target.cursor:
+            target.cursor = row.revoked_at
+    if full:
+        # Logouts served by this process while the query ran
+        for sid in current.exact - known - target.exact:
+            target.add(sid)
+        target.cursor = target.cursor or current.cursor
+        target.rebuilt_at = now
+        denylist = target
+    return len(rows)
+
+
+def is_revoked(payload: dict) -> bool:
+    """The check to register with `set_revocation_check` (follows `denylist` across rebuilds)."""
+    return denylist.is_revoked(payload)
+
+
+async def denylist_refresher():
+    """Keep this process's denylist current. Runs in every API process, not just the leader."""
+    from app.core.database import async_session
+
+    while True:
+        try:
+            async with async_session() as db:
+                await refresh_denylist(db)
+        except Exception as e:
+            print(f"[Sessions] Error: {e}")
+        await asyncio.sleep(settings.DENYLIST_REFRESH_SECONDS)
+
+
+def _refresh_expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+def open_session(db: AsyncSession, user_id: uuid.UUID, device: str | None) -> tuple[str, str]:
+    """Start a session for a sign-in; returns (access, refresh) tokens. Does not commit."""
+    session_id = uuid.uuid4()
+    refresh = create_refresh_token(str(user_id), str(session_id))
+    db.add(UserSession(
+        id=session_id,
+        user_id=user_id,
+        device=device[:200] if device else None,
+        refresh_token_hash=token_hash(refresh),
+        expires_at=_refresh_expiry(),
+    ))
+    return create_access_token(str(user_id), str(session_id)), refresh
+
+
+def rotate_session(session: UserSession) -> tuple[str, str]:
+    """Issue the next token pair; the previous refresh token stops working. Does not commit."""
+    refresh = create_refresh_token(str(session.user_id), str(session.id))
+    session.refresh_token_hash = token_hash(refresh)
+    session.last_used_at = datetime.now(timezone.utc)
+    session.expires_at = _refresh_expiry()
+    return create_access_token(str(session.user_id), str(session.id)), refresh
+
+
+async def revoke_session(db: AsyncSession, session_id: str, user_id: uuid.UUID | None = None) -> bool:
+    """Revoke a session (only if it belongs to `user_id`, when given). Does not commit.
+
+    The id goes into this process's denylist right away; the others pick it up
+    on their next poll.
+    """
+    query = (
+        update(UserSession)
+        .where(UserSession.id == uuid.UUID(session_id), UserSession.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+        .returning(UserSession.id)
+        .execution_options(synchronize_session=False)
+    )
+    if user_id is not None:
+        query = query.where(UserSession.user_id == user_id)
+    revoked = (await db.execute(query)).first() is not None
+    if revoked:
+        denylist.add(session_id)
+    return revoked
@@ -1,37 +1,419 @@
+"""Outgoing SMS.
+
+Requests never call Mobizon. `queue_sms` records an `sms_messages` row and a
+`sms.send` job in the caller's transaction; the worker delivers it with
+retries and backoff, and the row tracks each message's delivery status. A
+circuit breaker stops calling Mobizon while it is failing, so queued messages
+wait instead of burning their retries.
+
+Gateways sit behind the `SmsProvider` protocol. `settings.SMS_PROVIDER` lists
+them in failover order (e.g. "mobizon" or "mobizon,fake"); each message goes
+to the first provider whose circuit is closed. "fake" keeps messages in memory,
+for local runs and load tests that must not send real SMS.
+
+Texts carry login and signing codes, so digits are masked once a message is
+sent, failed or expired, and `purge_sms_messages` deletes rows older than
+SMS_RETENTION_DAYS.
+"""
+import asyncio
+import re
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Protocol
+
 import httpx
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.leader import leader_only
+from app.models.sms import SmsMessage
+from app.services.jobs import PRIORITY_NORMAL, RetryLater, enqueue, enqueue_many, job_handler
 
 
-async def send_sms(phone: str, text: str) -> bool:
-    """Send SMS via Mobizon API. Phone format: +77771234567 -> 77771234567"""
-    recipient = phone.lstrip("+")
+class CallMetrics:
+    """Per-process counters and recent latencies of outbound calls, shown on GET /metrics."""
 
-    params = {
-        "recipient": recipient,
-        "text": text,
-        "apiKey": settings.MOBIZON_API_KEY,
-        "output": "json",
-        "api": "v1",
-    }
+    def __init__(self, window: int = 1000):
+        self.calls = 0
+        self.outcomes: dict[str, int] = {}
+        self.latencies_ms: deque[float] = deque(maxlen=window)
 
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(
-                f"{settings.MOBIZON_API_URL}/message/sendsmsmessage",
-                params=params,
-            )
-            data = resp.json()
-            if data.get("code") == 0:
-                return True
-            print(f"[Mobizon] Error: {data.get('message', 'Unknown error')}")
+    def observe(self, latency_ms: float, outcome: str):
+        self.calls += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.latencies_ms.append(latency_ms)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self.latencies_ms)
+
+        def pct(p: float) -> float | None:
+            return round(recent[min(int(len(recent) * p), len(recent) - 1)], 1) if recent else None
+
+        return {"calls": self.calls, "outcomes": dict(self.outcomes), "p50_ms": pct(0.5), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+_client: httpx.AsyncClient | None = None
+
+
+def start_sms_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """Create the process-wide Mobizon client (from lifespan / worker startup).
+
+    Connections are kept alive between messages, so an OTP burst reuses a few
+    TLS sessions instead of handshaking per SMS. `transport` lets tests point
+    it at a fake Mobizon.
+    """
+    global _client
+    _client = httpx.AsyncClient(
+        base_url=settings.MOBIZON_API_URL,
+        timeout=httpx.Timeout(
+            connect=settings.SMS_CONNECT_TIMEOUT,
+            read=settings.SMS_READ_TIMEOUT,
+            write=settings.SMS_CONNECT_TIMEOUT,
+            pool=settings.SMS_CONNECT_TIMEOUT,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.SMS_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SMS_MAX_CONNECTIONS,
+            keepalive_expiry=30,
+        ),
+        transport=transport,
+    )
+    return _client
+
+
+async def close_sms_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_sms_client() -> httpx.AsyncClient:
+    return _client or start_sms_client()
+
+
+class SmsError(Exception):
+    def __init__(self, outcome: str, message: str):
+        super().__init__(message)
+        self.outcome = outcome  # rejected | timeout | error | unavailable
+
+
+class SmsUnavailable(SmsError):
+    """Every provider's circuit is open; nothing was sent."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("unavailable", "SMS circuit open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Per-process breaker around one SMS gateway.
+
+    The circuit opens after `threshold` consecutive failures, or once the
+    failure share of the last `window` calls reaches `error_rate`, and calls
+    are refused for `reset_seconds`. Then a single probe is let through:
+    success closes the circuit, failure opens it again. Rejections (bad number,
+    low balance) are answers from a healthy gateway and don't count as failures.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float, error_rate: float = 1.0, window: int = 20):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.error_rate = error_rate
+        self.recent: deque[bool] = deque(maxlen=window)  # True = failure
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.probing or self.retry_after() == 0 else "open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(self.opened_at + self.reset_seconds - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.probing or self.retry_after() > 0:
             return False
-    except Exception as e:
-        print(f"[Mobizon] Request failed: {e}")
+        self.probing = True
+        return True
+
+    def record_success(self):
+        self.recent.append(False)
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def _error_rate_exceeded(self) -> bool:
+        return len(self.recent) == self.recent.maxlen and sum(self.recent) >= self.error_rate * len(self.recent)
+
+    def record_failure(self):
+        self.recent.append(True)
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold or self._error_rate_exceeded():
+            if self.opened_at is None or self.probing:
+                print(f"[SMS] Circuit open for {self.reset_seconds}s after {self.failures} failure(s)")
+            self.opened_at = time.monotonic()
+            self.recent.clear()
+        self.probing = False
+
+
+class SmsProvider(Protocol):
+    name: str
+
+    async def send(self, phone: str, text: str) -> str:
+        """Send one message and return the provider's message id; raises SmsError."""
+        ...
+
+
+class MobizonProvider:
+    """Mobizon over the process-wide pooled client."""
+
+    name = "mobizon"
+
+    async def send(self, phone: str, text: str) -> str:
+        # Phone format: +77771234567 -> 77771234567
+        params = {
+            "recipient": phone.lstrip("+"),
+            "text": text,
+            "apiKey": settings.MOBIZON_API_KEY,
+            "output": "json",
+            "api": "v1",
+        }
+        try:
+            resp = await get_sms_client().get("/message/sendsmsmessage", params=params)
+            data = resp.json()
+        except httpx.TimeoutException as e:
+            raise SmsError("timeout", f"Request timed out: {e!r}") from e
+        except Exception as e:
+            raise SmsError("error", f"Request failed: {e!r}") from e
+        if data.get("code") != 0:
+            raise SmsError("rejected", data.get("message") or f"code {data.get('code')}")
+        return str(data.get("data", {}).get("messageId", ""))
+
+
+class FakeSmsProvider:
+    """Keeps messages in memory and sends nothing. Set `fail_next` / `reject_next`
+    to make that many calls time out / be rejected, `delay` to add latency."""
+
+    name = "fake"
+
+    def __init__(self, name: str = "fake"):
+        self.name = name
+        self.sent: list[dict] = []
+        self.fail_next = 0
+        self.reject_next = 0
+        self.delay = 0.0
+
+    async def send(self, phone: str, text: str) -> str:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail_next:
+            self.fail_next -= 1
+            raise SmsError("timeout", f"{self.name}: simulated timeout")
+        if self.reject_next:
+            self.reject_next -= 1
+            raise SmsError("rejected", f"{self.name}: simulated rejection")
+        self.sent.append({"phone": phone, "text": text})
+        return f"{self.name}_{len(self.sent)}"
+
+
+class Delivery(NamedTuple):
+    provider: str
+    message_id: str
+
+
+class ProviderSlot(NamedTuple):
+    provider: SmsProvider
+    breaker: CircuitBreaker
+    metrics: CallMetrics
+
+
+class FailoverSms:
+    """Sends through the first provider whose circuit is closed.
+
+    A timeout or connection error moves the same message on to the next
+    provider; a rejection is final. Providers come back into rotation once a
+    probe through their half-open circuit succeeds.
+    """
+
+    def __init__(
+        self,
+        providers: list[SmsProvider],
+        *,
+        threshold: int = settings.SMS_CIRCUIT_THRESHOLD,
+        reset_seconds: float = settings.SMS_CIRCUIT_RESET_SECONDS,
+        error_rate: float = settings.SMS_FAILOVER_ERROR_RATE,
+        window: int = settings.SMS_FAILOVER_WINDOW,
+    ):
+        self.slots = [
+            ProviderSlot(p, CircuitBreaker(threshold, reset_seconds, error_rate, window), CallMetrics())
+            for p in providers
+        ]
+
+    def provider(self, name: str) -> SmsProvider:
+        return next(slot.provider for slot in self.slots if slot.provider.name == name)
+
+    def retry_after(self) -> float:
+        return min(slot.breaker.retry_after() for slot in self.slots)
+
+    async def send(self, phone: str, text: str) -> Delivery:
+        """Deliver via the first healthy provider; raises SmsError, or SmsUnavailable if none was tried."""
+        error: SmsError | None = None
+        for provider, breaker, metrics in self.slots:
+            if not breaker.allow():
+                continue
+            started = time.perf_counter()
+            try:
+                message_id = await provider.send(phone, text)
+            except SmsError as e:
+                metrics.observe((time.perf_counter() - started) * 1000, e.outcome)
+                if e.outcome == "rejected":
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                error = e
+                continue
+            metrics.observe((time.perf_counter() - started) * 1000, "ok")
+            breaker.record_success()
+            return Delivery(provider.name, message_id)
+        raise error or SmsUnavailable(self.retry_after())
+
+    def snapshot(self) -> dict:
+        return {slot.provider.name: {**slot.metrics.snapshot(), "circuit": slot.breaker.state} for slot in self.slots}
+
+
+providers = {"mobizon": MobizonProvider, "fake": FakeSmsProvider}
+_sender: FailoverSms | None = None
+
+
+def get_sms_sender() -> FailoverSms:
+    global _sender
+    if _sender is None:
+        names = [n.strip() for n in settings.SMS_PROVIDER.split(",") if n.strip()]
+        unknown = [n for n in names if n not in providers]
+        if unknown or not names:
+            raise ValueError(f"Unknown SMS provider(s) in SMS_PROVIDER: {settings.SMS_PROVIDER!r}")
+        _sender = FailoverSms([providers[n]() for n in names])
+    return _sender
+
+
+async def send_sms(phone: str, text: str) -> bool:
+    """Send an SMS right away. Requests should use `queue_sms` instead."""
+    try:
+        await get_sms_sender().send(phone, text)
+        return True
+    except SmsError as e:
+        print(f"[SMS] {e.outcome}: {e}")
         return False
 
 
-async def send_otp_sms(phone: str, code: str) -> bool:
-    """Send OTP code via SMS."""
-    text = f"AddSy: ваш код подтверждения {code}. Не сообщайте его никому."
-    return await send_sms(phone, text)
+def otp_sms_text(code: str) -> str:
+    return f"AddSy: ваш код подтверждения {code}. Не сообщайте его никому."
+
+
+def queue_sms(
+    db: AsyncSession,
+    phone: str,
+    text: str,
+    priority: int = PRIORITY_NORMAL,
+    expires_at: datetime | None = None,
+) -> SmsMessage:
+    """Queue an SMS for the worker; it is sent after the caller's transaction commits.
+
+    A message still undelivered at `expires_at` (e.g. an expired code) is dropped.
+    """
+    message = SmsMessage(id=uuid.uuid4(), phone=phone, text=text, expires_at=expires_at)
+    db.add(message)
+    enqueue(db, "sms.send", {"message_id": str(message.id)}, priority=priority, max_attempts=settings.SMS_MAX_ATTEMPTS)
+    return message
+
+
+async def queue_sms_batch(db: AsyncSession, messages: list[tuple[str, str]], priority: int = PRIORITY_NORMAL):
+    """Queue many (phone, text) messages with one INSERT per table; sent after the caller commits."""
+    rows = [{"id": uuid.uuid4(), "phone": phone, "text": text} for phone, text in messages]
+    if not rows:
+        return
+    await db.execute(insert(SmsMessage), rows)
+    await enqueue_many(
+        db, "sms.send", [{"message_id": str(r["id"])} for r in rows],
+        priority=priority, max_attempts=settings.SMS_MAX_ATTEMPTS,
+    )
+
+
+def _finish(message: SmsMessage, status: str):
+    """Final status; the codes in the text aren't needed any more, only its shape (for support)."""
+    message.status = status
+    message.text = re.sub(r"\d", "•", message.text)
+
+
+async def _record_sms_failure(db: AsyncSession, payload: dict, error: Exception, dead: bool):
+    message = await db.get(SmsMessage, uuid.UUID(payload["message_id"]))
+    if message is None or message.status in ("sent", "failed", "expired"):
+        return
+    message.attempts += 1
+    message.last_error = (f"{error.outcome}: {error}" if isinstance(error, SmsError) else str(error))[:2000]
+    if dead:
+        _finish(message, "failed")
+    else:
+        message.status = "retrying"
+
+
+@job_handler("sms.send", on_failure=_record_sms_failure)
+async def send_sms_job(db: AsyncSession, payload: dict):
+    message = await db.get(SmsMessage, uuid.UUID(payload["message_id"]))
+    if message is None or message.status in ("sent", "failed", "expired"):
+        return
+    now = datetime.now(timezone.utc)
+    if message.expires_at is not None and message.expires_at <= now:
+        _finish(message, "expired")
+        return
+    try:
+        delivery = await get_sms_sender().send(message.phone, message.text)
+    except SmsUnavailable as e:
+        # Nothing was attempted, so this doesn't count against the message
+        raise RetryLater(max(e.retry_after, 1.0), str(e))
+    except SmsError as e:
+        if e.outcome != "rejected":
+            raise  # timeout / error: re-queued with backoff; _record_sms_failure keeps the attempt
+        # The provider refused this message (bad number, no balance): sending it again won't help
+        message.attempts += 1
+        message.last_error = f"{e.outcome}: {e}"[:2000]
+        _finish(message, "failed")
+        return
+    message.attempts += 1
+    _finish(message, "sent")
+    message.provider = delivery.provider
+    message.provider_message_id = delivery.message_id
+    message.sent_at = now
+
+
+async def purge_old_messages(db: AsyncSession) -> int:
+    """Delete messages older than SMS_RETENTION_DAYS; returns how many went."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.SMS_RETENTION_DAYS)
+    result = await db.execute(delete(SmsMessage).where(SmsMessage.created_at < cutoff))
+    await db.commit()
+    return result.rowcount
+
+
+@leader_only("sms_purge")
+async def purge_sms_messages():
+    """Drop old outbox rows (daily, on the leader)."""
+    from app.core.database import async_session
+
+    while True:
+        try:
+            async with async_session() as db:
+                await purge_old_messages(db)
+        except Exception as e:
+            print(f"[SMS] Error: {e}")
+        await asyncio.sleep(24 * 3600)
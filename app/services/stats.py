@@ -0,0 +1,166 @@
+"""Daily earnings/spend rollups.
+
+`daily_deal_stats` and `daily_order_stats` are maintained incrementally in the
+same transaction as the write they summarise (deal completion, order creation),
+so `/v1/stats/me` never scans `deals`. `rebuild()` recomputes everything from
+the source tables for backfills:
+
+    python -m app.services.stats rebuild
+"""
+import asyncio
+import sys
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+from sqlalchemy import bindparam, delete, func, insert, literal, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.deal import Deal, DealEvent
+from app.models.order import Order
+from app.models.stats import DailyDealStat, DailyOrderStat
+from app.models.user import AdvertiserProfile
+
+DEAL_KEY = ("user_id", "day", "role", "currency", "status")
+DEAL_SUMS = ("deal_count", "amount", "platform_fee", "creator_payout")
+ORDER_KEY = ("user_id", "day", "currency")
+ORDER_SUMS = ("order_count", "budget")
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def _upsert_adding(model, keys: tuple, sums: tuple, rows: list[dict]):
+    stmt = pg_insert(model).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in sums},
+    )
+
+
+async def record_deals(db: AsyncSession, deals, status: str = "completed", day: date | None = None):
+    """Add deals that just reached `status` to both parties' rollups; does not commit.
+
+    `deals` are Deal objects or rows carrying creator_id, advertiser_id, budget,
+    currency, platform_fee and creator_payout.
+    """
+    day = day or _today()
+    totals = defaultdict(lambda: dict.fromkeys(DEAL_SUMS, 0))
+    spent = defaultdict(int)
+    for d in deals:
+        for user_id, role in ((d.creator_id, "creator"), (d.advertiser_id, "advertiser")):
+            t = totals[(user_id, day, role, d.currency, status)]
+            t["deal_count"] += 1
+            t["amount"] += d.budget
+            t["platform_fee"] += d.platform_fee
+            t["creator_payout"] += d.creator_payout
+        if status == "completed":
+            spent[d.advertiser_id] += d.budget
+    if not totals:
+        return
+
+    # One row per key (ON CONFLICT can't touch a row twice per statement), in key
+    # order so concurrent completions lock rollup rows in the same order
+    rows = [dict(zip(DEAL_KEY, key), **sums) for key, sums in sorted(totals.items(), key=lambda kv: str(kv[0]))]
+    await db.execute(_upsert_adding(DailyDealStat, DEAL_KEY, DEAL_SUMS, rows))
+
+    if spent:
+        profiles = AdvertiserProfile.__table__
+        await db.execute(
+            update(profiles)
+            .where(profiles.c.user_id == bindparam("advertiser_id"))
+            .values(total_spent=profiles.c.total_spent + bindparam("amount")),
+            [{"advertiser_id": k, "amount": v} for k, v in sorted(spent.items(), key=lambda kv: str(kv[0]))],
+        )
+
+
+async def record_order(db: AsyncSession, order: Order):
+    """Count a newly created order for its advertiser; does not commit."""
+    row = {"user_id": order.advertiser_id, "day": _today(), "currency": order.currency or "KZT",
+           "order_count": 1, "budget": order.budget}
+    await db.execute(_upsert_adding(DailyOrderStat, ORDER_KEY, ORDER_SUMS, [row]))
+    await db.execute(
+        update(AdvertiserProfile)
+        .where(AdvertiserProfile.user_id == order.advertiser_id)
+        .values(total_orders=AdvertiserProfile.total_orders + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _utc_day(column):
+    return func.date(func.timezone("UTC", column))
+
+
+async def rebuild(db: AsyncSession):
+    """Recompute all rollups and advertiser totals from deals and orders, in one transaction."""
+    # Incremental writers queue behind this lock and apply their deltas after the
+    # rebuild commits, so nothing is lost or double counted
+    await db.execute(text("LOCK TABLE daily_deal_stats, daily_order_stats IN EXCLUSIVE MODE"))
+    await db.execute(delete(DailyDealStat))
+    await db.execute(delete(DailyOrderStat))
+
+    # Completion day comes from the timeline; deals older than the timeline fall back to updated_at
+    completed_at = (
+        select(func.max(DealEvent.created_at))
+        .where(DealEvent.deal_id == Deal.id, DealEvent.to_status == "completed")
+        .scalar_subquery()
+    )
+    for role, user_col in (("creator", Deal.creator_id), ("advertiser", Deal.advertiser_id)):
+        done = (
+            select(
+                user_col.label("user_id"),
+                _utc_day(func.coalesce(completed_at, Deal.updated_at)).label("day"),
+                Deal.currency, Deal.budget, Deal.platform_fee, Deal.creator_payout,
+            )
+            .where(Deal.status == "completed")
+            .subquery()
+        )
+        await db.execute(
+            insert(DailyDealStat).from_select(
+                [*DEAL_KEY, *DEAL_SUMS],
+                select(
+                    done.c.user_id, done.c.day, literal(role), done.c.currency, literal("completed"),
+                    func.count(), func.sum(done.c.budget), func.sum(done.c.platform_fee), func.sum(done.c.creator_payout),
+                ).group_by(done.c.user_id, done.c.day, done.c.currency),
+            )
+        )
+
+    created = select(
+        Order.advertiser_id.label("user_id"), _utc_day(Order.created_at).label("day"), Order.currency, Order.budget
+    ).subquery()
+    await db.execute(
+        insert(DailyOrderStat).from_select(
+            [*ORDER_KEY, *ORDER_SUMS],
+            select(created.c.user_id, created.c.day, created.c.currency, func.count(), func.sum(created.c.budget))
+            .group_by(created.c.user_id, created.c.day, created.c.currency),
+        )
+    )
+
+    await db.execute(
+        update(AdvertiserProfile)
+        .values(
+            total_orders=select(func.count())
+            .where(Order.advertiser_id == AdvertiserProfile.user_id)
+            .scalar_subquery(),
+            total_spent=select(func.coalesce(func.sum(Deal.budget), 0))
+            .where(Deal.advertiser_id == AdvertiserProfile.user_id, Deal.status == "completed")
+            .scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def _main():
+    from app.core.database import async_session
+
+    async with async_session() as db:
+        await rebuild(db)
+    print("[Stats] Rollups rebuilt")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m app.services.stats rebuild")
+    asyncio.run(_main())
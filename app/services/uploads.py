@@ -0,0 +1,355 @@
+"""Streaming multipart uploads.
+
+`receive_upload` parses the request body as it arrives instead of letting
+Starlette spool it into an `UploadFile` first. File bytes are written to a
+private temp file in UPLOAD_WRITE_CHUNK pieces, counted and hashed on the way,
+so an upload holds a few hundred KB of memory whatever its size. Going over
+MAX_UPLOAD_SIZE stops reading the body at once, without waiting for the rest.
+`store_upload` then moves the file into place with an atomic rename; readers
+never see a partial file.
+
+Large files can also be sent resumably (`upload_sessions`): the client
+declares the size, PATCHes chunks at the offset the server reports, and
+finalizes. Each PATCH streams into its own segment file (`receive_chunk`),
+which is appended to `UPLOAD_TMP_DIR/<session id>.part` only once the request
+has won the offset update (`append_segment`), so two requests racing at the
+same offset never interleave bytes. A dropped connection keeps what arrived,
+so the client resumes from there instead of starting over. The offset lives in the database, so any
+API process can take the next chunk as long as they share the upload volume.
+`purge_upload_sessions` deletes uploads abandoned for UPLOAD_SESSION_TTL_HOURS.
+"""
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+import aiofiles
+import aiofiles.os
+from fastapi import Request
+from sqlalchemy import delete
+from starlette.requests import ClientDisconnect
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+from app.core.leader import leader_only
+from app.models.upload import UploadSession
+
+UPLOAD_WRITE_CHUNK = 256 * 1024
+MAX_FIELD_SIZE = 1024  # plain form fields are short (e.g. `type`)
+MULTIPART_OVERHEAD = 16 * 1024  # boundaries, part headers and fields on top of the file itself
+
+
+class UploadError(Exception):
+    """Malformed upload request."""
+
+
+class UploadTooLarge(UploadError):
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds {limit} bytes")
+        self.limit = limit
+
+
+class UploadGone(UploadError):
+    """The partial file of a resumable upload is missing (collected, or on another volume)."""
+
+
+@dataclass
+class ReceivedUpload:
+    path: str  # temp file; moved by `store_upload` or removed by `discard`
+    filename: str
+    content_type: str
+    size: int = 0
+    sha256: str = ""
+    fields: dict[str, str] = field(default_factory=dict)
+
+    async def discard(self):
+        await remove_file(self.path)
+
+
+async def remove_file(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def temp_path() -> str:
+    os.makedirs(settings.UPLOAD_TMP_DIR, exist_ok=True)
+    return os.path.join(settings.UPLOAD_TMP_DIR, f"{uuid.uuid4()}.part")
+
+
+class _Parts:
+    """Parser callbacks. They only record events; file writes are awaited by the caller."""
+
+    def __init__(self):
+        self.header_name = b""
+        self.header_value = b""
+        self.disposition = b""
+        self.content_type = b""
+        self.name = ""
+        self.in_file = False
+        self.filename: str | None = None
+        self.file_content_type = "application/octet-stream"
+        self.data = bytearray()
+        self.fields: dict[str, str] = {}
+        self.file_data = bytearray()  # file bytes not yet written
+        self.file_parts = 0
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self.disposition = self.content_type = b""
+        self.data = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        name = self.header_name.lower()
+        if name == b"content-disposition":
+            self.disposition = self.header_value
+        elif name == b"content-type":
+            self.content_type = self.header_value
+        self.header_name = self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.disposition)
+        if b"name" not in options:
+            raise UploadError("Multipart part without a name")
+        self.name = options[b"name"].decode("utf-8", "replace")
+        if b"filename" in options:
+            self.file_parts += 1
+            if self.file_parts > 1:
+                raise UploadError("Only one file per upload")
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.file_content_type = self.content_type.decode("latin-1") or "application/octet-stream"
+            self.in_file = True
+        else:
+            self.in_file = False
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.in_file:
+            self.file_data += data[start:end]
+        else:
+            if len(self.data) + end - start > MAX_FIELD_SIZE:
+                raise UploadError("Form field too large")
+            self.data += data[start:end]
+
+    def on_part_end(self):
+        if not self.in_file:
+            self.fields[self.name] = self.data.decode("utf-8", "replace")
+        self.in_file = False
+
+
+async def receive_upload(request: Request, max_size: int | None = None) -> ReceivedUpload:
+    """Stream the one file in a multipart/form-data body to a temp file.
+
+    Raises UploadTooLarge past `max_size` bytes of file data (default
+    MAX_UPLOAD_SIZE) and UploadError for anything that isn't a single-file
+    multipart form. Nothing is left on disk when it raises.
+    """
+    max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("Expected multipart/form-data")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_size + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(max_size)  # refuse before reading a byte
+
+    parts = _Parts()
+    parser = MultipartParser(params[b"boundary"], parts.callbacks())
+    upload = ReceivedUpload(path=temp_path(), filename="", content_type="")
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(upload.path, "wb") as f:
+
+            async def flush():
+                digest.update(parts.file_data)
+                await f.write(parts.file_data)
+                upload.size += len(parts.file_data)
+                parts.file_data.clear()
+
+            async for chunk in request.stream():
+                try:
+                    parser.write(chunk)
+                except MultipartParseError as e:
+                    raise UploadError(str(e)) from e
+                if upload.size + len(parts.file_data) > max_size:
+                    raise UploadTooLarge(max_size)
+                # Network chunks are small; batch them into fewer, larger writes
+                if len(parts.file_data) >= UPLOAD_WRITE_CHUNK:
+                    await flush()
+            parser.finalize()
+            await flush()
+        if parts.filename is None:
+            raise UploadError("No file in the form")
+    except BaseException:
+        await upload.discard()
+        raise
+
+    upload.filename = parts.filename
+    upload.content_type = parts.file_content_type
+    upload.sha256 = digest.hexdigest()
+    upload.fields = parts.fields
+    return upload
+
+
+async def store_upload(upload: ReceivedUpload, directory: str, filename: str) -> str:
+    """Move a received file to `directory/filename` atomically; returns the final path.
+
+    UPLOAD_TMP_DIR must be on the same mount as `directory` (a rename across mounts fails with EXDEV).
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, filename)
+    await aiofiles.os.replace(upload.path, path)
+    return path
+
+
+def check_upload_dirs():
+    """Fail at startup unless received files can be renamed from UPLOAD_TMP_DIR into UPLOAD_DIR.
+
+    Otherwise every upload would fail with EXDEV, and a worker that sees a
+    different temp dir than the API would never clean it up.
+    """
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    os.makedirs(settings.UPLOAD_TMP_DIR, exist_ok=True)
+    if os.stat(settings.UPLOAD_DIR).st_dev != os.stat(settings.UPLOAD_TMP_DIR).st_dev:
+        raise RuntimeError(
+            f"UPLOAD_TMP_DIR ({settings.UPLOAD_TMP_DIR}) and UPLOAD_DIR ({settings.UPLOAD_DIR}) "
+            "must be on the same filesystem"
+        )
+
+
+def partial_path(session_id: uuid.UUID) -> str:
+    return os.path.join(settings.UPLOAD_TMP_DIR, f"{session_id}.part")
+
+
+def session_expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+
+
+async def receive_chunk(request: Request, limit: int) -> tuple[str, int]:
+    """Write the request body to a new segment file; returns (its path, the bytes stored).
+
+    If the client disconnects midway, what arrived is kept and counted. Raises
+    UploadTooLarge past `limit` bytes, leaving nothing behind.
+    """
+    os.makedirs(settings.UPLOAD_TMP_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_TMP_DIR, f"{uuid.uuid4()}.seg")
+    written = 0
+    pending = bytearray()
+    try:
+        async with aiofiles.open(path, "wb") as f:
+            try:
+                async for chunk in request.stream():
+                    if written + len(pending) + len(chunk) > limit:
+                        raise UploadTooLarge(limit)
+                    pending += chunk
+                    if len(pending) >= UPLOAD_WRITE_CHUNK:
+                        await f.write(pending)
+                        written += len(pending)
+                        pending.clear()
+            except ClientDisconnect:
+                pass
+            await f.write(pending)
+            written += len(pending)
+    except BaseException:
+        await remove_file(path)
+        raise
+    return path, written
+
+
+async def append_segment(segment: str, path: str, offset: int):
+    """Move a received segment onto the end of the partial file at `path`, which must be `offset` bytes long.
+
+    Anything past `offset` (the tail of a chunk whose offset update never
+    committed) is cut off first. Call it while holding the session row, so
+    appends are serialized. The segment is gone afterwards either way. Raises
+    UploadGone if an upload with data has lost its file.
+    """
+    try:
+        if not offset:
+            await aiofiles.os.replace(segment, path)
+            return
+        if not os.path.exists(path):
+            raise UploadGone(path)
+        async with aiofiles.open(path, "r+b") as out, aiofiles.open(segment, "rb") as src:
+            await out.seek(offset)
+            await out.truncate()
+            while chunk := await src.read(UPLOAD_WRITE_CHUNK):
+                await out.write(chunk)
+    finally:
+        await remove_file(segment)
+
+
+async def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    async with aiofiles.open(path, "rb") as f:
+        while chunk := await f.read(UPLOAD_WRITE_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sweep_temp_files(older_than: float) -> list[str]:
+    """Remove temp files not written to for `older_than` seconds; returns their names."""
+    removed = []
+    cutoff = time.time() - older_than
+    try:
+        entries = list(os.scandir(settings.UPLOAD_TMP_DIR))
+    except FileNotFoundError:
+        return removed
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed.append(entry.name)
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+async def purge_expired_uploads(db) -> int:
+    """Delete expired upload sessions and their partial files; returns how many sessions went."""
+    result = await db.execute(
+        delete(UploadSession)
+        .where(UploadSession.expires_at < datetime.now(timezone.utc))
+        .returning(UploadSession.id, UploadSession.status)
+    )
+    rows = result.all()
+    await db.commit()
+    for row in rows:
+        if row.status == "uploading":
+            await remove_file(partial_path(row.id))
+    # Leftovers of one-shot uploads from a process that died mid-request
+    sweep_temp_files(settings.UPLOAD_SESSION_TTL_HOURS * 3600)
+    return len(rows)
+
+
+@leader_only("uploads")
+async def purge_upload_sessions():
+    """Garbage-collect abandoned resumable uploads (hourly, on the leader)."""
+    from app.core.database import async_session
+
+    while True:
+        try:
+            async with async_session() as db:
+                await purge_expired_uploads(db)
+        except Exception as e:
+            print(f"[Uploads] Error: {e}")
+        await asyncio.sleep(3600)
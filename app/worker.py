@@ -0,0 +1,67 @@
+"""Background worker, run separately from the API processes:
+
+    python -m app.worker
+
+Consumes the `jobs` queue and runs the leader-elected background loops, so slow
+jobs never add to request latency and workers scale independently of the API.
+"""
+import asyncio
+import signal
+
+from app.core.config import settings
+from app.core.rate_limit import purge_rate_limits
+from app.services.blobs import blob_gc
+from app.services.deadlines import deadline_reminders
+from app.services.jobs import handlers, run_worker
+from app.services.partitions import maintain_partitions
+from app.services.payouts import payout_batches
+import app.services.auto_complete  # noqa: F401 — registers job handlers
+import app.services.payments  # noqa: F401 — registers job handlers
+from app.services.sms import close_sms_client, get_sms_sender, purge_sms_messages, start_sms_client
+from app.services.uploads import check_upload_dirs, purge_upload_sessions
+
+
+def start_background_tasks() -> list[asyncio.Task]:
+    """The job queue consumer and every leader-elected loop; cancel the tasks to stop.
+
+    Run by this worker and, with RUN_BACKGROUND_JOBS, by API processes too (a
+    single-process deployment needs nothing else). Leader election keeps each
+    loop to one process however many run this.
+    """
+    tasks = [
+        asyncio.create_task(run_worker(concurrency=settings.WORKER_CONCURRENCY)),
+        asyncio.create_task(maintain_partitions()),
+        asyncio.create_task(payout_batches()),
+        asyncio.create_task(deadline_reminders()),
+        asyncio.create_task(purge_upload_sessions()),
+        asyncio.create_task(blob_gc()),
+        asyncio.create_task(purge_sms_messages()),
+    ]
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        tasks.append(asyncio.create_task(purge_rate_limits()))
+    return tasks
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    check_upload_dirs()  # the worker purges the API's temp files, so it must see the same volume
+    start_sms_client()
+    get_sms_sender()  # fail fast on a bad SMS_PROVIDER
+    print(f"[Worker] Started: concurrency={settings.WORKER_CONCURRENCY}, handlers={sorted(handlers)}")
+    tasks = start_background_tasks()
+    await stop.wait()
+
+    print("[Worker] Shutting down")
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await close_sms_client()
+    print(f"[Worker] SMS calls: {get_sms_sender().snapshot()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+"""OTP login load generator.
+
+Drives the full login flow for N distinct phone numbers at a fixed rate:
+`POST /auth/send-otp`, wait for the worker to deliver the SMS, read the code
+from the outbox (`sms_messages`), `POST /auth/verify-otp`. Reports request
+latency percentiles for both calls, SMS delivery latency and logins per minute.
+
+Run the API and the worker with the in-memory SMS provider so nothing is sent
+(same DATABASE_URL / SECRET_KEY):
+
+    SMS_PROVIDER=fake uvicorn app.main:app --port 8000 &
+    SMS_PROVIDER=fake python -m app.worker &
+    python -m bench.otp_load --logins 3000 --rate 50
+"""
+import argparse
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+
+import httpx
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.models.otp import OTPCode
+from app.models.sms import SmsMessage
+from app.models.user import User
+
+PHONE_PREFIX = "+7998"
+CODE_RE = re.compile(r"\b(\d{4,8})\b")
+
+
+@dataclass
+class Stats:
+    send_ms: list[float] = field(default_factory=list)
+    delivery_ms: list[float] = field(default_factory=list)
+    verify_ms: list[float] = field(default_factory=list)
+    errors: dict[str, int] = field(default_factory=dict)
+    logins: int = 0
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+def _phone(i: int) -> str:
+    return f"{PHONE_PREFIX}{i:07d}"
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def cleanup(session_factory):
+    async with session_factory() as db:
+        await db.execute(delete(SmsMessage).where(SmsMessage.phone.like(f"{PHONE_PREFIX}%")))
+        await db.execute(delete(OTPCode).where(OTPCode.phone.like(f"{PHONE_PREFIX}%")))
+        result = await db.execute(delete(User).where(User.phone.like(f"{PHONE_PREFIX}%")))
+        await db.commit()
+    print(f"Removed {result.rowcount} bench users")
+
+
+async def _delivered_code(session_factory, phone: str, timeout: float) -> str | None:
+    """Poll the outbox until the worker has sent this phone's message."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        async with session_factory() as db:
+            row = (
+                await db.execute(
+                    select(SmsMessage.status, SmsMessage.text)
+                    .where(SmsMessage.phone == phone)
+                    .order_by(SmsMessage.created_at.desc())
+                    .limit(1)
+                )
+            ).first()
+        if row is not None and row.status == "sent":
+            match = CODE_RE.search(row.text)
+            return match.group(1) if match else None
+        if row is not None and row.status in ("failed", "expired"):
+            return None
+        await asyncio.sleep(0.1)
+    return None
+
+
+async def login(http: httpx.AsyncClient, session_factory, phone: str, args, stats: Stats):
+    started = time.perf_counter()
+    resp = await http.post("/auth/send-otp", json={"phone": phone})
+    stats.send_ms.append((time.perf_counter() - started) * 1000)
+    if resp.status_code != 200:
+        stats.error(f"send-otp {resp.status_code}")
+        return
+
+    sent = time.perf_counter()
+    code = await _delivered_code(session_factory, phone, args.delivery_timeout)
+    if code is None:
+        stats.error("not delivered")
+        return
+    stats.delivery_ms.append((time.perf_counter() - sent) * 1000)
+
+    started = time.perf_counter()
+    resp = await http.post("/auth/verify-otp", json={"phone": phone, "code": code})
+    stats.verify_ms.append((time.perf_counter() - started) * 1000)
+    if resp.status_code != 200:
+        stats.error(f"verify-otp {resp.status_code}")
+        return
+    stats.logins += 1
+
+
+def report(stats: Stats, elapsed: float):
+    print()
+    print(f"logins        {stats.logins} ok in {elapsed:.1f}s = {stats.logins / elapsed * 60:.0f}/min")
+    print(f"errors        {stats.errors or 'none'}")
+    for name, values in (("send-otp", stats.send_ms), ("delivery", stats.delivery_ms), ("verify-otp", stats.verify_ms)):
+        lat = sorted(values)
+        print(
+            f"{name:<13} p50={_percentile(lat, 50):.1f} p95={_percentile(lat, 95):.1f} "
+            f"p99={_percentile(lat, 99):.1f} max={lat[-1] if lat else 0:.1f} ms"
+        )
+
+
+async def main(args):
+    engine = create_async_engine(args.database_url, pool_size=10)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    if args.cleanup:
+        await cleanup(session_factory)
+        await engine.dispose()
+        return
+
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as http:
+        print(f"Logging in {args.logins} phones at {args.rate}/s...")
+        started = time.perf_counter()
+        tasks = []
+        for i in range(args.logins):
+            tasks.append(asyncio.create_task(login(http, session_factory, _phone(args.offset + i), args, stats)))
+            await asyncio.sleep(1 / args.rate)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+
+    await engine.dispose()
+    report(stats, elapsed)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AddSy OTP login load test")
+    parser.add_argument("--url", default="http://localhost:8000/v1")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--logins", type=int, default=1000, help="distinct phone numbers to log in")
+    parser.add_argument("--rate", type=float, default=20, help="new logins per second")
+    parser.add_argument("--offset", type=int, default=0, help="first phone index; change it to rerun within the OTP rate limit")
+    parser.add_argument("--connections", type=int, default=100, help="HTTP connection pool size")
+    parser.add_argument("--delivery-timeout", type=float, default=30, help="seconds to wait for the worker to send a code")
+    parser.add_argument("--cleanup", action="store_true", help="delete bench users, codes and messages and exit")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,256 @@
+"""WebSocket chat load generator.
+
+Seeds N users paired into N/2 chats, opens one `/v1/ws` connection per user with a
+JWT from `create_access_token` and drives a send/typing/read mix. Reports delivery
+latency percentiles, delivered messages per second and server RSS.
+
+Run against a local Postgres and a local uvicorn (same DATABASE_URL / SECRET_KEY):
+
+    uvicorn app.main:app --port 8000 &
+    python -m bench.ws_load --users 2000 --duration 60 --rate 0.5 --server-pid $!
+
+Raise `ulimit -n` for both processes before going past ~1000 connections.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import websockets
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.chat import Chat, Message
+from app.models.user import User
+
+PHONE_PREFIX = "+7999"
+CONTENT_PREFIX = "bench:"
+
+
+@dataclass
+class Stats:
+    latencies_ms: list[float] = field(default_factory=list)
+    sent: dict[str, int] = field(default_factory=lambda: {"send_message": 0, "typing": 0, "read": 0})
+    received: dict[str, int] = field(default_factory=dict)
+    connected: int = 0
+    connect_errors: int = 0
+    disconnects: int = 0
+    rss_kb: list[int] = field(default_factory=list)
+
+
+def _phone(i: int) -> str:
+    return f"{PHONE_PREFIX}{i:07d}"
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def _parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        mix[{"send": "send_message"}.get(name.strip(), name.strip())] = float(weight)
+    return mix
+
+
+def _rss_kb(pids: list[int]) -> int:
+    """Resident set size of the server processes (Linux /proc)."""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except FileNotFoundError:
+            pass
+    return total
+
+
+# ──────────────────────────────────────────────
+# SEEDING
+# ──────────────────────────────────────────────
+
+async def seed(session_factory, n_users: int) -> list[tuple[str, str]]:
+    """Create (or reuse) bench users and one chat per pair. Returns [(user_id, chat_id)]."""
+    phones = [_phone(i) for i in range(n_users)]
+    async with session_factory() as db:
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "phone": phone,
+                "role": "advertiser" if i % 2 == 0 else "creator",
+                "name": f"Bench {i}",
+                "is_profile_complete": True,
+            }
+            for i, phone in enumerate(phones)
+        ]
+        for start in range(0, len(rows), 1000):
+            await db.execute(insert(User).values(rows[start:start + 1000]).on_conflict_do_nothing(index_elements=["phone"]))
+        await db.commit()
+
+        result = await db.execute(select(User.phone, User.id).where(User.phone.in_(phones)))
+        ids = {phone: user_id for phone, user_id in result.all()}
+        user_ids = [ids[p] for p in phones]
+
+        pairs = []
+        for i in range(0, n_users - 1, 2):
+            a, b = user_ids[i], user_ids[i + 1]
+            existing = await db.execute(select(Chat.id).where(Chat.participant_1 == a, Chat.participant_2 == b))
+            chat_id = existing.scalars().first()
+            if chat_id is None:
+                chat = Chat(participant_1=a, participant_2=b)
+                db.add(chat)
+                await db.flush()
+                chat_id = chat.id
+            pairs.append((str(a), str(chat_id)))
+            pairs.append((str(b), str(chat_id)))
+        await db.commit()
+    return pairs
+
+
+async def cleanup(session_factory):
+    bench_users = select(User.id).where(User.phone.like(f"{PHONE_PREFIX}%"))
+    bench_chats = select(Chat.id).where(or_(Chat.participant_1.in_(bench_users), Chat.participant_2.in_(bench_users)))
+    async with session_factory() as db:
+        await db.execute(delete(Message).where(Message.chat_id.in_(bench_chats)))
+        await db.execute(delete(Chat).where(Chat.id.in_(bench_chats)))
+        result = await db.execute(delete(User).where(User.id.in_(bench_users)))
+        await db.commit()
+    print(f"Removed {result.rowcount} bench users")
+
+
+# ──────────────────────────────────────────────
+# CLIENTS
+# ──────────────────────────────────────────────
+
+async def _reader(ws, user_id: str, stats: Stats):
+    async for raw in ws:
+        msg = json.loads(raw)
+        event = msg.get("event")
+        stats.received[event] = stats.received.get(event, 0) + 1
+        if event != "new_message":
+            continue
+        data = msg["data"]
+        content = data.get("content", "")
+        # Only the recipient side counts as a delivery; the sender gets an echo
+        if data.get("sender_id") != user_id and content.startswith(CONTENT_PREFIX):
+            sent_ns = int(content[len(CONTENT_PREFIX):])
+            stats.latencies_ms.append((time.perf_counter_ns() - sent_ns) / 1e6)
+
+
+async def client(url: str, user_id: str, chat_id: str, args, mix: dict[str, float], stats: Stats, stop: asyncio.Event):
+    token = create_access_token(user_id, str(uuid.uuid4()))
+    try:
+        ws = await websockets.connect(f"{url}?token={token}", open_timeout=30, max_queue=None)
+    except Exception:
+        stats.connect_errors += 1
+        return
+
+    stats.connected += 1
+    reader = asyncio.create_task(_reader(ws, user_id, stats))
+    actions, weights = list(mix), list(mix.values())
+    try:
+        # Desynchronise clients so the load is smooth rather than bursty
+        await asyncio.sleep(random.random() / args.rate)
+        while not stop.is_set():
+            action = random.choices(actions, weights)[0]
+            payload = {"action": action, "chat_id": chat_id}
+            if action == "send_message":
+                payload["content"] = f"{CONTENT_PREFIX}{time.perf_counter_ns()}"
+            await ws.send(json.dumps(payload))
+            stats.sent[action] += 1
+            await asyncio.sleep(random.expovariate(args.rate))
+    except websockets.ConnectionClosed:
+        stats.disconnects += 1
+    finally:
+        reader.cancel()
+        await ws.close()
+
+
+async def sample_rss(pids: list[int], stats: Stats, stop: asyncio.Event):
+    while not stop.is_set():
+        stats.rss_kb.append(_rss_kb(pids))
+        await asyncio.sleep(1)
+
+
+def report(stats: Stats, elapsed: float):
+    lat = sorted(stats.latencies_ms)
+    print()
+    print(f"connections   {stats.connected} ok, {stats.connect_errors} failed, {stats.disconnects} dropped")
+    print(f"sent          {stats.sent}")
+    print(f"received      {stats.received}")
+    print(f"delivered     {len(lat)} messages, {len(lat) / elapsed:.1f} msg/s over {elapsed:.1f}s")
+    print(
+        f"latency ms    p50={_percentile(lat, 50):.1f} p95={_percentile(lat, 95):.1f} "
+        f"p99={_percentile(lat, 99):.1f} max={lat[-1] if lat else 0:.1f}"
+    )
+    if stats.rss_kb:
+        print(f"server RSS    start={stats.rss_kb[0] / 1024:.1f}MB peak={max(stats.rss_kb) / 1024:.1f}MB end={stats.rss_kb[-1] / 1024:.1f}MB")
+
+
+async def main(args):
+    engine = create_async_engine(args.database_url, pool_size=5)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    if args.cleanup:
+        await cleanup(session_factory)
+        await engine.dispose()
+        return
+
+    print(f"Seeding {args.users} users...")
+    pairs = await seed(session_factory, args.users)
+    await engine.dispose()
+
+    stats = Stats()
+    stop = asyncio.Event()
+    mix = _parse_mix(args.mix)
+    rss_task = asyncio.create_task(sample_rss(args.server_pid, stats, stop)) if args.server_pid else None
+
+    print(f"Opening {len(pairs)} connections at {args.ramp}/s...")
+    tasks = []
+    for user_id, chat_id in pairs:
+        tasks.append(asyncio.create_task(client(args.url, user_id, chat_id, args, mix, stats, stop)))
+        await asyncio.sleep(1 / args.ramp)
+
+    print(f"Connected {stats.connected}, running for {args.duration}s...")
+    # Measure the steady state only, not the ramp-up
+    stats.latencies_ms.clear()
+    started = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if rss_task:
+        await rss_task
+
+    report(stats, elapsed)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AddSy WebSocket chat load test")
+    parser.add_argument("--url", default="ws://localhost:8000/v1/ws")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--users", type=int, default=1000, help="users = connections, paired into chats")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of steady load after ramp-up")
+    parser.add_argument("--rate", type=float, default=1.0, help="actions per second per connection")
+    parser.add_argument("--ramp", type=float, default=200, help="new connections per second")
+    parser.add_argument("--mix", default="send=0.6,typing=0.3,read=0.1", help="action weights")
+    parser.add_argument("--server-pid", type=int, nargs="*", default=[], help="uvicorn pid(s) to sample RSS from")
+    parser.add_argument("--cleanup", action="store_true", help="delete seeded bench users/chats/messages and exit")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -25,4 +25,7 @@ echo "Running Alembic migrations..."
 alembic upgrade head
 
 echo "Starting uvicorn..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000 ${UVICORN_EXTRA_ARGS:-}
+# Take the client IP from X-Forwarded-For, but only when the request comes from the proxy
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 \
+    --proxy-headers --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-127.0.0.1}" \
+    ${UVICORN_EXTRA_ARGS:-}
@@ -1,4 +1,5 @@
 import os
+import re
 import uuid
 from datetime import date
 
@@ -8,15 +9,26 @@ from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.database import Base, get_db
+from app.core.rate_limit import get_rate_limiter
 from app.core.security import create_access_token
 from app.main import app
+from app.models.blob import Blob  # noqa: F401
 from app.models.chat import Chat, Message, Offer  # noqa: F401
-from app.models.deal import Deal, DealSignature, SubmittedWork, WorkRequirement  # noqa: F401
+from app.models.deal import Deal, DealEvent, DealReminder, DealSignature, SubmittedWork, WorkRequirement  # noqa: F401
+from app.models.job import Job  # noqa: F401
+from app.models.ledger import LedgerAccount, LedgerEntry, Payout  # noqa: F401
 from app.models.notification import Notification  # noqa: F401
 from app.models.order import Order
 from app.models.otp import OTPCode  # noqa: F401
+from app.models.payment import Payment, PaymentEvent  # noqa: F401
+from app.models.rate_limit import RateLimitBucket  # noqa: F401
 from app.models.response import Response  # noqa: F401
 from app.models.review import Review  # noqa: F401
+from app.models.session import UserSession  # noqa: F401
+from app.models.sms import SmsMessage
+from app.services import sms
+from app.models.stats import DailyDealStat, DailyOrderStat  # noqa: F401
+from app.models.upload import UploadSession  # noqa: F401
 from app.models.user import AdvertiserProfile, CreatorProfile, User
 
 TEST_DB_URL = os.getenv(
@@ -25,6 +37,20 @@ TEST_DB_URL = os.getenv(
 )
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Every test starts with full buckets; all requests share the test client's IP."""
+    get_rate_limiter().reset()
+
+
+@pytest.fixture(autouse=True)
+def fake_sms(monkeypatch):
+    """SMS go to an in-memory provider; tests read codes from what it was sent."""
+    provider = sms.FakeSmsProvider()
+    monkeypatch.setattr(sms, "_sender", sms.FailoverSms([provider]))
+    return provider
+
+
 @pytest_asyncio.fixture
 async def db():
     eng = create_async_engine(TEST_DB_URL, echo=False)
@@ -54,10 +80,30 @@ async def client(db):
 
 
 def auth_headers(user: User) -> dict:
-    token = create_access_token(str(user.id))
+    # Access tokens are never looked up in `sessions`, only checked against the denylist
+    token = create_access_token(str(user.id), str(uuid.uuid4()))
     return {"Authorization": f"Bearer {token}"}
 
 
+async def sent_otp_code(db: AsyncSession, phone: str) -> str:
+    """Deliver queued SMS and return the code last sent to `phone`; the DB keeps only a hash of it."""
+    await run_jobs(db)
+    text = next(m["text"] for m in reversed(sms.get_sms_sender().provider("fake").sent) if m["phone"] == phone)
+    return re.search(r"\d+", text).group()
+
+
+async def run_jobs(db: AsyncSession) -> int:
+    """Run queued jobs inline, as the worker would, then expire `db`'s now stale objects."""
+    from app.services.jobs import run_batch
+
+    ran = await run_batch(async_sessionmaker(db.bind, class_=AsyncSession, expire_on_commit=False), limit=100)
+    # Only rows job handlers write; fixtures like users stay loaded
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, (Deal, Job, LedgerAccount, Payment, Payout, SmsMessage)):
+            db.expire(obj)
+    return ran
+
+
 @pytest_asyncio.fixture
 async def creator_user(db: AsyncSession):
     user = User(
@@ -0,0 +1,35 @@
+"""A local stand-in for the Mobizon HTTP API.
+
+Used in-process by tests via httpx.ASGITransport, or standalone for manual runs:
+
+    uvicorn tests.fake_mobizon:app --port 9100
+    MOBIZON_API_URL=http://localhost:9100/service python -m app.worker
+"""
+import asyncio
+import itertools
+
+from fastapi import FastAPI
+
+
+class FakeMobizon:
+    def __init__(self):
+        self.app = FastAPI()
+        self.sent: list[dict] = []
+        self.reject_next = 0  # answer this many requests with a non-zero code
+        self.delay = 0.0  # seconds before answering (for manual runs over a real socket)
+        self._ids = itertools.count(1)
+        self.app.get("/service/message/sendsmsmessage")(self.send)
+
+    async def send(self, recipient: str, text: str, apiKey: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.reject_next:
+            self.reject_next -= 1
+            return {"code": 1, "data": {}, "message": "Недостаточно средств на балансе"}
+        message_id = next(self._ids)
+        self.sent.append({"id": message_id, "recipient": recipient, "text": text})
+        return {"code": 0, "data": {"campaignId": message_id, "messageId": message_id, "status": 1}, "message": ""}
+
+
+fake = FakeMobizon()
+app = fake.app
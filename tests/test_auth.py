@@ -1,16 +1,12 @@
-"""Tests for auth endpoints: send-otp, verify-otp, refresh."""
+"""Tests for auth endpoints: send-otp, verify-otp, refresh, logout, sessions."""
 import pytest
-from unittest.mock import AsyncMock, patch
 
-from tests.conftest import auth_headers
-
-SMS_PATCH = "app.services.sms.send_otp_sms"
+from tests.conftest import auth_headers, sent_otp_code
 
 
 @pytest.mark.asyncio
 async def test_send_otp(client):
-    with patch(SMS_PATCH, new_callable=AsyncMock, return_value=True):
-        resp = await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
+    resp = await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
     assert resp.status_code == 200
     data = resp.json()
     assert data["message"] == "OTP sent"
@@ -18,32 +14,25 @@ async def test_send_otp(client):
 
 @pytest.mark.asyncio
 async def test_send_otp_rate_limit(client):
-    with patch(SMS_PATCH, new_callable=AsyncMock, return_value=True):
-        await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
-        resp = await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
+    await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
+    resp = await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
     assert resp.status_code == 429
 
 
 @pytest.mark.asyncio
 async def test_verify_otp_wrong_code(client):
-    with patch(SMS_PATCH, new_callable=AsyncMock, return_value=True):
-        await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
+    await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
     resp = await client.post("/v1/auth/verify-otp", json={"phone": "+77051234567", "code": "000000"})
     assert resp.status_code == 400
 
 
 @pytest.mark.asyncio
 async def test_verify_otp_success(client, db):
-    with patch(SMS_PATCH, new_callable=AsyncMock, return_value=True):
-        await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
+    await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
 
-    # Get the OTP code from db
-    from sqlalchemy import select
-    from app.models.otp import OTPCode
-    result = await db.execute(select(OTPCode).where(OTPCode.phone == "+77051234567"))
-    otp = result.scalar_one()
+    code = await sent_otp_code(db, "+77051234567")
 
-    resp = await client.post("/v1/auth/verify-otp", json={"phone": "+77051234567", "code": otp.code})
+    resp = await client.post("/v1/auth/verify-otp", json={"phone": "+77051234567", "code": code})
     assert resp.status_code == 200
     data = resp.json()
     assert "token" in data
@@ -53,18 +42,78 @@ async def test_verify_otp_success(client, db):
 
 @pytest.mark.asyncio
 async def test_refresh_token(client, db):
-    with patch(SMS_PATCH, new_callable=AsyncMock, return_value=True):
-        await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
+    await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
 
-    from sqlalchemy import select
-    from app.models.otp import OTPCode
-    result = await db.execute(select(OTPCode).where(OTPCode.phone == "+77051234567"))
-    otp = result.scalar_one()
+    code = await sent_otp_code(db, "+77051234567")
 
-    verify_resp = await client.post("/v1/auth/verify-otp", json={"phone": "+77051234567", "code": otp.code})
+    verify_resp = await client.post("/v1/auth/verify-otp", json={"phone": "+77051234567", "code": code})
     refresh_token = verify_resp.json()["refresh_token"]
 
     resp = await client.post("/v1/auth/refresh", json={"refresh_token": refresh_token})
     assert resp.status_code == 200
     assert "token" in resp.json()
     assert "refresh_token" in resp.json()
+
+
+@pytest.mark.asyncio
+async def test_send_otp_queues_sms(client, db):
+    resp = await client.post("/v1/auth/send-otp", json={"phone": "+77051234567"})
+    assert resp.status_code == 200
+
+    from sqlalchemy import select
+    from app.models.job import Job
+    from app.models.sms import SmsMessage
+    message = (await db.execute(select(SmsMessage))).scalar_one()
+    assert message.phone == "+77051234567"
+    assert message.status == "queued"
+    assert message.expires_at is not None
+    job = (await db.execute(select(Job).where(Job.kind == "sms.send"))).scalar_one()
+    assert job.payload == {"message_id": str(message.id)}
+    assert job.status == "queued"
+
+
+async def _sign_in(client, db, phone="+77051234567", device="AddSy/1.0 (iPhone)") -> dict:
+    await client.post("/v1/auth/send-otp", json={"phone": phone})
+    code = await sent_otp_code(db, phone)
+    resp = await client.post("/v1/auth/verify-otp", json={"phone": phone, "code": code}, headers={"User-Agent": device})
+    return resp.json()
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_and_reuse_ends_session(client, db):
+    tokens = await _sign_in(client, db)
+
+    resp = await client.post("/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert resp.status_code == 200
+    rotated = resp.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+
+    # The old refresh token is replayed: the session is ended for everyone holding it
+    resp = await client.post("/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert resp.status_code == 401
+    resp = await client.post("/v1/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert resp.status_code == 401
+    resp = await client.get("/v1/profile", headers={"Authorization": f"Bearer {rotated['token']}"})
+    assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_only_this_device(client, db):
+    phone = await _sign_in(client, db, device="phone")
+    # The first code was used, so the same phone can get another one right away
+    tablet = await _sign_in(client, db, device="tablet")
+    phone_headers = {"Authorization": f"Bearer {phone['token']}"}
+    tablet_headers = {"Authorization": f"Bearer {tablet['token']}"}
+
+    resp = await client.get("/v1/auth/sessions", headers=phone_headers)
+    assert [(s["device"], s["is_current"]) for s in resp.json()] == [("tablet", False), ("phone", True)]
+
+    resp = await client.post("/v1/auth/logout", headers=phone_headers)
+    assert resp.status_code == 200
+    assert (await client.get("/v1/profile", headers=phone_headers)).status_code == 401
+    assert (await client.post("/v1/auth/refresh", json={"refresh_token": phone["refresh_token"]})).status_code == 401
+    assert (await client.get("/v1/profile", headers=tablet_headers)).status_code == 200
+
+    tablet_id = (await client.get("/v1/auth/sessions", headers=tablet_headers)).json()[0]["id"]
+    assert (await client.delete(f"/v1/auth/sessions/{tablet_id}", headers=tablet_headers)).status_code == 200
+    assert (await client.get("/v1/profile", headers=tablet_headers)).status_code == 401
@@ -0,0 +1,107 @@
+"""Tests for deal auto-complete."""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.deal import Deal, DealEvent
+from app.models.job import Job
+from app.services.auto_complete import (
+    AUTO_COMPLETE_MAX_ATTEMPTS,
+    auto_complete_job,
+    complete_due_deals,
+    review_deadline,
+    schedule_auto_complete,
+)
+from app.services.jobs import RetryLater
+
+
+@pytest.mark.asyncio
+async def test_complete_due_deals(db, advertiser_user, creator_user, order):
+    submitted_at = datetime.now(timezone.utc) - timedelta(hours=settings.WORK_REVIEW_PERIOD_HOURS, minutes=1)
+    due = Deal(
+        order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+        budget=100000, deadline=order.deadline, status="work_submitted", work_submitted_at=submitted_at,
+    )
+    disputed = Deal(
+        order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+        budget=100000, deadline=order.deadline, status="disputed", work_submitted_at=submitted_at,
+    )
+    db.add_all([due, disputed])
+    await db.commit()
+
+    completed = await complete_due_deals(db)
+
+    assert completed == [due.id]
+    await db.refresh(due)
+    assert due.status == "completed"
+    assert due.platform_fee == 10000
+    assert due.creator_payout == 90000
+    events = (await db.execute(select(DealEvent.event, DealEvent.deal_id))).all()
+    assert events == [("auto_complete", due.id)]
+
+
+@pytest.mark.asyncio
+async def test_complete_due_deals_chunks_and_restricts_ids(db, advertiser_user, creator_user, order):
+    submitted_at = datetime.now(timezone.utc) - timedelta(hours=settings.WORK_REVIEW_PERIOD_HOURS, minutes=1)
+    deals = [
+        Deal(
+            order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+            budget=50000, deadline=order.deadline, status="work_submitted", work_submitted_at=submitted_at,
+        )
+        for _ in range(5)
+    ]
+    db.add_all(deals)
+    await db.commit()
+
+    picked = [d.id for d in deals[:3]]
+    completed = await complete_due_deals(db, picked, chunk_size=2)
+    assert sorted(completed) == sorted(picked)
+
+    assert len(await complete_due_deals(db, chunk_size=2)) == 2
+    assert await complete_due_deals(db) == []
+
+
+@pytest.mark.asyncio
+async def test_schedule_auto_complete_queues_a_job(db, advertiser_user, creator_user, order):
+    now = datetime.now(timezone.utc)
+    deal = Deal(
+        order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+        budget=100000, deadline=order.deadline, status="work_submitted", work_submitted_at=now,
+    )
+    db.add(deal)
+    await db.flush()
+
+    schedule_auto_complete(db, deal.id, now)
+    await db.commit()
+
+    job = (await db.execute(select(Job))).scalar_one()
+    assert job.kind == "deals.auto_complete"
+    assert job.payload == {"deal_id": str(deal.id)}
+    assert job.run_at == review_deadline(now)
+    assert job.max_attempts == AUTO_COMPLETE_MAX_ATTEMPTS
+
+
+@pytest.mark.asyncio
+async def test_auto_complete_job(db, advertiser_user, creator_user, order):
+    review = timedelta(hours=settings.WORK_REVIEW_PERIOD_HOURS)
+    now = datetime.now(timezone.utc)
+    due, early = (
+        Deal(
+            order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+            budget=100000, deadline=order.deadline, status="work_submitted", work_submitted_at=submitted_at,
+        )
+        for submitted_at in (now - review - timedelta(minutes=1), now - review + timedelta(minutes=1))
+    )
+    db.add_all([due, early])
+    await db.commit()
+
+    await auto_complete_job(db, {"deal_id": str(due.id)})
+    await db.commit()
+    await db.refresh(due)
+    assert due.status == "completed"
+
+    with pytest.raises(RetryLater):
+        await auto_complete_job(db, {"deal_id": str(early.id)})
@@ -0,0 +1,110 @@
+"""Tests for content-addressed upload storage and its garbage collection."""
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.models.blob import Blob
+from app.models.chat import Message
+from app.services import blobs
+from app.services.uploads import ReceivedUpload, temp_path
+
+
+@pytest.fixture(autouse=True)
+def upload_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "UPLOAD_TMP_DIR", str(tmp_path / "tmp"))
+    return tmp_path
+
+
+def _received(content: bytes, filename: str = "a.jpg") -> ReceivedUpload:
+    path = temp_path()
+    with open(path, "wb") as f:
+        f.write(content)
+    return ReceivedUpload(
+        path=path, filename=filename, content_type="image/jpeg", size=len(content), sha256=hashlib.sha256(content).hexdigest()
+    )
+
+
+@pytest.mark.asyncio
+async def test_same_content_is_stored_once(db):
+    first, deduplicated = await blobs.store_blob(db, _received(b"photo"), "avatar")
+    await db.commit()
+    assert not deduplicated
+    second_upload = _received(b"photo", "other.png")
+    second, deduplicated = await blobs.store_blob(db, second_upload, "avatar")
+    await db.commit()
+    assert deduplicated and second.url == first.url and first.url.endswith(".jpg")
+    assert not os.path.exists(second_upload.path)
+    assert len((await db.execute(select(Blob))).scalars().all()) == 1
+
+    # A row whose file went missing is written again rather than handed out
+    os.remove(os.path.join(settings.UPLOAD_DIR, first.path))
+    third, deduplicated = await blobs.store_blob(db, _received(b"photo"), "avatar")
+    await db.commit()
+    assert not deduplicated and os.path.exists(os.path.join(settings.UPLOAD_DIR, third.path))
+
+
+@pytest.mark.asyncio
+async def test_gc_counts_references_and_removes_unreferenced_blobs(db, creator_user, chat):
+    avatar, _ = await blobs.store_blob(db, _received(b"avatar"), "avatar")
+    attachment, _ = await blobs.store_blob(db, _received(b"attachment", "clip.mp4"), "avatar")
+    orphan, _ = await blobs.store_blob(db, _received(b"orphan"), "logo")
+    fresh, _ = await blobs.store_blob(db, _received(b"fresh"), "avatar")
+    # Nothing records where work and portfolio files are used, so they are kept unreferenced
+    work, _ = await blobs.store_blob(db, _received(b"work", "clip.mp4"), "work")
+    creator_user.avatar_url = avatar.url
+    db.add(Message(chat_id=chat.id, sender_id=creator_user.id, type="video", content=f"https://cdn.example{attachment.url}"))
+    old = datetime.now(timezone.utc) - timedelta(days=2)
+    await db.execute(update(Blob).where(Blob.sha256 != fresh.sha256).values(last_uploaded_at=old))
+    await db.commit()
+
+    assert await blobs.collect_garbage(db) == [orphan.sha256]
+    counts = dict((await db.execute(select(Blob.sha256, Blob.refcount))).all())
+    assert counts == {avatar.sha256: 1, attachment.sha256: 1, fresh.sha256: 0, work.sha256: 0}
+    assert not os.path.exists(os.path.join(settings.UPLOAD_DIR, orphan.path))
+    assert os.path.exists(os.path.join(settings.UPLOAD_DIR, avatar.path))
+
+    # Dropping the last reference makes it collectable
+    creator_user.avatar_url = None
+    await db.commit()
+    assert await blobs.collect_garbage(db) == [avatar.sha256]
+
+
+@pytest.mark.asyncio
+async def test_blob_uploaded_as_work_is_never_collected(db):
+    blob, _ = await blobs.store_blob(db, _received(b"clip"), "avatar")
+    await db.commit()
+    # The same bytes submitted as work: the blob now has a use the GC can't see
+    await blobs.store_blob(db, _received(b"clip"), "work")
+    await blobs.store_blob(db, _received(b"clip"), "avatar")
+    await db.execute(update(Blob).values(last_uploaded_at=datetime.now(timezone.utc) - timedelta(days=2)))
+    await db.commit()
+
+    assert await blobs.collect_garbage(db) == []
+    await db.refresh(blob)
+    assert blob.type == "work"
+
+
+@pytest.mark.asyncio
+async def test_client_content_type_is_normalized(db):
+    upload = _received(b"page", "a.bin")
+    upload.content_type = "text/html; charset=utf-8" + "x" * 200
+    blob, _ = await blobs.store_blob(db, upload, "work")
+    await db.commit()
+    assert blob.content_type == "application/octet-stream"
+
+
+def test_media_type_allow_list():
+    assert blobs.media_type("Image/JPEG; charset=binary") == "image/jpeg"
+    assert blobs.media_type("video/mp4") == "video/mp4"
+    assert blobs.media_type("text/html") == "application/octet-stream"
+    assert blobs.media_type("image/" + "x" * 200) == "application/octet-stream"
+
+def test_blob_path_is_sharded_by_hash():
+    sha = uuid.uuid4().hex * 2
+    assert blobs.blob_path(sha, ".JPG") == f"blobs/{sha[:2]}/{sha}.jpg"
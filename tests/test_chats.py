@@ -1,8 +1,17 @@
 """Tests for chats endpoints."""
 import pytest
+from unittest.mock import AsyncMock, patch
 
 from tests.conftest import auth_headers
 
+SEND_PATCH = "app.services.events.manager.send_to_user"
+ONLINE_PATCH = "app.services.events.manager.is_online"
+
+
+def _events(mock_send) -> list[tuple[str, str]]:
+    """(user_id, event) pairs pushed over WebSocket."""
+    return [(c.args[0], c.args[1]["event"]) for c in mock_send.call_args_list]
+
 
 @pytest.mark.asyncio
 async def test_create_chat(client, creator_user, advertiser_user):
@@ -138,3 +147,45 @@ async def test_respond_offer_decline(client, creator_user, advertiser_user, chat
     assert resp.status_code == 200
     assert resp.json()["status"] == "declined"
     assert resp.json()["deal_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_send_message_pushes_chat_updated(client, creator_user, advertiser_user, chat):
+    with patch(SEND_PATCH, new_callable=AsyncMock) as mock_send, patch(ONLINE_PATCH, return_value=True):
+        await client.post(
+            f"/v1/chats/{chat.id}/messages",
+            json={"content": "Привет!"},
+            headers=auth_headers(advertiser_user),
+        )
+
+    events = _events(mock_send)
+    assert (str(creator_user.id), "new_message") in events
+    assert (str(creator_user.id), "chat_updated") in events
+
+    updates = {c.args[0]: c.args[1]["data"] for c in mock_send.call_args_list if c.args[1]["event"] == "chat_updated"}
+    assert updates[str(creator_user.id)]["unread_count"] == 1
+    assert updates[str(creator_user.id)]["last_message"]["content"] == "Привет!"
+    assert updates[str(advertiser_user.id)]["unread_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_offer_accept_pushes_events(client, creator_user, advertiser_user, chat, order):
+    with patch(SEND_PATCH, new_callable=AsyncMock) as mock_send:
+        offer_resp = await client.post(
+            f"/v1/chats/{chat.id}/offer",
+            json={"order_id": str(order.id), "budget": 120000, "deadline": "2026-04-15T00:00:00Z"},
+            headers=auth_headers(advertiser_user),
+        )
+        assert (str(creator_user.id), "offer_created") in _events(mock_send)
+
+        mock_send.reset_mock()
+        offer_id = offer_resp.json()["offer"]["id"]
+        await client.post(
+            f"/v1/chats/{chat.id}/offer/{offer_id}/respond",
+            json={"action": "accept"},
+            headers=auth_headers(creator_user),
+        )
+
+    events = _events(mock_send)
+    assert (str(advertiser_user.id), "offer_status_changed") in events
+    assert (str(advertiser_user.id), "deal_created") in events
@@ -0,0 +1,42 @@
+"""Tests for contract PDF rendering and caching."""
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services import contracts
+from tests.conftest import auth_headers
+from tests.test_deal_flow import _create_deal, _sign_deal
+
+
+def test_digest_covers_fields_and_template_version(monkeypatch):
+    fields = {"deal_id": "1", "budget": 100000, "signatures": []}
+    digest = contracts.contract_digest(fields)
+
+    assert contracts.contract_digest(dict(fields)) == digest
+    assert contracts.contract_digest({**fields, "budget": 100001}) != digest
+    monkeypatch.setattr(contracts, "TEMPLATE_VERSION", contracts.TEMPLATE_VERSION + 1)
+    assert contracts.contract_digest(fields) != digest
+
+
+@pytest.mark.asyncio
+async def test_contract_pdf_cached_until_deal_changes(client, advertiser_user, creator_user, chat, order, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CONTRACT_CACHE_DIR", str(tmp_path))
+    deal_id = await _create_deal(client, advertiser_user, creator_user, chat, order)
+    url = f"/v1/deals/{deal_id}/contract.pdf"
+
+    resp = await client.get(url, headers=auth_headers(creator_user))
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/pdf"
+    assert resp.content.startswith(b"%PDF")
+    etag = resp.headers["etag"]
+
+    again = await client.get(url, headers={**auth_headers(advertiser_user), "If-None-Match": etag})
+    assert again.status_code == 304
+    assert len(os.listdir(tmp_path)) == 1
+
+    await _sign_deal(client, deal_id, advertiser_user, creator_user, db)
+    signed = await client.get(url, headers={**auth_headers(creator_user), "If-None-Match": etag})
+    assert signed.status_code == 200
+    assert signed.headers["etag"] != etag
+    assert len(os.listdir(tmp_path)) == 2
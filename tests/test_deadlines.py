@@ -0,0 +1,41 @@
+"""Tests for the deal deadline sweeper."""
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.deal import Deal
+from app.models.job import Job
+from app.models.notification import Notification
+from app.models.sms import SmsMessage
+from app.services.deadlines import sweep
+
+
+@pytest.mark.asyncio
+async def test_sweep_reminds_due_deals_once(db, advertiser_user, creator_user, order):
+    today = date(2026, 3, 10)
+
+    def deal(deadline, status="in_progress"):
+        return Deal(
+            order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+            budget=100000, deadline=deadline, status=status,
+        )
+
+    soon, overdue = deal(today + timedelta(days=1)), [deal(today - timedelta(days=d)) for d in (1, 2, 3)]
+    db.add_all([soon, *overdue, deal(today + timedelta(days=30)), deal(today - timedelta(days=1), status="completed")])
+    await db.commit()
+
+    assert await sweep(db, "due_soon", today=today) == 1
+    assert await sweep(db, "overdue", chunk_size=2, today=today) == 3
+    # Reruns find nothing new
+    assert await sweep(db, "due_soon", today=today) == 0
+    assert await sweep(db, "overdue", today=today) == 0
+
+    types = (await db.execute(select(Notification.type, func.count()).group_by(Notification.type))).all()
+    assert dict(types) == {"deal_due_soon": 1, "deal_overdue": 6}  # overdue goes to both parties
+    jobs = (await db.execute(select(Job).where(Job.kind == "sms.send"))).scalars().all()
+    assert len(jobs) == 7
+    messages = (await db.execute(select(SmsMessage))).scalars().all()
+    assert {str(m.id) for m in messages} == {j.payload["message_id"] for j in jobs}
+    assert {m.phone for m in messages} == {creator_user.phone, advertiser_user.phone}
@@ -1,8 +1,7 @@
 """Tests for the full deal flow: offer → sign → pay → work → confirm/dispute."""
 import pytest
-from unittest.mock import AsyncMock, patch
 
-from tests.conftest import auth_headers
+from tests.conftest import auth_headers, run_jobs
 
 
 async def _create_deal(client, advertiser_user, creator_user, chat, order):
@@ -72,27 +71,52 @@ async def test_list_deals_filter_status(client, advertiser_user, creator_user, c
     assert len(resp.json()["data"]) == 0
 
 
+@pytest.mark.asyncio
+async def test_list_deals_cursor_pagination(client, advertiser_user, creator_user, chat, order):
+    created = [await _create_deal(client, advertiser_user, creator_user, chat, order) for _ in range(3)]
+
+    resp = await client.get("/v1/deals?limit=2", headers=auth_headers(advertiser_user))
+    first = resp.json()
+    assert [d["id"] for d in first["data"]] == created[::-1][:2]
+    assert first["has_more"] is True
+    assert first["data"][0]["order"]["title"] == "Тестовый заказ"
+    assert first["data"][0]["creator"]["name"] == "Test Creator"
+    assert first["data"][0]["advertiser"]["company_name"] == "TestCorp"
+
+    resp = await client.get(f"/v1/deals?limit=2&cursor={first['next_cursor']}", headers=auth_headers(advertiser_user))
+    second = resp.json()
+    assert [d["id"] for d in second["data"]] == created[:1]
+    assert second["has_more"] is False
+    assert second["next_cursor"] is None
+
+
 # ────────────────────────────────────────
 # CONTRACT SIGNING
 # ────────────────────────────────────────
 
 @pytest.mark.asyncio
-async def test_request_sign_sends_sms(client, advertiser_user, creator_user, chat, order):
+async def test_request_sign_queues_sms(client, advertiser_user, creator_user, chat, order, db):
     deal_id = await _create_deal(client, advertiser_user, creator_user, chat, order)
 
-    with patch("app.routers.deals.send_sms", new_callable=AsyncMock, return_value=True) as mock_sms:
-        resp = await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(advertiser_user))
+    resp = await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(advertiser_user))
     assert resp.status_code == 200
     assert resp.json()["message"] == "SMS-код отправлен"
-    mock_sms.assert_called_once()
+
+    from sqlalchemy import select
+    from app.models.job import Job
+    from app.models.sms import SmsMessage
+    jobs = (await db.execute(select(Job).where(Job.kind == "sms.send"))).scalars().all()
+    assert len(jobs) == 1
+    message = (await db.execute(select(SmsMessage))).scalar_one()
+    assert jobs[0].payload == {"message_id": str(message.id)}
+    assert message.phone == advertiser_user.phone
 
 
 @pytest.mark.asyncio
 async def test_sign_wrong_code(client, advertiser_user, creator_user, chat, order):
     deal_id = await _create_deal(client, advertiser_user, creator_user, chat, order)
 
-    with patch("app.routers.deals.send_sms", new_callable=AsyncMock, return_value=True):
-        await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(advertiser_user))
+    await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(advertiser_user))
 
     resp = await client.post(
         f"/v1/deals/{deal_id}/sign",
@@ -108,8 +132,7 @@ async def test_sign_both_parties(client, advertiser_user, creator_user, chat, or
     deal_id = await _create_deal(client, advertiser_user, creator_user, chat, order)
 
     # Advertiser signs
-    with patch("app.routers.deals.send_sms", new_callable=AsyncMock, return_value=True):
-        await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(advertiser_user))
+    await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(advertiser_user))
 
     from sqlalchemy import select
     from app.models.deal import DealSignature
@@ -126,8 +149,7 @@ async def test_sign_both_parties(client, advertiser_user, creator_user, chat, or
     assert resp.json()["deal_status"] == "contract_signed"
 
     # Creator signs
-    with patch("app.routers.deals.send_sms", new_callable=AsyncMock, return_value=True):
-        await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(creator_user))
+    await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(creator_user))
 
     result = await db.execute(
         select(DealSignature).where(DealSignature.deal_id == deal_id, DealSignature.user_id == creator_user.id)
@@ -141,6 +163,13 @@ async def test_sign_both_parties(client, advertiser_user, creator_user, chat, or
     )
     assert resp.json()["deal_status"] == "pending_payment"
 
+    detail = (await client.get(f"/v1/deals/{deal_id}", headers=auth_headers(creator_user))).json()
+    signers = {sig["user_id"]: sig for sig in detail["contract"]["signatures"]}
+    assert signers[str(advertiser_user.id)]["name"] == "Test Advertiser"
+    assert signers[str(creator_user.id)]["role"] == "creator"
+    assert all(sig["status"] == "signed" for sig in signers.values())
+    assert detail["advertiser"]["company_name"] == "TestCorp"
+
 
 # ────────────────────────────────────────
 # PAYMENT
@@ -152,8 +181,7 @@ async def _sign_deal(client, deal_id, advertiser_user, creator_user, db):
     from app.models.deal import DealSignature
 
     for user in [advertiser_user, creator_user]:
-        with patch("app.routers.deals.send_sms", new_callable=AsyncMock, return_value=True):
-            await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(user))
+        await client.post(f"/v1/deals/{deal_id}/request-sign", headers=auth_headers(user))
         result = await db.execute(
             select(DealSignature).where(DealSignature.deal_id == deal_id, DealSignature.user_id == user.id)
         )
@@ -175,12 +203,18 @@ async def test_pay_deal(client, advertiser_user, creator_user, chat, order, db):
         json={"payment_method": "kaspi"},
         headers=auth_headers(advertiser_user),
     )
-    assert resp.status_code == 200
+    assert resp.status_code == 202
     data = resp.json()
-    assert data["status"] == "in_progress"
-    assert data["escrow_amount"] == 100000
+    assert data["status"] == "pending_payment"
+    assert data["payment"]["status"] == "pending"
     assert data["payment"]["method"] == "kaspi"
 
+    # The provider call and escrow funding happen in the worker
+    await run_jobs(db)
+    detail = (await client.get(f"/v1/deals/{deal_id}", headers=auth_headers(advertiser_user))).json()
+    assert detail["status"] == "in_progress"
+    assert detail["escrow_amount"] == 100000
+
 
 @pytest.mark.asyncio
 async def test_pay_deal_wrong_status(client, advertiser_user, creator_user, chat, order):
@@ -207,6 +241,7 @@ async def _deal_to_in_progress(client, advertiser_user, creator_user, chat, orde
         json={"payment_method": "kaspi"},
         headers=auth_headers(advertiser_user),
     )
+    await run_jobs(db)
     return deal_id
 
 
@@ -267,6 +302,26 @@ async def test_dispute(client, advertiser_user, creator_user, chat, order, db):
     assert data["reason"] == "Видео не соответствует ТЗ"
 
 
+@pytest.mark.asyncio
+async def test_timeline(client, advertiser_user, creator_user, chat, order, db):
+    deal_id = await _deal_to_in_progress(client, advertiser_user, creator_user, chat, order, db)
+    await client.post(f"/v1/deals/{deal_id}/submit-work", headers=auth_headers(creator_user))
+    await client.post(
+        f"/v1/deals/{deal_id}/dispute",
+        json={"reason": "Видео не соответствует ТЗ"},
+        headers=auth_headers(advertiser_user),
+    )
+
+    resp = await client.get(f"/v1/deals/{deal_id}/timeline", headers=auth_headers(creator_user))
+    assert resp.status_code == 200
+    events = resp.json()["events"]
+    assert [e["event"] for e in events] == ["created", "sign", "sign_complete", "pay", "submit_work", "dispute"]
+    assert events[0]["from_status"] is None
+    assert events[-1]["to_status"] == "disputed"
+    assert events[-1]["actor_id"] == str(advertiser_user.id)
+    assert events[-1]["data"]["dispute_reason"] == "Видео не соответствует ТЗ"
+
+
 @pytest.mark.asyncio
 async def test_dispute_wrong_status(client, advertiser_user, creator_user, chat, order, db):
     deal_id = await _deal_to_in_progress(client, advertiser_user, creator_user, chat, order, db)
@@ -323,7 +378,8 @@ async def test_full_deal_flow(client, advertiser_user, creator_user, chat, order
         json={"payment_method": "kaspi"},
         headers=auth_headers(advertiser_user),
     )
-    assert pay_resp.json()["status"] == "in_progress"
+    assert pay_resp.json()["payment"]["status"] == "pending"
+    await run_jobs(db)
 
     # 5. Submit work
     work_resp = await client.post(f"/v1/deals/{deal_id}/submit-work", headers=auth_headers(creator_user))
@@ -0,0 +1,61 @@
+"""Tests for the optimistic-concurrency deal state machine."""
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.deal import Deal
+from app.services.deal_state import ConcurrentUpdate, InvalidTransition, can_transition, transition
+
+
+def test_can_transition():
+    deal = Deal(status="work_submitted")
+    assert can_transition(deal, "confirm_work")
+    assert can_transition(deal, "dispute")
+    assert not can_transition(deal, "pay")
+
+
+@pytest.mark.asyncio
+async def test_transition_bumps_version(db, advertiser_user, creator_user, order):
+    deal = Deal(
+        order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+        budget=100000, deadline=order.deadline, status="pending_payment",
+    )
+    db.add(deal)
+    await db.commit()
+
+    await transition(db, deal, "pay", escrow_amount=deal.budget, payment_method="kaspi")
+    await db.commit()
+
+    assert deal.status == "in_progress"
+    assert deal.version == 2
+    assert deal.escrow_amount == 100000
+    with pytest.raises(InvalidTransition):
+        await transition(db, deal, "pay")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_transition_conflicts(db, advertiser_user, creator_user, order):
+    deal = Deal(
+        order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+        budget=100000, deadline=order.deadline, status="work_submitted",
+    )
+    db.add(deal)
+    await db.commit()
+
+    # Two requests that both read the deal at version 1
+    factory = async_sessionmaker(db.bind, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as first, factory() as second:
+        a = await first.get(Deal, deal.id)
+        b = await second.get(Deal, deal.id)
+
+        await transition(first, a, "confirm_work", platform_fee=10000, creator_payout=90000)
+        await first.commit()
+
+        with pytest.raises(ConcurrentUpdate):
+            await transition(second, b, "dispute", dispute_reason="late")
+        await second.rollback()
+
+    await db.refresh(deal)
+    assert deal.status == "completed"
+    assert deal.version == 2
@@ -0,0 +1,74 @@
+"""Tests for the Postgres-backed job queue."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.job import Job
+from app.services import jobs
+from app.services.jobs import PRIORITY_HIGH, PRIORITY_LOW, backoff_seconds, enqueue, job_handler, run_batch
+
+
+@pytest.fixture
+def session_factory(db):
+    return async_sessionmaker(db.bind, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def calls():
+    seen = []
+
+    @job_handler("test.ok")
+    async def ok(db, payload):
+        seen.append(payload["n"])
+
+    @job_handler("test.fail")
+    async def fail(db, payload):
+        raise RuntimeError("boom")
+
+    yield seen
+    jobs.handlers.pop("test.ok")
+    jobs.handlers.pop("test.fail")
+
+
+def test_backoff_grows_and_caps():
+    assert backoff_seconds(1) <= jobs.BACKOFF_BASE_SECONDS
+    assert backoff_seconds(4) >= jobs.BACKOFF_BASE_SECONDS * 4
+    assert backoff_seconds(50) <= jobs.BACKOFF_MAX_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_run_batch_priority_and_schedule(db, session_factory, calls):
+    enqueue(db, "test.ok", {"n": 1}, priority=PRIORITY_LOW)
+    enqueue(db, "test.ok", {"n": 2}, priority=PRIORITY_HIGH)
+    enqueue(db, "test.ok", {"n": 3}, run_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    await db.commit()
+
+    assert await run_batch(session_factory, limit=1) == 1
+    assert calls == [2]
+    assert await run_batch(session_factory) == 1
+    assert calls == [2, 1]
+
+    statuses = (await db.execute(select(Job.status).order_by(Job.created_at))).scalars().all()
+    assert sorted(statuses) == ["done", "done", "queued"]
+
+
+@pytest.mark.asyncio
+async def test_failed_job_retries_then_dead_letters(db, session_factory, calls):
+    job = enqueue(db, "test.fail", max_attempts=2)
+    await db.commit()
+
+    await run_batch(session_factory)
+    await db.refresh(job)
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert job.run_at > datetime.now(timezone.utc)
+    assert job.last_error == "boom"
+
+    job.run_at = datetime.now(timezone.utc)
+    await db.commit()
+    await run_batch(session_factory)
+    await db.refresh(job)
+    assert job.status == "dead"
+    assert job.attempts == 2
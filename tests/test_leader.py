@@ -0,0 +1,57 @@
+"""Tests for advisory-lock leader election."""
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import leader
+from app.core.leader import LeaderElection, lock_key
+from tests.conftest import TEST_DB_URL
+
+
+def test_lock_key_is_stable_signed_bigint():
+    assert lock_key("auto_complete") == lock_key("auto_complete")
+    assert lock_key("auto_complete") != lock_key("payouts")
+    assert -(2**63) <= lock_key("auto_complete") < 2**63
+
+
+@pytest.mark.asyncio
+async def test_single_leader_and_failover(monkeypatch):
+    monkeypatch.setattr(leader, "RETRY_SECONDS", 0.05)
+    # Separate engines stand in for two processes with their own connections
+    eng_a = create_async_engine(TEST_DB_URL)
+    eng_b = create_async_engine(TEST_DB_URL)
+    running = []
+
+    def job(tag):
+        async def _job():
+            running.append(tag)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await asyncio.sleep(0.1)  # cleanup must finish before the lock is released
+                running.append(f"{tag} stopped")
+
+        return _job
+
+    a = LeaderElection("test-job", job("a"), engine=eng_a)
+    b = LeaderElection("test-job", job("b"), engine=eng_b)
+    task_a = asyncio.create_task(a.run())
+    await asyncio.sleep(0.3)
+    task_b = asyncio.create_task(b.run())
+    await asyncio.sleep(0.3)
+
+    assert running == ["a"]
+    assert a.is_leader and not b.is_leader
+
+    task_a.cancel()
+    await asyncio.gather(task_a, return_exceptions=True)
+    await asyncio.sleep(0.3)
+
+    assert running == ["a", "a stopped", "b"]
+    assert b.is_leader
+
+    task_b.cancel()
+    await asyncio.gather(task_b, return_exceptions=True)
+    await eng_a.dispose()
+    await eng_b.dispose()
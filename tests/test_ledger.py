@@ -0,0 +1,62 @@
+"""Tests for the escrow ledger and payout batching."""
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.models.deal import Deal
+from app.models.ledger import LedgerAccount, Payout
+from app.services import ledger
+from app.services.payments import get_payment_provider
+from app.services.payouts import create_payout_batch
+from tests.conftest import auth_headers, run_jobs
+
+
+@pytest.mark.asyncio
+async def test_post_rejects_unbalanced_transaction():
+    with pytest.raises(ValueError):
+        await ledger.post(None, [ledger.Txn("escrow_funded", "KZT", [(ledger.PAYMENTS_IN, -100), (ledger.ESCROW, 90)])])
+
+
+async def _balances(db) -> dict:
+    return {a.account: a.balance for a in (await db.execute(select(LedgerAccount))).scalars()}
+
+
+@pytest.mark.asyncio
+async def test_payout_batch_one_per_creator(client, db, advertiser_user, creator_user, order):
+    deals = [
+        Deal(
+            order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+            budget=100000, deadline=order.deadline, status="pending_payment",
+        )
+        for _ in range(2)
+    ]
+    db.add_all(deals)
+    await db.commit()
+    for deal_id in [d.id for d in deals]:
+        await client.post(f"/v1/deals/{deal_id}/pay", json={"payment_method": "kaspi"}, headers=auth_headers(advertiser_user))
+        await run_jobs(db)
+        await client.post(f"/v1/deals/{deal_id}/submit-work", headers=auth_headers(creator_user))
+        resp = await client.post(f"/v1/deals/{deal_id}/confirm-work", headers=auth_headers(advertiser_user))
+        assert resp.status_code == 200
+
+    payouts = await create_payout_batch(db)
+
+    assert [(p.creator_id, p.amount, p.deal_count) for p in payouts] == [(creator_user.id, 180000, 2)]
+    assert await create_payout_batch(db) == []  # nothing left to batch
+
+    await run_jobs(db)
+    payout = (await db.execute(select(Payout))).scalar_one()
+    assert payout.status == "sent"
+    assert get_payment_provider().payouts[str(payout.id)]["amount"] == 180000
+
+    balances = await _balances(db)
+    assert balances[ledger.PAYMENTS_IN] == -200000
+    assert balances[ledger.ESCROW] == 0
+    assert balances[ledger.PLATFORM_REVENUE] == 20000
+    assert balances[ledger.creator_account(creator_user.id)] == 0
+    assert balances[ledger.PAYOUTS_IN_FLIGHT] == 0
+    assert balances[ledger.PAYOUTS_OUT] == 180000
+
+    report = await ledger.reconcile(db)
+    assert report["ok"], report
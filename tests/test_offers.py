@@ -1,5 +1,6 @@
 """Tests for offers endpoints: my/sent, my/received, view, cancel."""
 import pytest
+from unittest.mock import AsyncMock, patch
 
 from tests.conftest import auth_headers
 
@@ -87,3 +88,15 @@ async def test_cancel_offer_already_accepted(client, advertiser_user, creator_us
     # Try cancel
     resp = await client.post(f"/v1/offers/{offer_id}/cancel", headers=auth_headers(advertiser_user))
     assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_view_offer_pushes_status_changed(client, advertiser_user, creator_user, chat, order):
+    offer_id = await _send_offer(client, advertiser_user, chat, order)
+
+    with patch("app.services.events.manager.send_to_user", new_callable=AsyncMock) as mock_send:
+        await client.post(f"/v1/offers/{offer_id}/view", headers=auth_headers(creator_user))
+
+    pushed = {c.args[0]: c.args[1] for c in mock_send.call_args_list}
+    assert pushed[str(advertiser_user.id)]["event"] == "offer_status_changed"
+    assert pushed[str(advertiser_user.id)]["data"]["status"] == "viewed"
@@ -0,0 +1,95 @@
+"""Tests for the OTP stores and daily partition upkeep."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.otp import OTPCode
+from app.services import otp, partitions
+from app.services.partitions import drop_daily_partitions, ensure_daily_partitions, maintain_tables
+
+PHONE = "+77051234567"
+
+
+@pytest.mark.asyncio
+async def test_memory_store_issue_verify_and_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(otp.time, "monotonic", lambda: now[0])
+    store = otp.MemoryOtpStore()
+
+    assert await store.issue(None, PHONE, "111111") == 0
+    assert await store.issue(None, PHONE, "222222") == otp.settings.OTP_RATE_LIMIT_SECONDS
+    assert not await store.verify(None, PHONE, "000000")
+    assert await store.verify(None, PHONE, "111111")
+    assert not await store.verify(None, PHONE, "111111")  # consumed
+    assert PHONE not in store.codes
+
+    # A used code doesn't hold back the next one; an expired one can't be verified
+    assert await store.issue(None, PHONE, "333333") == 0
+    now[0] += otp.settings.OTP_EXPIRE_MINUTES * 60
+    assert not await store.verify(None, PHONE, "333333")
+
+
+@pytest.mark.asyncio
+async def test_memory_store_purges_expired_codes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(otp.time, "monotonic", lambda: now[0])
+    store = otp.MemoryOtpStore()
+    for i in range(100):
+        await store.issue(None, f"+7700000{i:04d}", "123456")
+
+    now[0] += otp.settings.OTP_EXPIRE_MINUTES * 60 + 1
+    await store.issue(None, PHONE, "123456")
+    assert list(store.codes) == [PHONE]
+
+
+@pytest.mark.asyncio
+async def test_postgres_store_stores_hash_and_consumes_once(db):
+    store = otp.PostgresOtpStore()
+    assert await store.issue(db, PHONE, "123456") == 0
+    assert await store.issue(db, PHONE, "654321") > 0
+    await db.commit()
+
+    row = (await db.execute(select(OTPCode))).scalar_one()
+    assert row.code_hash == otp.code_hash(PHONE, "123456") and "123456" not in row.code_hash
+
+    assert not await store.verify(db, PHONE, "000000")
+    assert await store.verify(db, PHONE, "123456")
+    assert not await store.verify(db, PHONE, "123456")
+    await db.commit()
+    # Once used, the rate limit no longer applies
+    assert await store.issue(db, PHONE, "777777") == 0
+
+
+@pytest.mark.asyncio
+async def test_daily_partitions_created_and_dropped(db):
+    today = datetime.now(timezone.utc).date()
+    names = await ensure_daily_partitions(db, "otp_codes", days_ahead=1)
+    assert names == [f"otp_codes_{today:%Y_%m_%d}", f"otp_codes_{today + timedelta(days=1):%Y_%m_%d}"]
+
+    old = today - timedelta(days=3)
+    await db.execute(text(
+        f"CREATE TABLE otp_codes_{old:%Y_%m_%d} PARTITION OF otp_codes "
+        f"FOR VALUES FROM ('{old} 00:00+00') TO ('{old + timedelta(days=1)} 00:00+00')"
+    ))
+    await db.commit()
+
+    assert await drop_daily_partitions(db, "otp_codes", keep_days=1) == [f"otp_codes_{old:%Y_%m_%d}"]
+    assert await drop_daily_partitions(db, "otp_codes", keep_days=1) == []
+
+
+@pytest.mark.asyncio
+async def test_failing_monthly_step_still_creates_daily_partitions(db, monkeypatch):
+    async def broken(db, table, months_ahead=partitions.MONTHS_AHEAD):
+        raise RuntimeError("lock timeout")
+
+    monkeypatch.setattr(partitions, "ensure_monthly_partitions", broken)
+    session_factory = async_sessionmaker(db.bind, class_=AsyncSession, expire_on_commit=False)
+
+    assert await maintain_tables(session_factory) == ["deal_events"]
+
+    today = datetime.now(timezone.utc).date()
+    names = (await db.execute(text("SELECT relname FROM pg_class WHERE relname LIKE 'otp_codes_2%'"))).scalars().all()
+    assert f"otp_codes_{today:%Y_%m_%d}" in names
+    assert f"otp_codes_{today + timedelta(days=partitions.DAYS_AHEAD):%Y_%m_%d}" in names
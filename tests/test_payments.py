@@ -0,0 +1,54 @@
+"""Tests for asynchronous payments and provider webhooks."""
+import pytest
+from sqlalchemy import select
+
+from app.models.payment import Payment
+from app.services.payments import get_payment_provider
+from tests.conftest import auth_headers, run_jobs
+from tests.test_deal_flow import _create_deal, _sign_deal
+
+
+@pytest.fixture
+def provider_pending():
+    provider = get_payment_provider()
+    provider.next_status = "pending"
+    yield provider
+    provider.next_status = "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_webhook_completes_payment_once(client, advertiser_user, creator_user, chat, order, db, provider_pending):
+    deal_id = await _create_deal(client, advertiser_user, creator_user, chat, order)
+    await _sign_deal(client, deal_id, advertiser_user, creator_user, db)
+
+    resp = await client.post(f"/v1/deals/{deal_id}/pay", json={"payment_method": "card"}, headers=auth_headers(advertiser_user))
+    assert resp.status_code == 202
+    payment_id = resp.json()["payment"]["id"]
+    again = await client.post(f"/v1/deals/{deal_id}/pay", json={"payment_method": "card"}, headers=auth_headers(advertiser_user))
+    assert again.json()["payment"]["id"] == payment_id
+
+    await run_jobs(db)
+    payment = (await db.execute(select(Payment))).scalar_one()
+    assert payment.status == "pending"
+    assert payment.provider_ref
+
+    body, headers = provider_pending.settle(payment.provider_ref)
+    first = await client.post("/v1/payments/webhook/fake", content=body, headers=headers)
+    redelivery = await client.post("/v1/payments/webhook/fake", content=body, headers=headers)
+    assert first.json() == {"status": "ok", "duplicate": False}
+    assert redelivery.json() == {"status": "ok", "duplicate": True}
+
+    assert await run_jobs(db) == 1
+    detail = (await client.get(f"/v1/deals/{deal_id}", headers=auth_headers(advertiser_user))).json()
+    assert detail["status"] == "in_progress"
+    assert detail["escrow_amount"] == 100000
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_bad_signature(client, db):
+    resp = await client.post(
+        "/v1/payments/webhook/fake",
+        content=b'{"id": "evt_1", "type": "payment.succeeded", "payment_ref": "x"}',
+        headers={"X-Signature": "forged"},
+    )
+    assert resp.status_code == 400
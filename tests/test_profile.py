@@ -1,10 +1,7 @@
 """Tests for profile endpoints."""
 import pytest
-from unittest.mock import AsyncMock, patch
 
-from tests.conftest import auth_headers
-
-SMS_PATCH = "app.services.sms.send_otp_sms"
+from tests.conftest import auth_headers, sent_otp_code
 
 
 @pytest.mark.asyncio
@@ -24,15 +21,11 @@ async def test_get_profile_unauthorized(client):
 
 @pytest.mark.asyncio
 async def test_choose_role(client, db):
-    with patch(SMS_PATCH, new_callable=AsyncMock, return_value=True):
-        await client.post("/v1/auth/send-otp", json={"phone": "+77051119999"})
+    await client.post("/v1/auth/send-otp", json={"phone": "+77051119999"})
 
-    from sqlalchemy import select
-    from app.models.otp import OTPCode
-    result = await db.execute(select(OTPCode).where(OTPCode.phone == "+77051119999"))
-    otp = result.scalar_one()
+    code = await sent_otp_code(db, "+77051119999")
 
-    verify_resp = await client.post("/v1/auth/verify-otp", json={"phone": "+77051119999", "code": otp.code})
+    verify_resp = await client.post("/v1/auth/verify-otp", json={"phone": "+77051119999", "code": code})
     token = verify_resp.json()["token"]
     headers = {"Authorization": f"Bearer {token}"}
 
@@ -0,0 +1,52 @@
+"""Tests for token decoding and the verified-token cache."""
+import time
+
+import pytest
+from jose import jwt
+
+from app.core import security
+from app.core.config import settings
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = security.TokenCache(maxsize=2)
+    monkeypatch.setattr(security, "token_cache", cache)
+    return cache
+
+
+def test_decode_caches_verified_tokens_only(cache, monkeypatch):
+    verified = []
+    decode = security.jwt.decode
+    monkeypatch.setattr(security.jwt, "decode", lambda *a, **kw: verified.append(1) or decode(*a, **kw))
+
+    token = security.create_access_token("user-1", "session-1")
+    assert security.decode_token(token)["sub"] == "user-1"
+    assert security.decode_token(token)["sub"] == "user-1"
+    assert len(verified) == 1  # the second call was served from the cache
+
+    assert security.decode_token(token + "x") is None
+    assert len(cache.entries) == 1
+
+
+def test_cache_is_bounded_lru_and_honours_exp(cache):
+    a, b, c = (security.create_access_token(u, f"session-{u}") for u in ("a", "b", "c"))
+    for token in (a, b, a, c):  # touching `a` again makes `b` the oldest
+        security.decode_token(token)
+    assert cache.get(b) is None and cache.get(a) and cache.get(c)
+
+    expired = jwt.encode({"sub": "d", "exp": int(time.time()) + 1, "type": "access"}, settings.SECRET_KEY, settings.ALGORITHM)
+    cache.put(expired, {"sub": "d", "exp": int(time.time()) - 1})
+    assert cache.get(expired) is None
+    assert cache.key(expired) not in cache.entries
+
+
+def test_revocation_check_applies_to_cached_tokens(cache, monkeypatch):
+    revoked = set()
+    monkeypatch.setattr(security, "_is_revoked", None)
+    security.set_revocation_check(lambda payload: payload["sub"] in revoked)
+
+    token = security.create_access_token("user-1", "session-1")
+    assert security.decode_token(token) is not None
+    revoked.add("user-1")
+    assert security.decode_token(token) is None
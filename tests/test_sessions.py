@@ -0,0 +1,79 @@
+"""Tests for the revoked-session denylist."""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core import security
+from app.models.session import UserSession
+from app.services import sessions
+
+
+@pytest.fixture
+def denylist(monkeypatch):
+    fresh = sessions.Denylist()
+    monkeypatch.setattr(sessions, "denylist", fresh)
+    return fresh
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = sessions.BloomFilter(capacity=1000, error_rate=0.01)
+    added = [str(uuid.uuid4()) for _ in range(1000)]
+    for key in added:
+        bloom.add(key)
+    assert all(key in bloom for key in added)
+    false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+    assert false_positives < 300
+
+
+def test_revoked_sessions_are_refused_by_decode_token(denylist, monkeypatch):
+    monkeypatch.setattr(security, "_is_revoked", None)
+    security.set_revocation_check(sessions.is_revoked)
+    sid = str(uuid.uuid4())
+    token = security.create_access_token("user-1", sid)
+    other = security.create_access_token("user-1", str(uuid.uuid4()))
+
+    assert security.decode_token(token) is not None
+    denylist.add(sid)
+    assert security.decode_token(token) is None  # also when served from the cache
+    assert security.decode_token(other) is not None
+
+    # Tokens minted before sessions existed can't be revoked, so they are not accepted
+    legacy = security.jwt.encode(
+        {"sub": "user-1", "exp": datetime.now(timezone.utc) + timedelta(days=1), "type": "access"},
+        security.settings.SECRET_KEY, algorithm=security.settings.ALGORITHM,
+    )
+    assert security.decode_token(legacy) is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_is_incremental_and_rebuild_drops_expired(db, creator_user, denylist):
+    now = datetime.now(timezone.utc)
+
+    def session(revoked_at=None, expires_at=now + timedelta(days=90)):
+        s = UserSession(
+            user_id=creator_user.id, refresh_token_hash="x" * 64, expires_at=expires_at, revoked_at=revoked_at
+        )
+        db.add(s)
+        return s
+
+    live = session()
+    revoked = session(revoked_at=now - timedelta(minutes=1))
+    expired = session(revoked_at=now - timedelta(days=100), expires_at=now - timedelta(days=10))
+    await db.commit()
+
+    assert await sessions.refresh_denylist(db) == 1  # first call is a full load
+    current = sessions.denylist
+    assert str(revoked.id) in current and str(expired.id) not in current and str(live.id) not in current
+
+    await sessions.revoke_session(db, str(live.id))
+    await db.commit()
+    await db.refresh(live)
+    assert str(live.id) in sessions.denylist  # this process knows at once
+    await sessions.refresh_denylist(db)
+    assert sessions.denylist is current and current.cursor >= live.revoked_at
+
+    # Another process only learns of it from the table
+    sessions.denylist = other = sessions.Denylist()
+    await sessions.refresh_denylist(db)
+    assert str(live.id) in other and str(revoked.id) in other
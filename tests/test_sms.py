@@ -0,0 +1,218 @@
+"""Tests for the Mobizon client and the SMS outbox against a local fake server."""
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.job import Job
+from app.models.sms import SmsMessage
+from app.services import sms
+from tests.conftest import run_jobs
+from tests.fake_mobizon import FakeMobizon
+
+
+@pytest_asyncio.fixture
+async def mobizon(monkeypatch):
+    fake = FakeMobizon()
+    monkeypatch.setattr(sms, "_sender", sms.FailoverSms([sms.MobizonProvider()], threshold=2, reset_seconds=60))
+    sms.start_sms_client(transport=httpx.ASGITransport(app=fake.app))
+    yield fake
+    await sms.close_sms_client()
+
+
+def never_answers(request):
+    raise httpx.ReadTimeout("timed out", request=request)
+
+
+@pytest.mark.asyncio
+async def test_send_sms_reuses_one_client(mobizon):
+    client = sms.get_sms_client()
+
+    assert await sms.send_sms("+77001112233", "first")
+    assert await sms.send_sms("+77001112233", "second")
+
+    assert sms.get_sms_client() is client
+    assert [m["recipient"] for m in mobizon.sent] == ["77001112233", "77001112233"]
+    assert sms.get_sms_sender().snapshot()["mobizon"]["outcomes"] == {"ok": 2}
+
+
+@pytest.mark.asyncio
+async def test_send_sms_records_rejections_and_timeouts(mobizon):
+    mobizon.reject_next = 1
+    assert not await sms.send_sms("+77001112233", "rejected")
+
+    # In-process ASGI calls can't time out; simulate Mobizon not answering in time
+    await sms.close_sms_client()
+    sms.start_sms_client(transport=httpx.MockTransport(never_answers))
+    assert not await sms.send_sms("+77001112233", "slow")
+
+    snapshot = sms.get_sms_sender().snapshot()["mobizon"]
+    assert snapshot["calls"] == 2
+    assert snapshot["outcomes"] == {"rejected": 1, "timeout": 1}
+
+
+def test_circuit_breaker_opens_on_error_rate():
+    breaker = sms.CircuitBreaker(threshold=100, reset_seconds=30, error_rate=0.5, window=4)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"  # 2 of the last 4 calls failed, never two in a row
+
+
+def test_circuit_breaker_opens_and_probes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sms.time, "monotonic", lambda: now[0])
+    breaker = sms.CircuitBreaker(threshold=2, reset_seconds=30)
+
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.retry_after() == 30
+
+    now[0] += 30
+    assert breaker.allow()  # one probe
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_outbox_delivers_and_records_status(mobizon, db):
+    message = sms.queue_sms(db, "+77001112233", "hello 1234")
+    await db.commit()
+
+    assert await run_jobs(db) == 1
+    await db.refresh(message)
+    assert message.status == "sent"
+    assert message.attempts == 1
+    assert message.text == "hello ••••"  # the code isn't kept once delivered
+    assert (message.provider, message.provider_message_id) == ("mobizon", "1")
+    assert message.sent_at is not None
+    assert mobizon.sent[0]["text"] == "hello 1234"
+
+
+@pytest.mark.asyncio
+async def test_outbox_retries_failures_and_waits_while_circuit_open(mobizon, db):
+    await sms.close_sms_client()
+    sms.start_sms_client(transport=httpx.MockTransport(never_answers))
+    first = sms.queue_sms(db, "+77001112233", "one")
+    second = sms.queue_sms(db, "+77001112233", "two")
+    await db.commit()
+
+    await run_jobs(db)
+    for message in (first, second):
+        await db.refresh(message)
+        assert (message.status, message.attempts) == ("retrying", 1)
+        assert message.last_error.startswith("timeout")
+    assert sms.get_sms_sender().snapshot()["mobizon"]["circuit"] == "open"
+
+    # With the circuit open, a new message waits without calling Mobizon or using an attempt
+    third = sms.queue_sms(db, "+77001112233", "three")
+    await db.commit()
+    await run_jobs(db)
+    await db.refresh(third)
+    assert (third.status, third.attempts) == ("queued", 0)
+    job = (await db.execute(select(Job).where(Job.payload["message_id"].astext == str(third.id)))).scalar_one()
+    assert (job.status, job.attempts) == ("queued", 0)
+    assert job.last_error == "SMS circuit open"
+
+
+@pytest.mark.asyncio
+async def test_outbox_fails_rejected_messages_without_retrying(mobizon, db):
+    mobizon.reject_next = 1
+    message = sms.queue_sms(db, "+77001112233", "hello")
+    await db.commit()
+
+    assert await run_jobs(db) == 1
+    await db.refresh(message)
+    assert (message.status, message.attempts) == ("failed", 1)
+    assert message.last_error.startswith("rejected")
+    job = (await db.execute(select(Job))).scalar_one()
+    assert job.status == "done"
+    assert await run_jobs(db) == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_drops_expired_messages(mobizon, db):
+    message = sms.queue_sms(db, "+77001112233", "old code", expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    await db.commit()
+
+    await run_jobs(db)
+    await db.refresh(message)
+    assert message.status == "expired"
+    assert mobizon.sent == []
+
+
+@pytest.mark.asyncio
+async def test_old_messages_are_purged(db):
+    old = sms.queue_sms(db, "+77001112233", "old")
+    new = sms.queue_sms(db, "+77001112233", "new")
+    old.created_at = datetime.now(timezone.utc) - timedelta(days=settings.SMS_RETENTION_DAYS, minutes=1)
+    await db.commit()
+
+    assert await sms.purge_old_messages(db) == 1
+    assert (await db.execute(select(SmsMessage.id))).scalars().all() == [new.id]
+
+
+@pytest.mark.asyncio
+async def test_failover_moves_to_next_provider(monkeypatch):
+    monkeypatch.setattr(sms.time, "monotonic", lambda: 1000.0)
+    primary, backup = sms.FakeSmsProvider("primary"), sms.FakeSmsProvider("backup")
+    sender = sms.FailoverSms([primary, backup], threshold=2, reset_seconds=30)
+
+    primary.fail_next = 2
+    assert await sender.send("+77001112233", "one") == ("backup", "backup_1")
+    assert await sender.send("+77001112233", "two") == ("backup", "backup_2")
+    # primary's circuit is open now, so it isn't even tried
+    assert await sender.send("+77001112233", "three") == ("backup", "backup_3")
+    snapshot = sender.snapshot()
+    assert snapshot["primary"]["circuit"] == "open"
+    assert snapshot["primary"]["outcomes"] == {"timeout": 2}
+    assert snapshot["backup"]["outcomes"] == {"ok": 3}
+
+    # Rejections are final: the backup is not asked to send a message the gateway refused
+    monkeypatch.setattr(sms.time, "monotonic", lambda: 1030.0)
+    primary.reject_next = 1
+    with pytest.raises(sms.SmsError) as exc:
+        await sender.send("+77001112233", "four")
+    assert exc.value.outcome == "rejected"
+    assert len(backup.sent) == 3
+    # ...but the probe got an answer, so primary is back in rotation
+    assert sender.snapshot()["primary"]["circuit"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_failover_raises_unavailable_when_all_circuits_open(monkeypatch):
+    monkeypatch.setattr(sms.time, "monotonic", lambda: 1000.0)
+    only = sms.FakeSmsProvider()
+    sender = sms.FailoverSms([only], threshold=1, reset_seconds=30)
+
+    only.fail_next = 1
+    with pytest.raises(sms.SmsError):
+        await sender.send("+77001112233", "one")
+    with pytest.raises(sms.SmsUnavailable) as exc:
+        await sender.send("+77001112233", "two")
+    assert exc.value.retry_after == 30
+    assert only.sent == []
+
+
+def test_sms_provider_chain_from_settings(monkeypatch):
+    monkeypatch.setattr(sms, "_sender", None)
+    monkeypatch.setattr(sms.settings, "SMS_PROVIDER", "mobizon, fake")
+    assert [slot.provider.name for slot in sms.get_sms_sender().slots] == ["mobizon", "fake"]
+
+    monkeypatch.setattr(sms, "_sender", None)
+    monkeypatch.setattr(sms.settings, "SMS_PROVIDER", "smsc")
+    with pytest.raises(ValueError):
+        sms.get_sms_sender()
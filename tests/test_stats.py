@@ -0,0 +1,82 @@
+"""Tests for daily earnings/spend rollups."""
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models.deal import Deal
+from app.models.user import AdvertiserProfile
+from app.services import stats
+from tests.conftest import auth_headers
+
+
+async def _completed_via_api(client, db, advertiser_user, creator_user, order):
+    deal = Deal(
+        order_id=order.id, offer_id=uuid.uuid4(), creator_id=creator_user.id, advertiser_id=advertiser_user.id,
+        budget=100000, deadline=order.deadline, status="work_submitted", work_submitted_at=datetime.now(timezone.utc),
+    )
+    db.add(deal)
+    await db.commit()
+    resp = await client.post(f"/v1/deals/{deal.id}/confirm-work", headers=auth_headers(advertiser_user))
+    assert resp.status_code == 200
+
+
+async def _create_order(client, advertiser_user):
+    resp = await client.post(
+        "/v1/orders",
+        json={
+            "title": "Нужен обзор",
+            "description": "UGC обзор приложения",
+            "budget": 150000,
+            "deadline": "2026-05-01",
+            "platform": "tiktok",
+            "content_type": "video",
+        },
+        headers=auth_headers(advertiser_user),
+    )
+    assert resp.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_rollups_maintained_incrementally(client, db, advertiser_user, creator_user, order):
+    await _create_order(client, advertiser_user)
+    await _completed_via_api(client, db, advertiser_user, creator_user, order)
+
+    resp = await client.get("/v1/stats/me", headers=auth_headers(creator_user))
+    assert resp.status_code == 200
+    [kzt] = resp.json()["totals"]
+    assert kzt["currency"] == "KZT"
+    assert kzt["deals_completed"] == 1
+    assert kzt["creator_payout"] == 90000
+
+    resp = await client.get("/v1/stats/me/daily", headers=auth_headers(advertiser_user))
+    assert resp.status_code == 200
+    [today] = resp.json()["data"]
+    assert today["day"] == datetime.now(timezone.utc).date().isoformat()
+    assert today["amount"] == 100000
+    assert today["orders_created"] == 1
+    assert today["orders_budget"] == 150000
+
+    profile = (await db.execute(select(AdvertiserProfile).where(AdvertiserProfile.user_id == advertiser_user.id))).scalar_one()
+    await db.refresh(profile)
+    assert profile.total_orders == 6  # fixture starts at 5
+    assert profile.total_spent == 100000
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_source_tables(client, db, advertiser_user, creator_user, order):
+    await _create_order(client, advertiser_user)
+    await _completed_via_api(client, db, advertiser_user, creator_user, order)
+    before = (await client.get("/v1/stats/me", headers=auth_headers(creator_user))).json()
+
+    await stats.rebuild(db)
+
+    assert (await client.get("/v1/stats/me", headers=auth_headers(creator_user))).json() == before
+    advertiser = (await client.get("/v1/stats/me", headers=auth_headers(advertiser_user))).json()
+    # Both orders are counted now, including the fixture one created outside the API
+    assert advertiser["totals"][0]["orders_created"] == 2
+    profile = (await db.execute(select(AdvertiserProfile).where(AdvertiserProfile.user_id == advertiser_user.id))).scalar_one()
+    await db.refresh(profile)
+    assert profile.total_orders == 2
+    assert profile.total_spent == 100000
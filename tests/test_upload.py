@@ -0,0 +1,245 @@
+"""Tests for streamed and resumable uploads."""
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.models.upload import UploadSession
+from app.services import uploads
+from tests.conftest import auth_headers
+
+
+@pytest.fixture
+def upload_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "UPLOAD_TMP_DIR", str(tmp_path / "tmp"))
+    return tmp_path
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/receive")
+    async def receive(request: Request):
+        try:
+            upload = await uploads.receive_upload(request, max_size=1_000_000)
+        except uploads.UploadTooLarge:
+            return {"error": "too_large"}
+        except uploads.UploadError:
+            return {"error": "invalid"}
+        path = await uploads.store_upload(upload, settings.UPLOAD_DIR, "out.bin")
+        return {"path": path, "size": upload.size, "sha256": upload.sha256, "fields": upload.fields, "filename": upload.filename}
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_file_is_streamed_hashed_and_renamed_into_place(upload_dirs, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_WRITE_CHUNK", 4096)  # several flushes
+    content = os.urandom(300_000)
+    async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as ac:
+        resp = await ac.post("/receive", files={"file": ("clip.mp4", content, "video/mp4")}, data={"type": "work"})
+    data = resp.json()
+    assert data["size"] == len(content)
+    assert data["sha256"] == hashlib.sha256(content).hexdigest()
+    assert data["fields"] == {"type": "work"} and data["filename"] == "clip.mp4"
+    with open(data["path"], "rb") as f:
+        assert f.read() == content
+    assert os.listdir(upload_dirs / "tmp") == []
+
+
+@pytest.mark.asyncio
+async def test_oversized_and_malformed_uploads_leave_nothing_behind(upload_dirs):
+    async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as ac:
+        resp = await ac.post("/receive", files={"file": ("big.bin", b"x" * 1_000_001)})
+        assert resp.json() == {"error": "too_large"}
+
+        # No usable Content-Length: the byte counter stops it mid-stream
+        async def body():
+            yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a\"\r\n\r\n"
+            for _ in range(20):
+                yield b"x" * 100_000
+            yield b"\r\n--b--\r\n"
+
+        resp = await ac.post("/receive", content=body(), headers={"Content-Type": "multipart/form-data; boundary=b"})
+        assert resp.json() == {"error": "too_large"}
+
+        resp = await ac.post("/receive", data={"type": "work"})
+        assert resp.json() == {"error": "invalid"}
+        resp = await ac.post("/receive", content=b"not multipart", headers={"Content-Type": "application/octet-stream"})
+        assert resp.json() == {"error": "invalid"}
+    assert os.listdir(upload_dirs / "tmp") == []
+    assert not os.path.exists(upload_dirs / "uploads")
+
+
+@pytest.mark.asyncio
+async def test_upload_endpoint(client, creator_user, upload_dirs, monkeypatch):
+    headers = auth_headers(creator_user)
+    resp = await client.post("/v1/upload", headers=headers, files={"file": ("me.jpg", b"jpeg", "image/jpeg")}, data={"type": "avatar"})
+    assert resp.status_code == 201
+    data = resp.json()
+    sha = hashlib.sha256(b"jpeg").hexdigest()
+    assert data["url"] == f"/uploads/blobs/{sha[:2]}/{sha}.jpg" and not data["deduplicated"]
+    assert data["size"] == 4 and data["sha256"] == sha
+
+    # The same content again is not stored twice
+    resp = await client.post("/v1/upload", headers=headers, files={"file": ("copy.jpg", b"jpeg", "image/jpeg")}, data={"type": "portfolio"})
+    assert resp.json()["url"] == data["url"] and resp.json()["deduplicated"]
+    assert os.listdir(upload_dirs / "uploads" / "blobs" / sha[:2]) == [f"{sha}.jpg"]
+
+    resp = await client.post("/v1/upload", headers=headers, files={"file": ("x.exe", b"x")}, data={"type": "binary"})
+    assert resp.status_code == 400
+
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 10)
+    resp = await client.post("/v1/upload", headers=headers, files={"file": ("me.jpg", b"x" * 11)}, data={"type": "avatar"})
+    assert resp.status_code == 413
+    assert os.listdir(upload_dirs / "tmp") == []
+
+
+class _Body:
+    """Stands in for a Request whose connection may drop after some chunks."""
+
+    def __init__(self, *chunks: bytes, drop: bool = False):
+        self.chunks, self.drop = chunks, drop
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+        if self.drop:
+            raise ClientDisconnect()
+
+
+@pytest.mark.asyncio
+async def test_chunks_keep_data_from_a_dropped_connection(upload_dirs):
+    path = str(upload_dirs / "tmp" / "s.part")
+    segment, written = await uploads.receive_chunk(_Body(b"abc", b"def", drop=True), 100)
+    assert written == 6
+    await uploads.append_segment(segment, path, 0)
+
+    # The retry starts at the recorded offset; a stale tail past it is cut off
+    with open(path, "ab") as f:
+        f.write(b"garbage")
+    segment, written = await uploads.receive_chunk(_Body(b"ghi"), 94)
+    await uploads.append_segment(segment, path, 6)
+    with open(path, "rb") as f:
+        assert f.read() == b"abcdefghi"
+
+    with pytest.raises(uploads.UploadTooLarge):
+        await uploads.receive_chunk(_Body(b"x" * 10), 5)
+    segment, _ = await uploads.receive_chunk(_Body(b"x"), 5)
+    with pytest.raises(uploads.UploadGone):
+        await uploads.append_segment(segment, str(upload_dirs / "tmp" / "lost.part"), 9)
+    assert sorted(os.listdir(upload_dirs / "tmp")) == ["s.part"]
+
+
+@pytest.mark.asyncio
+async def test_racing_chunks_write_separate_segments(upload_dirs):
+    path = str(upload_dirs / "tmp" / "s.part")
+    (first, _), (second, _) = await asyncio.gather(
+        uploads.receive_chunk(_Body(b"aaa", b"aaa"), 100),
+        uploads.receive_chunk(_Body(b"bbb", b"bbb"), 100),
+    )
+    # Only the request that won the offset update appends; the other's bytes never reach the file
+    await uploads.append_segment(first, path, 0)
+    await uploads.remove_file(second)
+    with open(path, "rb") as f:
+        assert f.read() == b"aaaaaa"
+
+
+def test_upload_dirs_must_share_a_device(upload_dirs, monkeypatch):
+    uploads.check_upload_dirs()
+    real_stat = os.stat
+
+    def stat(path):
+        st = list(real_stat(path))
+        if path == settings.UPLOAD_TMP_DIR:
+            st[2] += 1  # st_dev: pretend the temp dir is another volume
+        return os.stat_result(st)
+
+    monkeypatch.setattr(uploads.os, "stat", stat)
+    with pytest.raises(RuntimeError):
+        uploads.check_upload_dirs()
+
+
+def test_sweep_removes_only_stale_temp_files(upload_dirs):
+    tmp = upload_dirs / "tmp"
+    tmp.mkdir()
+    (tmp / "old.part").write_bytes(b"x")
+    (tmp / "new.part").write_bytes(b"x")
+    stale = time.time() - 7200
+    os.utime(tmp / "old.part", (stale, stale))
+    assert uploads.sweep_temp_files(3600) == ["old.part"]
+    assert os.listdir(tmp) == ["new.part"]
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload(client, creator_user, advertiser_user, upload_dirs):
+    headers = auth_headers(creator_user)
+    content = os.urandom(10_000)
+    resp = await client.post("/v1/upload/sessions", headers=headers, json={
+        "type": "work", "filename": "final.mp4", "size": len(content), "content_type": "video/mp4",
+        "sha256": hashlib.sha256(content).hexdigest(),
+    })
+    assert resp.status_code == 201
+    session_id = resp.json()["id"]
+    url = f"/v1/upload/sessions/{session_id}"
+
+    resp = await client.patch(url, headers={**headers, "Upload-Offset": "0"}, content=content[:4000])
+    assert resp.json()["offset"] == 4000
+    assert (await client.post(f"{url}/finalize", headers=headers)).status_code == 409
+
+    # A retried chunk with a stale offset is refused with the current one
+    resp = await client.patch(url, headers={**headers, "Upload-Offset": "0"}, content=content[:4000])
+    assert resp.status_code == 409 and resp.headers["upload-offset"] == "4000"
+
+    resp = await client.get(url, headers=headers)
+    assert resp.headers["upload-offset"] == "4000"
+    resp = await client.patch(url, headers={**headers, "Upload-Offset": "4000"}, content=content[4000:] + b"extra")
+    assert resp.status_code == 413
+    resp = await client.patch(url, headers={**headers, "Upload-Offset": "4000"}, content=content[4000:])
+    assert resp.json()["offset"] == len(content)
+
+    resp = await client.post(f"{url}/finalize", headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["url"].startswith("/uploads/blobs/") and data["sha256"] == hashlib.sha256(content).hexdigest()
+    with open(os.path.join(settings.UPLOAD_DIR, data["url"].removeprefix("/uploads/")), "rb") as f:
+        assert f.read() == content
+    assert (await client.post(f"{url}/finalize", headers=headers)).json() == data
+
+    # Knowing the hash isn't enough to get the stored file: the bytes have to be sent
+    resp = await client.post("/v1/upload/sessions", headers=headers, json={
+        "type": "work", "filename": "again.mp4", "size": len(content), "sha256": data["sha256"],
+    })
+    assert (resp.json()["status"], resp.json()["offset"], resp.json()["url"]) == ("uploading", 0, None)
+
+    # Other users can't see or touch it
+    assert (await client.get(url, headers=auth_headers(advertiser_user))).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_expired_upload_sessions_are_purged(db, creator_user, upload_dirs):
+    now = datetime.now(timezone.utc)
+    stale = UploadSession(user_id=creator_user.id, type="work", filename="a.mp4", content_type="video/mp4",
+                          size=10, offset=3, expires_at=now - timedelta(minutes=1))
+    live = UploadSession(user_id=creator_user.id, type="work", filename="b.mp4", content_type="video/mp4",
+                         size=10, offset=3, expires_at=now + timedelta(hours=1))
+    db.add_all([stale, live])
+    await db.commit()
+    for s in (stale, live):
+        (upload_dirs / "tmp").mkdir(exist_ok=True)
+        with open(uploads.partial_path(s.id), "wb") as f:
+            f.write(b"abc")
+
+    assert await uploads.purge_expired_uploads(db) == 1
+    assert not os.path.exists(uploads.partial_path(stale.id))
+    assert os.path.exists(uploads.partial_path(live.id))
+    assert (await db.execute(select(UploadSession.id))).scalars().all() == [live.id]